@@ -7,4 +7,5 @@ __email__ = '@'.join(['gherman', 'darwin.in-berlin.de'])
 __version__ = '0.1.4'
 
 from .ipyrest import Api, recorder
+from .transport import Transport, SessionTransport, default_transport
 from .extendedtab import ExtendedTab
@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+
+"""
+Caching of vcr cassettes for ipyrest.
+
+Parsing a cassette file can take seconds for large recordings. The cache
+here loads every cassette only once per kernel, keeps an index of the
+recorded (method, uri) pairs to answer if a request is cached in constant
+time, and loads a cassette again only when its file has changed on disk.
+It is plugged into vcr as a persister, so ``use_cassette`` uses it, too.
+
+There is also a compact cassette format, JSON lines with bodies stored as
+raw blob files, which is much faster to load and write than YAML for
+large or binary bodies. Use ``convert_cassette`` to convert existing ones.
+"""
+
+import os
+import json
+import base64
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple, Set, Any, NamedTuple, Optional, Callable, Union
+
+from vcr.request import Request
+from vcr.serializers import compat, yamlserializer
+from vcr.serialize import CASSETTE_FORMAT_VERSION
+from vcr.persisters.filesystem import FilesystemPersister, CassetteNotFoundError
+
+
+# Compact cassette format
+
+class BlobStore(object):
+    """
+    A directory of raw body blobs named by the SHA-1 hash of their content.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        "Create a blob store for the directory with given path."
+
+        self.path = Path(path)
+
+    def put(self, data: bytes) -> str:
+        "Store some data, unless already present, and return its key."
+
+        key = hashlib.sha1(data).hexdigest()
+        blob_path = self.path / key
+        if not blob_path.exists():
+            self.path.mkdir(parents=True, exist_ok=True)
+            tmp_path = blob_path.with_suffix('.tmp')
+            tmp_path.write_bytes(data)
+            tmp_path.replace(blob_path)
+        return key
+
+    def get(self, key: str) -> bytes:
+        "Return the data stored under some key."
+
+        return (self.path / key).read_bytes()
+
+
+class JSONLinesSerializer(object):
+    """
+    A vcr serializer writing cassettes as JSON lines.
+
+    The first line holds the format version, every following line one
+    recorded interaction. Bodies are kept as text if they are valid UTF-8,
+    binary ones are base64 encoded. When a blob store is given, all bodies
+    of at least ``blob_size`` bytes are written into it as raw files and
+    only referenced from the cassette.
+    """
+
+    def __init__(self, blob_size: int = 1024) -> None:
+        "Create a new serializer."
+
+        self.blob_size = blob_size
+
+    def encode_body(self, body: Any, blobs: Optional[BlobStore] = None) -> Any:
+        "Return a JSON-serializable version of some body."
+
+        if body is None:
+            return None
+        is_text = isinstance(body, str)
+        data = body.encode('utf-8') if is_text else body
+        if blobs is not None and len(data) >= self.blob_size:
+            return {'blob': blobs.put(data), 'size': len(data), 'text': is_text}
+        if is_text:
+            return body
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError:
+            return {'base64': base64.b64encode(data).decode('ascii')}
+
+    def decode_body(self, body: Any, blobs: Optional[BlobStore] = None) -> Any:
+        "Return a body as it was before being encoded."
+
+        if not isinstance(body, dict):
+            return body
+        if 'base64' in body:
+            return base64.b64decode(body['base64'])
+        if blobs is None:
+            raise ValueError('Cassette references blobs, but no blob store is given.')
+        data = blobs.get(body['blob'])
+        return data.decode('utf-8') if body.get('text') else data
+
+    def map_bodies(self, interaction: Dict, func: Callable) -> Dict:
+        "Return an interaction with func applied to its request and response bodies."
+
+        request = dict(interaction['request'])
+        request['body'] = func(request.get('body'))
+        response = dict(interaction['response'])
+        response_body = dict(response.get('body') or {})
+        if 'string' in response_body:
+            response_body['string'] = func(response_body['string'])
+            response['body'] = response_body
+        return dict(request=request, response=response)
+
+    def serialize(self, cassette_dict: Dict, blobs: Optional[BlobStore] = None) -> str:
+        "Return a cassette dict as JSON lines."
+
+        lines = [json.dumps({'version': cassette_dict['version']})]
+        for interaction in cassette_dict['interactions']:
+            encoded = self.map_bodies(interaction, lambda b: self.encode_body(b, blobs))
+            lines.append(json.dumps(encoded))
+        return '\n'.join(lines) + '\n'
+
+    def deserialize(self, cassette_string: str, blobs: Optional[BlobStore] = None) -> Dict:
+        "Return a cassette dict read from JSON lines."
+
+        lines = [line for line in cassette_string.splitlines() if line.strip()]
+        if not lines:
+            return {'version': CASSETTE_FORMAT_VERSION, 'interactions': []}
+        header = json.loads(lines[0])
+        interactions = [
+            self.map_bodies(json.loads(line), lambda b: self.decode_body(b, blobs))
+            for line in lines[1:]]
+        return {'version': header['version'], 'interactions': interactions}
+
+
+# default JSON lines serializer, registered with the default recorder as 'jsonl'
+jsonl_serializer = JSONLinesSerializer()
+
+
+def blob_store_for(cassette_path: Union[str, Path]) -> BlobStore:
+    "Return the blob store used for a cassette in the compact format."
+
+    return BlobStore(str(cassette_path) + '.blobs')
+
+
+def read_cassette(cassette_path: Union[str, Path], serializer) -> Tuple[List[Any], List[Any]]:
+    """
+    Return (requests, responses) read from a cassette file.
+
+    Cassettes written by a JSONLinesSerializer are read together with their
+    blobs, all others via vcr's filesystem persister.
+    """
+    if not isinstance(serializer, JSONLinesSerializer):
+        return FilesystemPersister.load_cassette(cassette_path, serializer)
+    cassette_path = Path(cassette_path)
+    if not cassette_path.is_file():
+        raise CassetteNotFoundError()
+    data = serializer.deserialize(cassette_path.read_text(encoding='utf-8'),
+                                  blobs=blob_store_for(cassette_path))
+    requests = [Request._from_dict(i['request']) for i in data['interactions']]
+    responses = [compat.convert_to_bytes(i['response']) for i in data['interactions']]
+    return requests, responses
+
+
+def write_cassette(cassette_path: Union[str, Path], cassette_dict: Dict, serializer) -> None:
+    "Write a cassette dict with requests and responses into a file."
+
+    if not isinstance(serializer, JSONLinesSerializer):
+        FilesystemPersister.save_cassette(cassette_path, cassette_dict, serializer)
+        return
+    cassette_path = Path(cassette_path)
+    interactions = [
+        dict(request=request._to_dict(), response=response)
+        for request, response in zip(cassette_dict['requests'], cassette_dict['responses'])]
+    data = {'version': CASSETTE_FORMAT_VERSION, 'interactions': interactions}
+    text = serializer.serialize(data, blobs=blob_store_for(cassette_path))
+    cassette_path.parent.mkdir(parents=True, exist_ok=True)
+    cassette_path.write_text(text, encoding='utf-8')
+
+
+def convert_cassette(src_path: Union[str, Path],
+                     dst_path: Union[str, Path],
+                     src_serializer=yamlserializer,
+                     dst_serializer=jsonl_serializer) -> int:
+    """
+    Convert a cassette into another format, by default from YAML to JSON lines.
+
+    Return the number of interactions converted.
+    """
+    requests, responses = read_cassette(src_path, src_serializer)
+    write_cassette(dst_path, dict(requests=requests, responses=responses), dst_serializer)
+    return len(requests)
+
+
+# Cassette cache
+
+
+class CassetteEntry(NamedTuple):
+    "A loaded cassette with the file stamp it was loaded for and its index."
+
+    stamp: Tuple[int, int]
+    requests: List[Any]
+    responses: List[Any]
+    index: Set[Tuple[str, str]]
+
+
+def file_stamp(path: str) -> Tuple[int, int]:
+    "Return (mtime in nanoseconds, size) of the file with given path."
+
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+class CassetteCache(object):
+    """
+    A cache of cassettes loaded from files, invalidated by file changes.
+    """
+
+    def __init__(self) -> None:
+        "Create a new, empty cache."
+
+        self.entries = {}  # type: Dict[str, CassetteEntry]
+        self.num_loads = 0
+        self._lock = threading.RLock()
+
+    def load(self, path: str, serializer) -> Tuple[List[Any], List[Any]]:
+        """
+        Return (requests, responses) recorded in the cassette with given path.
+
+        The file is parsed only if it was not loaded before or has changed
+        since. Raises ``CassetteNotFoundError`` if there is no such file.
+        """
+        entry = self._entry(path, serializer)
+        return list(entry.requests), list(entry.responses)
+
+    def _entry(self, path: str, serializer) -> CassetteEntry:
+        "Return the entry for a cassette file, (re)loading it if needed, without copying."
+
+        path = os.path.abspath(path)
+        try:
+            stamp = file_stamp(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            raise CassetteNotFoundError()
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry is None or entry.stamp != stamp:
+                requests, responses = read_cassette(path, serializer)
+                self.num_loads += 1
+                entry = self.update(path, requests, responses, stamp=stamp)
+        return entry
+
+    def update(self,
+               path: str,
+               requests: List[Any],
+               responses: List[Any],
+               stamp: Optional[Tuple[int, int]] = None) -> CassetteEntry:
+        "Store recorded requests and responses for a cassette file just written."
+
+        path = os.path.abspath(path)
+        index = set((r.method.upper(), r.uri) for r in requests)
+        entry = CassetteEntry(stamp or file_stamp(path), list(requests),
+                              list(responses), index)
+        with self._lock:
+            self.entries[path] = entry
+        return entry
+
+    def contains(self, path: str, method: str, uri: str, serializer) -> bool:
+        "Return if a request with given method and URI is recorded in a cassette."
+
+        try:
+            entry = self._entry(path, serializer)
+        except CassetteNotFoundError:
+            return False
+        return (method.upper(), uri) in entry.index
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        "Forget one cached cassette or, if no path is given, all of them."
+
+        with self._lock:
+            if path is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(os.path.abspath(path), None)
+
+
+# default cache shared by all Api instances
+cassette_cache = CassetteCache()
+
+
+class CachingPersister(object):
+    """
+    A vcr persister reading and writing cassettes via the default cache.
+    """
+
+    @classmethod
+    def load_cassette(cls, cassette_path, serializer):
+        return cassette_cache.load(cassette_path, serializer)
+
+    @staticmethod
+    def save_cassette(cassette_path, cassette_dict, serializer):
+        write_cassette(cassette_path, cassette_dict, serializer)
+        # serializing converts bodies to text, loading gives bytes
+        responses = [compat.convert_to_bytes(r) for r in cassette_dict['responses']]
+        cassette_cache.update(cassette_path, cassette_dict['requests'], responses)
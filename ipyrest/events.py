@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental parsing and logging of Server-Sent Events (``text/event-stream``).
+
+Events are parsed as described in the HTML standard, from chunks of any
+size while a stream arrives. An event log keeps a bounded number of the
+most recent events, counts over all of them and the recent event rate.
+The last event id and the reconnection delay sent by the server are kept
+to continue a stream on a new connection.
+"""
+
+import re
+import time
+import html
+from collections import Counter, deque
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+# line endings allowed in event streams
+LINE_END_PAT = re.compile('\r\n|\r|\n')
+
+class Event(NamedTuple):
+    "An event of some type with its data and the last event id when it was dispatched."
+
+    event: str
+    data: str
+    id: str = ''
+
+
+class EventParser(object):
+    """
+    A parser for event streams fed in chunks of any size.
+
+    Lines may end with CRLF, CR or LF, also when split between chunks.
+    ``last_id`` and ``retry`` (the reconnection delay in milliseconds, if
+    sent) are kept over all events, also when starting a new stream.
+    """
+
+    def __init__(self) -> None:
+        "Create a parser for a new stream."
+
+        self.last_id = ''
+        self.retry = None  # type: Optional[int]
+        self.num_comments = 0
+        self.reset()
+
+    def reset(self) -> None:
+        "Forget an incomplete event, to parse a new stream."
+
+        self._pending = []  # type: List[bytes]
+        self._data = []  # type: List[str]
+        self._event = ''
+        # if the last chunk ended with CR, which may be followed by LF
+        self._after_cr = False
+
+    def feed(self, chunk: bytes) -> List[Event]:
+        "Parse the lines completed by a chunk and return the events dispatched."
+
+        if self._after_cr and chunk.startswith(b'\n'):
+            chunk = chunk[1:]
+        self._after_cr = False
+        end = max(chunk.rfind(b'\n'), chunk.rfind(b'\r'))
+        if end < 0:
+            if chunk:
+                self._pending.append(chunk)
+            return []
+        head = b''.join(self._pending + [chunk[:end + 1]])
+        self._pending = [chunk[end + 1:]] if end + 1 < len(chunk) else []
+        self._after_cr = end + 1 == len(chunk) and chunk.endswith(b'\r')
+        events = []
+        # the head ends with a line ending, so the last part is empty
+        for line in LINE_END_PAT.split(head.decode('utf-8', errors='replace'))[:-1]:
+            event = self.parse_line(line)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def parse_line(self, line: str) -> Optional[Event]:
+        "Parse one line, returning an event if the line dispatches one."
+
+        if not line:
+            event = None
+            if self._data:
+                event = Event(self._event or 'message', '\n'.join(self._data), self.last_id)
+            self._data, self._event = [], ''
+            return event
+        if line.startswith(':'):
+            self.num_comments += 1
+            return None
+        field, _, value = line.partition(':')
+        if value.startswith(' '):
+            value = value[1:]
+        if field == 'data':
+            self._data.append(value)
+        elif field == 'event':
+            self._event = value
+        elif field == 'id' and '\0' not in value:
+            self.last_id = value
+        elif field == 'retry' and value.isdigit():
+            self.retry = int(value)
+        return None
+
+
+class EventLog(object):
+    """
+    A bounded log of the events of one or more event streams.
+
+    The ``max_events`` most recent events are kept in ``events`` with the
+    time they arrived. All events are counted in ``num_events`` and per
+    type in ``type_counts``, keeping only the ``max_types`` most common
+    types when the server sends more. The event rate is computed over the
+    last ``window`` seconds from counts per second, so it needs constant
+    memory.
+    """
+
+    def __init__(self, max_events: int = 1000, window: int = 10, max_types: int = 100) -> None:
+        "Create an empty log keeping some number of recent events."
+
+        self.max_events = max_events
+        self.window = window
+        self.max_types = max_types
+        self.parser = EventParser()
+        self.events = deque(maxlen=max_events)  # type: Deque[Tuple[float, Event]]
+        self.num_events = 0
+        self.type_counts = Counter()  # type: Counter
+        self.started = time.time()
+        # (second, number of events) for the last seconds
+        self.counts = deque(maxlen=window + 1)  # type: Deque[List[int]]
+
+    @property
+    def last_id(self) -> str:
+        "The last event id received, to be sent as Last-Event-ID when reconnecting."
+
+        return self.parser.last_id
+
+    @property
+    def retry(self) -> Optional[int]:
+        "The reconnection delay in milliseconds sent by the server, if any."
+
+        return self.parser.retry
+
+    def begin_stream(self) -> None:
+        "Prepare for events from a new stream, e.g. after reconnecting."
+
+        self.parser.reset()
+
+    def feed(self, chunk: bytes) -> int:
+        "Parse a chunk of a stream, add its events and return their number."
+
+        events = self.parser.feed(chunk)
+        for event in events:
+            self.add(event)
+        return len(events)
+
+    def add(self, event: Event, now: Optional[float] = None) -> None:
+        "Add an event arriving at some time, by default now."
+
+        now = time.time() if now is None else now
+        self.events.append((now, event))
+        self.num_events += 1
+        self.type_counts[event.event] += 1
+        if len(self.type_counts) > 2 * self.max_types:
+            # drop the rarest types, pruning only now and then
+            self.type_counts = Counter(dict(self.type_counts.most_common(self.max_types)))
+        second = int(now)
+        if self.counts and self.counts[-1][0] == second:
+            self.counts[-1][1] += 1
+        else:
+            self.counts.append([second, 1])
+
+    def rate(self, now: Optional[float] = None) -> float:
+        "Return the events per second in the last ``window`` seconds."
+
+        now = time.time() if now is None else now
+        start = max(now - self.window, self.started)
+        count = sum(n for (second, n) in self.counts if second >= int(start))
+        return count / max(now - start, 1.0)
+
+    def text(self, max_events: Optional[int] = None) -> str:
+        "Return the most recent events as text, one paragraph per event."
+
+        events = list(self.events)[-max_events:] if max_events else list(self.events)
+        paragraphs = []
+        for (received, event) in events:
+            stamp = time.strftime('%H:%M:%S', time.localtime(received))
+            head = '{} [{}]{}'.format(stamp, event.event, f' id={event.id}' if event.id else '')
+            paragraphs.append(head + '\n' + event.data)
+        return '\n\n'.join(paragraphs)
+
+    def summary(self) -> str:
+        "Return an HTML summary of the event counts and rate."
+
+        types = ', '.join('{} ({:,})'.format(html.escape(name), count)
+                          for (name, count) in self.type_counts.most_common(10))
+        text = '<b>{:,} events</b>, {:.1f} events/s'.format(self.num_events, self.rate())
+        if self.num_events > len(self.events):
+            text += ', keeping the last {:,}'.format(len(self.events))
+        if types:
+            text += '<br>Types: ' + types
+        return text
@@ -12,34 +12,108 @@ import os
 import re
 import json
 import urllib
+import time
 import logging
+import threading
 from math import log, fabs
 from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from urllib.parse import (parse_qs, parse_qsl, splitquery,
                           urlparse, urlunparse)
 
-import vcr
 import requests
-import timeout_decorator
-import ipyleaflet
 import ipywidgets as widgets
 from traitlets import All
 from ipywidgets import (Widget, HBox, VBox, Text, Textarea, Dropdown,
-                        Button, Layout, Tab, Image, HTML)
-from typing import Dict, Tuple, List, Union, Optional, Any, Callable
+                        Button, Layout, Tab, Image, HTML, FloatProgress)
+from typing import Dict, Tuple, List, Union, Optional, Any, Callable, TYPE_CHECKING
 
 from .extendedtab import ExtendedTab
-from .responseviews import RawResponseView, ResponseView, builtin_view_classes
+from .paging import PagedText
+from .transport import (Transport, TimeoutSpec, Timeouts, TransferSizes, Download,
+                        DownloadAborted, as_timeouts, timeout_phase, transfer_sizes,
+                        default_transport)
+from .events import EventLog
+from .timing import Timings, collect
+from .responseviews import (RawResponseView, ResponseContent, ResponseView,
+                            EventStreamResponseView, ViewRegistry, builtin_views,
+                            parse_content_type)
+
+
+if TYPE_CHECKING:
+    import vcr
+
+
+class LazyRecorder(object):
+    """
+    A proxy for a ``vcr.VCR`` recorder that is created on first use.
+
+    This avoids importing vcr when importing ipyrest. All attributes are
+    read from and written to the real recorder.
+    """
+
+    def __init__(self, **kwargs) -> None:
+        "Create a proxy for a recorder to be created with given arguments."
+
+        self.__dict__['_kwargs'] = kwargs
+        self.__dict__['_recorder'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def get(self) -> 'vcr.VCR':
+        "Return the real recorder, creating it if needed."
+
+        with self._lock:
+            if self._recorder is None:
+                import vcr
+                from .cassettes import CachingPersister, jsonl_serializer
+
+                recorder = vcr.VCR(**self._kwargs)
+                # load every cassette only once, unless it changes
+                recorder.register_persister(CachingPersister)
+                # compact format, use with recorder.serializer = 'jsonl'
+                recorder.register_serializer('jsonl', jsonl_serializer)
+                self.__dict__['_recorder'] = recorder
+        return self._recorder
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self.get(), name, value)
 
 
 # default recorder
-recorder = vcr.VCR(
+recorder = LazyRecorder(
     serializer='yaml',
     cassette_library_dir='fixtures/cassettes',
     record_mode='new_episodes',
     match_on=['uri', 'method'],
 )
 
+# background workers executing requests of Api instances in asynchronous mode
+executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='ipyrest')
+
+
+def run_in_thread(fn: Callable, *args) -> Future:
+    """
+    Run a function in a new daemon thread and return a future for its result.
+
+    This is used for long running work like live mode, which would keep a
+    worker of the shared ``executor`` busy for as long as it runs.
+    """
+    future = Future()  # type: Future
+
+    def run() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(fn(*args))
+        except BaseException as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=run, name='ipyrest-live', daemon=True).start()
+    return future
+
 
 class MyLogger(object):
     def __init__(self):
@@ -72,37 +146,49 @@ def execute_request(url: str,
                     params: Dict = {},
                     json: Dict = {},
 
-                    recorder: Optional[vcr.VCR] = recorder,
+                    recorder: Union['vcr.VCR', LazyRecorder, None] = recorder,
                     cassette_path: str = '',
-                    logger: Optional[MyLogger] = None) -> Tuple[requests.models.Response, bool]:
+                    logger: Optional[MyLogger] = None,
+                    transport: Optional[Transport] = None,
+                    timeout: TimeoutSpec = None,
+                    stream: bool = False) -> Tuple[requests.models.Response, bool]:
     """
     Execute a HTTP request and return response defined by the `requests` package.
+
+    The request is sent via the given transport or, if none is given, via
+    the default transport shared by all Api instances, reusing its pooled
+    connections. A timeout, if given, is passed on to the transport. With
+    ``stream`` set the body is not read yet, see ``transport.Download``.
+
+    If a cassette path is given the request is recorded in or replayed from
+    that cassette. Cassettes are loaded via the kernel-wide cassette cache.
     """
     if logger:
         logger.logger.info(
             'execute_request {} {}'.format(recorder, cassette_path))
 
     is_cached = False
-    method_func = requests.__getattribute__(method.lower())
+    transport = transport or default_transport
+
+    def method_func(url, **kwargs):
+        return transport.request(method, url, timeout=timeout, stream=stream, **kwargs)
+
     if cassette_path and recorder:
-        from vcr.cassette import Cassette
-        from vcr.request import Request
-        logger.logger.info('imported vcr')
-        req = Request(method.upper(), url,
-                      'irrelevant body?', {'some': 'header'})
-        logger.logger.info('req ' + str(req))
+        from .cassettes import cassette_cache
+
+        if isinstance(recorder, LazyRecorder):
+            recorder = recorder.get()
         c_path = os.path.join(recorder.cassette_library_dir, cassette_path)
-        logger.logger.info(c_path)
-        logger.logger.info(Cassette(None).load(path=c_path))
-        if req in Cassette(None).load(path=c_path):
-            is_cached = True
+        uri = requests.Request(method.upper(), url, params=params).prepare().url
+        serializer = recorder.serializers[recorder.serializer]
+        is_cached = cassette_cache.contains(c_path, method, uri, serializer)
+        if logger:
+            logger.logger.info('cassette {} has {}: {}'.format(c_path, uri, is_cached))
         with recorder.use_cassette(c_path):
-            logger.logger.info('running...')
             if json:
                 resp = method_func(url, headers=headers, params=params, json=json)
             else:
                 resp = method_func(url, headers=headers, params=params)
-            logger.logger.info('got it...')
     else:
         if json:
             resp = method_func(url, headers=headers, params=params, json=json)
@@ -112,6 +198,26 @@ def execute_request(url: str,
     return resp, is_cached
 
 
+def format_sizes(sizes: TransferSizes) -> str:
+    "Return the wire and decoded sizes of a body as text for the status line."
+
+    if sizes.encoding == 'identity' and sizes.wire in (None, sizes.decoded):
+        return f'{sizes.decoded:,} Bytes'
+    wire = '?' if sizes.wire is None else f'{sizes.wire:,}'
+    ratio = '' if sizes.ratio is None else f', {sizes.ratio:.1f}x'
+    return f'{wire} Bytes ({sizes.decoded:,} decoded, {sizes.encoding}{ratio})'
+
+
+def format_rate(rate: float) -> str:
+    "Return a transfer rate in bytes per second as text."
+
+    for unit in ('Bytes', 'KB', 'MB'):
+        if rate < 1000:
+            return f'{rate:.1f} {unit}/s'
+        rate /= 1000
+    return f'{rate:.1f} GB/s'
+
+
 def mask_credentials(text: str, field_names: List[str]) -> str:
     "Mask out credentials params in a string, here an URL query string."
 
@@ -136,6 +242,17 @@ def update_qs(url, **kwargs):
 class Api(VBox):
     """
     Return a widget that mimics a Postman-like interface for exploring APIs.
+
+    With ``streaming`` set response bodies are downloaded in chunks, showing
+    progress and previews by incremental views while they arrive. Bodies
+    larger than ``spool_size`` bytes are spooled to a temporary file while
+    downloading. Spooling does not limit the memory needed to show a body,
+    but at most ``max_content`` bytes of a spooled body are read back and
+    shown, the complete body stays in ``download.file``. Downloads can be
+    aborted from the UI in asynchronous mode.
+
+    With ``live`` set responses are consumed in a thread of their own until
+    stopped, e.g. Server-Sent Events or long polls, see ``start_live``.
     """
 
     def __init__(self,
@@ -148,11 +265,16 @@ class Api(VBox):
                  cookies: Dict = {},
 
                  click_send: bool = False,
-                 timeout: float = 10,
+                 asynchronous: bool = False,
+                 streaming: bool = False,
+                 spool_size: Optional[int] = None,
+                 live: bool = False,
+                 timeout: TimeoutSpec = 10,
                  cassette_path: str = '',
-                 views: List[ResponseView] = builtin_view_classes,
-                 additional_views: List[ResponseView] = [],
+                 views: Union[List[type], ViewRegistry] = builtin_views,
+                 additional_views: List[type] = [],
                  post_process_resp: Optional[Callable] = None,
+                 transport: Optional[Transport] = None,
                  config=None) -> None:  # FIXME: use config
         """
         Build widget layout and wire its components.
@@ -167,10 +289,28 @@ class Api(VBox):
         self.headers = headers
         self.cookies = cookies
 
+        self.asynchronous = asynchronous
+        self.streaming = streaming
+        self.spool_size = spool_size
+        self.max_content = 256 * 1024 ** 2
+        self.progress_interval = 0.25
+        self.download = None  # type: Optional[Download]
+        self.partial_viewers = OrderedDict()  # type: Dict[str, ResponseView]
+        self.live = live
+        self.live_retry = 3.0
+        self.live_future = None  # type: Optional[Future]
+        self.live_stop = threading.Event()
+        self.event_log = None  # type: Optional[EventLog]
+        self.timings = None  # type: Optional[Timings]
         self.timeout = timeout
         self.cassette_path = cassette_path
+        self.transport = transport or default_transport
 
-        self.views = views + additional_views
+        if isinstance(views, ViewRegistry) and not additional_views:
+            self.view_registry = views
+        else:
+            self.view_registry = ViewRegistry(list(views) + list(additional_views))
+        self.views = self.view_registry.view_classes
         self.viewers = OrderedDict({})
         self.post_process_resp = post_process_resp
         self.logger = MyLogger()
@@ -189,6 +329,15 @@ class Api(VBox):
         self.rep_btn = Button(description='REP', tooltip='Show Response Pane')
         self.send_btn = Button(
             description='Send', tooltip='Send request', button_style='primary')
+        self.cancel_btn = Button(
+            description='Cancel', tooltip='Cancel request in flight', button_style='warning')
+        self.abort_btn = Button(
+            description='Abort', tooltip='Abort download', button_style='warning')
+        self.stop_btn = Button(
+            description='Stop', tooltip='Stop live mode', button_style='warning')
+        self.future = None  # type: Optional[Future]
+        self.idle = threading.Event()
+        self.idle.set()
         self.input_hbx = HBox([
             self.method_ddn,
             self.url_txt,
@@ -214,7 +363,7 @@ class Api(VBox):
 
         # response pane
         self.content_area = ExtendedTab()
-        self.content_area.add_child_named(Textarea(layout=lt_w100p), 'Raw')
+        self.content_area.add_child_named(PagedText(layout=lt_w100p), 'Raw')
         self.content_area.selected_index = None
 
         self.showing_rep_pane = False
@@ -228,6 +377,9 @@ class Api(VBox):
         self.req_btn.on_click(self.req_clicked)
         self.rep_btn.on_click(self.rep_clicked)
         self.send_btn.on_click(self.send_clicked)
+        self.cancel_btn.on_click(self.cancel_clicked)
+        self.abort_btn.on_click(self.abort_clicked)
+        self.stop_btn.on_click(self.stop_clicked)
         self.url_txt.observe(self.url_changed, names='value')
 
         # top level UI
@@ -267,6 +419,20 @@ class Api(VBox):
 
         return execute_request(*args, **kwargs)
 
+    def fetch(self, *args, **kwargs) -> Tuple[requests.models.Response, bool]:
+        "Execute a request and, if streaming, download its body, timing its phases."
+
+        timings = Timings()
+        total = as_timeouts(kwargs.get('timeout')).total
+        deadline = None if total is None else time.monotonic() + total
+        with collect(timings):
+            resp, is_cached = self.execute_request(*args, **kwargs)
+            if kwargs.get('stream'):
+                self.download_body(resp, deadline)
+        timings.finish_request(resp)
+        self.timings = timings
+        return resp, is_cached
+
     def url_changed(self, change) -> None:
         "Callback to be called when the input URL is changed."
 
@@ -337,58 +503,360 @@ class Api(VBox):
 
         args = [url, method]
         kwargs = dict(headers=headers,
-                      cassette_path=self.cassette_path, logger=self.logger)
+                      cassette_path=self.cassette_path, logger=self.logger,
+                      transport=self.transport, timeout=self.timeout)
+        if self.streaming:
+            kwargs['stream'] = True
         if data:
             kwargs['json'] = data
         self.logger.logger.info('vcr request {} {}'.format(args, kwargs))
-        if 1:
-            timeout_execute_request = timeout_decorator.timeout(
-                self.timeout)(self.execute_request)
+        if self.live:
+            self.start_live(args, kwargs)
+            return
+        if self.asynchronous:
+            self.send_async(args, kwargs)
+            return
+        try:
+            self.resp, is_cached = self.fetch(*args, **kwargs)
+            self.logger.logger.info('result request {}'.format(self.resp))
+        except requests.exceptions.Timeout as exc:
+            self.show_timeout(exc)
+            btn.button_style = 'primary'
+            btn.disabled = False
+            raise
+        except DownloadAborted as exc:
+            self.show_aborted(exc)
+            return
+        self.handle_response(self.resp, is_cached)
+
+    def send_async(self, args: List, kwargs: Dict) -> None:
+        """
+        Execute a request in a background worker and return immediately.
+
+        The response is shown when it arrives. A request still in flight
+        from an earlier click is cancelled.
+        """
+        self.cancel_request()
+        self.idle.clear()
+        future = executor.submit(self.fetch, *args, **kwargs)
+        self.future = future
+        self.set_status('Status: In flight...', self.cancel_btn)
+        future.add_done_callback(self.request_finished)
+
+    def request_finished(self, future: Future) -> None:
+        "Callback to be called when a request in a background worker is done."
+
+        if future is not self.future:
+            # cancelled or superseded by a newer request, drop the result
+            self.logger.logger.info('dropped result of cancelled request')
+            if not future.cancelled() and future.exception() is None:
+                future.result()[0].close()
+            return
+        self.future = None
+        try:
+            exc = future.exception()
+            if isinstance(exc, requests.exceptions.Timeout):
+                self.show_timeout(exc)
+            elif isinstance(exc, DownloadAborted):
+                self.show_aborted(exc)
+            elif exc is not None:
+                self.logger.logger.info('request failed {}'.format(exc))
+                self.set_status('Status: Failed with {}: {}'.format(
+                    exc.__class__.__name__, exc))
+            if exc is not None:
+                self.send_btn.button_style = 'primary'
+                self.send_btn.disabled = False
+                return
+            self.resp, is_cached = future.result()
+            self.handle_response(self.resp, is_cached)
+        finally:
+            self.idle.set()
+
+    def cancel_request(self) -> bool:
+        """
+        Cancel the request in flight, if any, and return True if there was one.
+
+        A request already sent to the server cannot be interrupted, but its
+        response will be discarded when it arrives. A download in progress
+        is aborted.
+        """
+        future = self.future
+        if future is None or future.done():
+            return False
+        self.future = None
+        future.cancel()
+        if self.download is not None:
+            self.download.abort()
+        self.logger.logger.info('cancelled request')
+        self.set_status('Status: Cancelled.')
+        self.send_btn.button_style = 'primary'
+        self.send_btn.disabled = False
+        self.idle.set()
+        return True
+
+    def cancel_clicked(self, btn: Button) -> None:
+        "Callback to be called when the Cancel button is clicked."
+
+        self.cancel_request()
+
+    def abort_download(self) -> bool:
+        "Abort the download in progress, if any, and return True if there was one."
+
+        download = self.download
+        if download is None or download.finished is not None or download.aborted:
+            return False
+        download.abort()
+        self.logger.logger.info('aborted download')
+        return True
+
+    def abort_clicked(self, btn: Button) -> None:
+        "Callback to be called when the Abort button is clicked."
+
+        self.abort_download()
+
+    def download_body(self,
+                      resp: requests.models.Response,
+                      deadline: Optional[float] = None) -> None:
+        """
+        Download the body of a streamed response, showing progress and previews.
+
+        The status line shows the bytes received and the transfer rate, and
+        incremental views preview the body, both updated at most every
+        ``progress_interval`` seconds. DeadlineExceeded is raised when the
+        total deadline of the request passes, a ``time.monotonic()`` value.
+        """
+        if self.download is not None:
+            self.download.close()
+        download = Download(resp, spool_size=self.spool_size, deadline=deadline,
+                            max_content=self.max_content)
+        self.download = download
+        progress = FloatProgress(min=0, max=1, layout=Layout(width='200px'))
+        self.set_status('Status: Downloading...', progress,
+                        self.stop_btn if self.live else self.abort_btn)
+        status_htm = self.resp_htm.children[1]
+        viewers = self.begin_previews(resp)
+        last = 0.0
+
+        def update() -> None:
+            total = '' if download.total is None else ' of {:,}'.format(download.total)
+            text = 'Status: Downloading {:,}{} Bytes, {}'.format(
+                download.wire_bytes, total, format_rate(download.rate))
+            if self.live and self.event_log is not None and self.event_log.num_events:
+                text += ', {:,} events, {:.1f} events/s'.format(
+                    self.event_log.num_events, self.event_log.rate())
+            status_htm.value = text
+            progress.value = download.fraction or 0
+            for viewer in viewers:
+                viewer.refresh()
+
+        def on_chunk(chunk: bytes) -> None:
+            nonlocal last
+            for viewer in viewers:
+                viewer.feed(chunk)
+            now = time.monotonic()
+            if now - last >= self.progress_interval:
+                last = now
+                update()
+
+        download.read(on_chunk)
+        update()
+        self.logger.logger.info('downloaded {} bytes in {:.3f} secs'.format(
+            download.received, download.elapsed))
+
+    def begin_previews(self, resp: requests.models.Response) -> List[ResponseView]:
+        "Add previews of incremental views for a response being downloaded and return the views."
+
+        maintype, subtype, params = parse_content_type(resp.headers.get('Content-Type'))
+        view_classes = [RawResponseView] + self.view_registry.views_for(f'{maintype}/{subtype}')
+        content_tab = self.resp_pane.get_child_named('Content')
+        self.partial_viewers = OrderedDict()
+        for ViewClass in view_classes:
+            if not ViewClass.incremental or ViewClass.name in self.partial_viewers:
+                continue
+            viewer = ViewClass(owner=self)
+            widget = viewer.begin(resp)
+            if widget is None:
+                continue
+            self.partial_viewers[ViewClass.name] = viewer
+            if ViewClass.name == 'Raw':
+                content_tab.replace_child_named('Raw', widget)
+            else:
+                content_tab.add_child_named(widget, ViewClass.name)
+        self.resp_pane.selected_index = 0
+        return list(self.partial_viewers.values())
+
+    def start_live(self, args: List, kwargs: Dict) -> None:
+        """
+        Consume responses in a thread of their own, re-sending the request
+        whenever one ends, until stopped.
+
+        Bodies are downloaded in streaming mode and previewed while they
+        arrive, so event streams show their events live, and are shown
+        completely when they end, like the results of long polls. Event
+        streams continue with a Last-Event-ID header after a delay sent by
+        the server, other responses after ``live_retry`` seconds. Events
+        are collected in ``event_log`` over all responses. Only connect
+        timeouts are used, as streams may be idle for a long time.
+        """
+        self.stop_live()
+        self.live_stop = threading.Event()
+        self.event_log = EventLog(EventStreamResponseView.max_events)
+        timeouts = Timeouts(connect=as_timeouts(self.timeout).connect)
+        kwargs = dict(kwargs, stream=True, timeout=timeouts)
+        self.idle.clear()
+        self.set_status('Status: Connecting...', self.stop_btn)
+        future = run_in_thread(self.run_live, args, kwargs, self.live_stop)
+        self.live_future = future
+        future.add_done_callback(self.live_finished)
+
+    def run_live(self, args: List, kwargs: Dict, stop: threading.Event) -> None:
+        "Send a request and show its response again and again, until stopped."
+
+        event_log = self.event_log
+        while not stop.is_set():
+            headers = dict(kwargs.get('headers') or {})
+            if event_log is not None and event_log.last_id:
+                headers['Last-Event-ID'] = event_log.last_id
             try:
-                self.logger.logger.info('callign timeout_execute_request')
-                self.resp, is_cached = timeout_execute_request(*args, **kwargs)
-                self.logger.logger.info('result request {}'.format(self.resp))
-            except timeout_decorator.TimeoutError:
-                self.logger.logger.info('timed out')
-                self.resp_htm = HBox([
-                    HTML('Response'),
-                    HTML('Status: Timed out after {:.3f} secs.'.format(
-                        self.timeout))
-                ],
-                    layout=Layout(width='100%', justify_content='space-between'))
-                raise
-        else:
-            self.resp, is_cached = self.execute_request(*args, **kwargs)
-        self.logger.logger.info(self.resp.content)
+                resp, is_cached = self.fetch(*args, **dict(kwargs, headers=headers))
+            except DownloadAborted:
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                self.logger.logger.info('live request failed {}'.format(exc))
+                message = 'Failed with {}'.format(exc.__class__.__name__)
+            else:
+                if stop.is_set():
+                    break
+                self.resp = resp
+                self.handle_response(resp, is_cached)
+                if resp.status_code >= 400:
+                    break
+                message = 'Response ended'
+            retry = self.live_retry
+            if event_log is not None and event_log.retry is not None:
+                retry = event_log.retry / 1000
+            self.set_status('Status: {}, sending again in {:.1f} secs...'.format(
+                message, retry), self.stop_btn)
+            self.send_btn.disabled = True
+            stop.wait(retry)
+
+    def live_finished(self, future: Future) -> None:
+        "Callback to be called when live mode has ended."
+
+        try:
+            exc = future.exception()
+            if isinstance(exc, requests.exceptions.Timeout):
+                self.show_timeout(exc)
+            elif exc is not None:
+                self.logger.logger.info('live mode failed {}'.format(exc))
+                self.set_status('Status: Failed with {}: {}'.format(
+                    exc.__class__.__name__, exc))
+            elif self.live_stop.is_set():
+                self.set_status('Status: Stopped.')
+            self.send_btn.button_style = 'primary'
+            self.send_btn.disabled = False
+        finally:
+            self.idle.set()
+
+    def stop_live(self) -> bool:
+        "Stop live mode, if running, and return True if it was."
+
+        future = self.live_future
+        if future is None or future.done():
+            return False
+        self.live_stop.set()
+        download = self.download
+        if download is not None:
+            download.abort()
+        self.logger.logger.info('stopped live mode')
+        return True
+
+    def stop_clicked(self, btn: Button) -> None:
+        "Callback to be called when the Stop button is clicked."
+
+        self.stop_live()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        "Wait until no request is in flight, return False on timeout."
+
+        return self.idle.wait(timeout)
+
+    def show_timeout(self, exc: requests.exceptions.Timeout) -> None:
+        "Show which phase of a request timed out in the status line."
+
+        phase = timeout_phase(exc)
+        budget = getattr(as_timeouts(self.timeout), phase)
+        self.logger.logger.info('timed out ({})'.format(phase))
+        self.set_status('Status: Timed out ({}) after {:.3f} secs.'.format(
+            phase, budget or 0))
+
+    def show_aborted(self, exc: DownloadAborted) -> None:
+        "Show that a download was aborted in the status line."
+
+        self.logger.logger.info(str(exc))
+        self.set_status(f'Status: {exc}.')
+        self.send_btn.button_style = 'primary'
+        self.send_btn.disabled = False
+
+    def handle_response(self,
+                        resp: requests.models.Response,
+                        is_cached: bool) -> None:
+        "Post-process a response and show it."
+
+        self.logger.logger.info('response body of {} bytes'.format(len(resp.content)))
 
         if self.post_process_resp:
-            self.post_process_resp(self.resp)
-        btn.button_style = 'primary'
-        self.show_response(self.resp, is_cached)
-        btn.disabled = False
+            self.post_process_resp(resp)
+        self.send_btn.button_style = 'primary'
+        self.show_response(resp, is_cached)
+        self.send_btn.disabled = False
+
+    def set_status(self, text: str, *extras: Widget) -> None:
+        "Show some text and optional widgets in the response status line."
+
+        self.resp_htm = HBox([HTML('Response'), HTML(text)] + list(extras),
+                             layout=Layout(width='100%', justify_content='space-between'))
+        self.showing_rep_pane = True
+        self.update_ui()
 
     def show_response(self,
                       resp: requests.models.Response,
                       is_cached: bool,
-                      views: Optional[List[ResponseView]] = None) -> None:
-        "Show the HTTP response in various response UI elements."
+                      views: Optional[List[type]] = None) -> None:
+        """
+        Show the HTTP response in various response UI elements.
 
+        The response is rendered by all views registered for its mimetype,
+        or by the given views only. Views that previewed the body while it
+        was downloaded render it completely now. The time needed for
+        decoding and rendering is added to the ``timings`` of the request,
+        which are shown in the status line.
+        """
+        shown = time.perf_counter()
+        timings = self.timings
+        if timings is None or timings.resp is not resp:
+            timings = Timings()
+            timings.resp = resp
+            self.timings = timings
         self.logger.logger.info('response ' + str(resp.headers))
 
         content_tab = self.resp_pane.get_child_named('Content')
 
+        # decoded content shared by all views
+        content = ResponseContent(resp)
+
+        # views previewing the body while it was downloaded, if any
+        partial_viewers, self.partial_viewers = self.partial_viewers, OrderedDict()
+
         # Raw tab
-        viewer = RawResponseView()
-        self.logger.logger.info('0')
-        viewer.render(resp)
-        self.logger.logger.info('0')
+        viewer = partial_viewers.get('Raw')
+        if not isinstance(viewer, RawResponseView):
+            viewer = RawResponseView(owner=self)
+        viewer.content = content
+        start = time.perf_counter()
+        content_tab.replace_child_named('Raw', viewer.render(resp))
+        timings.render['Raw'] = time.perf_counter() - start
         self.viewers['Raw'] = viewer
-        try:
-            content_tab.get_child_named('Raw').value = \
-                str(resp.content.decode(resp.encoding)) \
-                if resp.encoding else str(resp.content)
-        except UnicodeDecodeError:
-            content_tab.get_child_named('Raw').value = str(resp.content)
         content_tab.select_child_named('Raw')
         sorted_header_items = OrderedDict(
             sorted(OrderedDict(resp.headers).items()))
@@ -399,51 +867,63 @@ class Api(VBox):
         self.resp_pane.get_child_named(
             'Cookies').value = str(resp.cookies.items())
 
-        content_type = resp.headers['Content-Type']
-        maintype, subtype, params = re.match(
-            '(\w+)/([\.\+\-\w]+)(;.*)?', content_type).groups()
+        maintype, subtype, params = parse_content_type(resp.headers.get('Content-Type'))
         essence = f'{maintype}/{subtype}'
-        self.logger.logger.info(
-            f'maintype: {maintype}, subtype: {subtype}, params: {params}')
-        self.logger.logger.info(f'essence: {essence}')
+        self.logger.logger.info(f'essence: {essence}, params: {params}')
         self.resp_pane.selected_index = 0
         self.showing_rep_pane = True
 
         # status
+        self.sizes = transfer_sizes(resp)
+        download = self.download
+        truncated = False
+        if download is not None and download.resp is resp and download.truncated:
+            truncated = True
+            self.sizes = self.sizes._replace(decoded=download.received)
         kwargs = dict(
             code=resp.status_code,
             reason=resp.reason,
             encoding=resp.encoding,
             elapsed='{:.3f}'.format(resp.elapsed.total_seconds()),
-            # length=resp.headers['Content-Length'],
-            length=resp.headers.get('Content-Length', '?'),
+            size=format_sizes(self.sizes),
             cached=is_cached
         )
-        self.resp_htm = HBox([
-            HTML('Response'),
-            HTML(('Status: {code}/{reason}, Encoding: {encoding}, '
-                  'Time: {elapsed} secs, Length: {length} Bytes, Cached: {cached}').format(**kwargs))
-        ],
-            layout=Layout(width='100%', justify_content='space-between'))
+        if truncated:
+            kwargs['size'] += ', showing the first {:,} Bytes'.format(len(resp.content))
+        timing_htm = HTML()
+        self.set_status(('Status: {code}/{reason}, Encoding: {encoding}, '
+                         'Time: {elapsed} secs, Size: {size}, Cached: {cached}').format(**kwargs),
+                        timing_htm)
 
         # find views able to render the response and add their results to the tab
-        for ViewClass in views or self.views:
+        registry = self.view_registry if views is None else ViewRegistry(views)
+        view_classes = registry.views_for(essence)
+        self.logger.logger.info('views: {}'.format([v.name for v in view_classes]))
+        selected = None
+        for ViewClass in view_classes:
             name = ViewClass.name
-            self.logger.logger.info(f'{name}')
-            for mt_pat in ViewClass.mimetype_pats:
-                self.logger.logger.info(f'{mt_pat} {essence}')
-                if re.match(mt_pat, essence):
-                    self.logger.logger.info(f'{essence}')
-                    viewer = ViewClass(owner=self)
-                    self.viewers[name] = viewer
-                    res = viewer.render(resp)
-                    self.logger.logger.info('data {}'.format(str(viewer.data)))
-                    self.logger.logger.info('rendered')
-                    if res:
-                        content_tab.add_child_named(res, ViewClass.name)
-                        content_tab.select_child_named(ViewClass.name)
-                else:
-                    self.logger.logger.info('skipped')
+            viewer = partial_viewers.get(name)
+            if not isinstance(viewer, ViewClass):
+                viewer = ViewClass(owner=self)
+            viewer.content = content
+            self.viewers[name] = viewer
+            start = time.perf_counter()
+            res = viewer.render(resp)
+            timings.render[name] = time.perf_counter() - start
+            self.logger.logger.info(f'rendered {name}')
+            if res:
+                content_tab.add_child_named(res, name)
+                selected = selected or name
+        # select the view with highest priority
+        if selected:
+            content_tab.select_child_named(selected)
+
+        timings.decode = content.parse_time
+        timings.total = time.perf_counter() - shown
+        if timings.finished is not None:
+            timings.total += timings.finished - timings.started
+        timing_htm.value = timings.summary()
+        self.logger.logger.info(timings.summary())
 
         self.update_ui()
 
@@ -463,7 +943,7 @@ class Api(VBox):
 
         # repsonse pane
         get = self.resp_pane.get_child_named
-        get('Content').get_child_named('Raw').value = ''
+        get('Content').get_child_named('Raw').text = ''
         get('Headers').value = ''
         get('Cookies').value = ''
         content_tab = get('Content')
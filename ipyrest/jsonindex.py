@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""
+An index over a parsed JSON document for searching it as you type.
+
+The document is walked once when the index is built. Queries are answered
+from the index alone, using binary search over sorted keys, words and
+numbers, without walking the document again.
+"""
+
+import re
+import json
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .jsonpath import Path, parse_query, resolve_path
+
+WORD_PAT = re.compile(r'\w+')
+NUMBER = r'-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?'
+COMPARISON_PAT = re.compile(r'\s*(<=|>=|<|>|=)\s*({})\s*$'.format(NUMBER))
+RANGE_PAT = re.compile(r'\s*({0})\s*\.\.\s*({0})\s*$'.format(NUMBER))
+
+
+def preview(value: Any, max_len: int = 60) -> str:
+    "Return a short one-line text for a JSON value."
+
+    if isinstance(value, dict):
+        return '{{…}} {:,} key{}'.format(len(value), '' if len(value) == 1 else 's')
+    if isinstance(value, list):
+        return '[…] {:,} item{}'.format(len(value), '' if len(value) == 1 else 's')
+    text = json.dumps(value, ensure_ascii=False)
+    return text if len(text) <= max_len else text[:max_len] + '…'
+
+
+def number_range(text: str) -> Optional[Tuple[float, float, bool, bool]]:
+    """
+    Return (low, high, low inclusive, high inclusive) for a numeric query.
+
+    Numeric queries are ranges like ``10..20`` or comparisons like ``>= 5``.
+    None is returned for all other queries.
+    """
+    m = RANGE_PAT.match(text)
+    if m:
+        return float(m.group(1)), float(m.group(2)), True, True
+    m = COMPARISON_PAT.match(text)
+    if not m:
+        return None
+    op, num = m.group(1), float(m.group(2))
+    inf = float('inf')
+    return {'<': (-inf, num, True, False),
+            '<=': (-inf, num, True, True),
+            '>': (num, inf, False, True),
+            '>=': (num, inf, True, True),
+            '=': (num, num, True, True)}[op]
+
+
+class JSONIndex(object):
+    """
+    An index of all nodes in a JSON document by key, word and number.
+
+    Nodes are numbered in document order. For every node the index keeps
+    its path and the number of the last node inside it, so the children
+    and descendants of a node are found without touching the document.
+
+    ``find`` accepts three kinds of queries:
+
+    - JSONPath-like queries starting with ``$``, e.g. ``$.items[*]..name``,
+    - numeric ranges like ``10..20`` or comparisons like ``> 5``,
+    - words, matching object keys and words in string values by prefix
+      and case-insensitively. Several words must all match a node.
+
+    Example:
+
+        index = JSONIndex({'users': [{'name': 'Ann', 'age': 42}]})
+        index.search('ann')       # [('users', 0, 'name')]
+        index.search('40..50')    # [('users', 0, 'age')]
+        index.search('$..name')   # [('users', 0, 'name')]
+    """
+
+    def __init__(self, obj: Any, cache_size: int = 64) -> None:
+        "Create an index for some parsed JSON object, walking it once."
+
+        self.obj = obj
+        self.paths = []  # type: List[Path]
+        self.ends = []  # type: List[int]
+        self.ids = {}  # type: Dict[Path, int]
+        self.keys = {}  # type: Dict[str, List[int]]
+        self.words = {}  # type: Dict[str, List[int]]
+        self.numbers = []  # type: List[Tuple[float, int]]
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # type: Dict[str, Set[int]]
+        self.build()
+        self.key_list = sorted(self.keys)
+        self.word_list = sorted(self.words)
+        self.numbers.sort()
+        self.number_values = [num for (num, i) in self.numbers]
+
+    def build(self) -> None:
+        "Walk the document, numbering its nodes in document order."
+
+        stack = [(False, (), self.obj)]  # type: List[Tuple[bool, Path, Any]]
+        while stack:
+            done, path, value = stack.pop()
+            if done:
+                self.ends[value] = len(self.paths) - 1
+                continue
+            i = len(self.paths)
+            self.paths.append(path)
+            self.ends.append(i)
+            self.ids[path] = i
+            if path and isinstance(path[-1], str):
+                self.keys.setdefault(path[-1].lower(), []).append(i)
+            if isinstance(value, dict):
+                stack.append((True, path, i))
+                stack.extend((False, path + (k,), v) for (k, v) in reversed(list(value.items())))
+            elif isinstance(value, list):
+                stack.append((True, path, i))
+                stack.extend((False, path + (k,), value[k]) for k in reversed(range(len(value))))
+            elif isinstance(value, str):
+                for word in set(WORD_PAT.findall(value.lower())):
+                    self.words.setdefault(word, []).append(i)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.numbers.append((float(value), i))
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def value(self, i: int) -> Any:
+        "Return the value of the node with some number."
+
+        return resolve_path(self.obj, self.paths[i])
+
+    def children(self, i: int) -> List[int]:
+        "Return the numbers of the child nodes of a node."
+
+        result = []
+        child, end = i + 1, self.ends[i]
+        while child <= end:
+            result.append(child)
+            child = self.ends[child] + 1
+        return result
+
+    def prefix_ids(self, prefix: str) -> Set[int]:
+        "Return the nodes with a key or a word in their value starting with some prefix."
+
+        prefix = prefix.lower()
+        ids = self._cache.get(prefix)
+        if ids is not None:
+            self._cache.move_to_end(prefix)
+            return ids
+        ids = set()
+        for sorted_list, index in ((self.key_list, self.keys), (self.word_list, self.words)):
+            pos = bisect_left(sorted_list, prefix)
+            while pos < len(sorted_list) and sorted_list[pos].startswith(prefix):
+                ids.update(index[sorted_list[pos]])
+                pos += 1
+        self._cache[prefix] = ids
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return ids
+
+    def number_ids(self, low: float, high: float,
+                   low_inclusive: bool = True, high_inclusive: bool = True) -> List[int]:
+        "Return the nodes with numbers in some range."
+
+        lo = (bisect_left if low_inclusive else bisect_right)(self.number_values, low)
+        hi = (bisect_right if high_inclusive else bisect_left)(self.number_values, high)
+        return [i for (num, i) in self.numbers[lo:hi]]
+
+    def query(self, text: str) -> List[int]:
+        "Return the nodes matching a JSONPath-like query, in document order."
+
+        current = [0]
+        for kind, key in parse_query(text):
+            found = set()  # type: Set[int]
+            for i in current:
+                if kind == 'child':
+                    child_key = key
+                    if isinstance(key, int) and key < 0:
+                        value = self.value(i)
+                        child_key = len(value) + key if isinstance(value, list) else key
+                    child = self.ids.get(self.paths[i] + (child_key,))
+                    if child is not None:
+                        found.add(child)
+                elif kind == 'children':
+                    found.update(self.children(i))
+                elif kind == 'descendants':
+                    found.update(range(i + 1, self.ends[i] + 1))
+                else:
+                    ids = self.keys.get(key.lower(), [])
+                    lo, hi = bisect_right(ids, i), bisect_right(ids, self.ends[i])
+                    found.update(j for j in ids[lo:hi] if self.paths[j][-1] == key)
+            current = sorted(found)
+        return current
+
+    def find(self, text: str) -> List[int]:
+        """
+        Return the nodes matching some query, in document order.
+
+        Raises ValueError for invalid JSONPath-like queries.
+        """
+        text = text.strip()
+        if not text:
+            return []
+        if text.startswith('$'):
+            return self.query(text)
+        num_range = number_range(text)
+        if num_range is not None:
+            return sorted(self.number_ids(*num_range))
+        words = WORD_PAT.findall(text)
+        if not words:
+            return []
+        ids = set(self.prefix_ids(words[0]))
+        for word in words[1:]:
+            ids &= self.prefix_ids(word)
+        return sorted(ids)
+
+    def search(self, text: str, limit: Optional[int] = None) -> List[Path]:
+        "Return the paths of nodes matching some query, at most limit many."
+
+        return [self.paths[i] for i in self.find(text)[:limit]]
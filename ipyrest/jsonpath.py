@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+"""
+Paths into JSON documents in a JSONPath-like notation like ``$.a.b[123]``.
+
+A path is represented as a tuple of keys, strings for object members and
+integers for array items, e.g. ``('a', 'b', 123)``.
+"""
+
+import re
+import json
+from typing import Any, Tuple, Union
+
+Key = Union[str, int]
+Path = Tuple[Key, ...]
+
+IDENTIFIER_PAT = re.compile(r'[A-Za-z_$][\w$\-]*$')
+PATH_TOKEN_PAT = re.compile(r"""
+    \.(?P<name>[^.\[\]]+)               # .name
+  | \[\s*(?P<index>-?\d+)\s*\]          # [123]
+  | \[\s*(?P<quoted>'(?:[^'\\]|\\.)*'  # ['name']
+                   |"(?:[^"\\]|\\.)*")\s*\]
+""", re.X)
+
+
+def parse_path(text: str) -> Path:
+    """
+    Return the keys of a path like ``$.a["b c"][123]``.
+
+    The leading ``$`` is optional. Raises ValueError for invalid paths.
+    """
+    text = text.strip()
+    if text.startswith('$'):
+        text = text[1:]
+    keys = []
+    pos = 0
+    while pos < len(text):
+        m = PATH_TOKEN_PAT.match(text, pos)
+        if not m:
+            raise ValueError(f'Invalid path at position {pos}: {text}')
+        if m.group('name') is not None:
+            keys.append(m.group('name'))
+        elif m.group('index') is not None:
+            keys.append(int(m.group('index')))
+        else:
+            quoted = m.group('quoted')
+            if quoted.startswith("'"):
+                quoted = '"' + quoted[1:-1].replace('"', '\\"').replace("\\'", "'") + '"'
+            keys.append(json.loads(quoted))
+        pos = m.end()
+    return tuple(keys)
+
+
+def format_key(key: Key) -> str:
+    "Return the path notation for a single key."
+
+    if isinstance(key, int):
+        return f'[{key}]'
+    if IDENTIFIER_PAT.match(key):
+        return f'.{key}'
+    return '[{}]'.format(json.dumps(key))
+
+
+def format_path(keys: Path) -> str:
+    "Return the notation for a path given as keys, like ``$.a.b[123]``."
+
+    return '$' + ''.join(format_key(k) for k in keys)
+
+
+def resolve_path(obj: Any, keys: Path) -> Any:
+    """
+    Return the value at some path inside a JSON object.
+
+    Raises KeyError if there is no such value.
+    """
+    for key in keys:
+        try:
+            if isinstance(obj, list) and isinstance(key, int):
+                obj = obj[key]
+            elif isinstance(obj, dict) and isinstance(key, str):
+                obj = obj[key]
+            else:
+                raise KeyError(key)
+        except IndexError:
+            raise KeyError(key)
+    return obj
+
+
+# Queries
+
+QUERY_TOKEN_PAT = re.compile(r"""
+    \.\.(?P<descendant>[^.\[\]]+)       # ..name or ..*
+  | \.(?P<name>[^.\[\]]+)               # .name or .*
+  | \[\s*(?P<index>-?\d+)\s*\]          # [123]
+  | \[\s*(?P<wildcard>\*)\s*\]          # [*]
+  | \[\s*(?P<quoted>'(?:[^'\\]|\\.)*'  # ['name']
+                   |"(?:[^"\\]|\\.)*")\s*\]
+""", re.X)
+
+Step = Tuple[str, Any]
+
+
+def parse_query(text: str) -> Tuple[Step, ...]:
+    """
+    Return the steps of a JSONPath-like query like ``$.a[*]..b``.
+
+    Steps are ``('child', key)``, ``('children', None)`` for ``.*`` and
+    ``[*]``, ``('descendant', key)`` for ``..key`` and ``('descendants', None)``
+    for ``..*``. Raises ValueError for invalid queries.
+    """
+    text = text.strip()
+    if text.startswith('$'):
+        text = text[1:]
+    steps = []
+    pos = 0
+    while pos < len(text):
+        m = QUERY_TOKEN_PAT.match(text, pos)
+        if not m:
+            raise ValueError(f'Invalid query at position {pos}: {text}')
+        descendant, name = m.group('descendant'), m.group('name')
+        if descendant is not None:
+            steps.append(('descendants', None) if descendant == '*' else
+                         ('descendant', descendant))
+        elif name is not None:
+            steps.append(('children', None) if name == '*' else ('child', name))
+        elif m.group('index') is not None:
+            steps.append(('child', int(m.group('index'))))
+        elif m.group('wildcard') is not None:
+            steps.append(('children', None))
+        else:
+            steps.append(('child', parse_path('[{}]'.format(m.group('quoted')))[0]))
+        pos = m.end()
+    return tuple(steps)
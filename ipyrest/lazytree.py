@@ -0,0 +1,386 @@
+# -*- coding: utf-8 -*-
+
+"""
+A collapsible tree widget building its nodes only on demand.
+
+The tree asks a ``TreeModel`` for the number of children of a node and for
+their keys and labels only when the node is expanded, and even then only
+for one page of children at a time. This keeps the number of widgets small
+for documents with tens of thousands of nodes.
+"""
+
+import html
+from typing import Any, Dict, List, Optional
+
+from ipywidgets import HBox, VBox, Button, HTML, Layout
+
+from .jsonpath import Key, Path, format_path, resolve_path
+
+
+class TreeModel(object):
+    """
+    Abstract model of a tree shown in a LazyTree.
+
+    Nodes are identified by paths, tuples of keys leading from the root,
+    which has the empty path ``()``.
+    """
+
+    def num_children(self, path: Path) -> int:
+        "Return the number of children of a node."
+
+        raise NotImplementedError
+
+    def child_key(self, path: Path, index: int) -> Key:
+        "Return the key of the child at some position of a node."
+
+        raise NotImplementedError
+
+    def child_index(self, path: Path, key: Key) -> int:
+        "Return the position of the child with some key, raise KeyError if missing."
+
+        raise NotImplementedError
+
+    def label(self, path: Path) -> str:
+        "Return an HTML label for a node."
+
+        raise NotImplementedError
+
+
+def summary(value: Any, max_len: int = 80) -> str:
+    "Return a short HTML summary of a JSON value, counting children of containers."
+
+    if isinstance(value, dict):
+        n = len(value)
+        return '{{&hellip;}} <i>{:,} key{}</i>'.format(n, '' if n == 1 else 's')
+    if isinstance(value, list):
+        n = len(value)
+        return '[&hellip;] <i>{:,} item{}</i>'.format(n, '' if n == 1 else 's')
+    text = json_scalar(value)
+    if len(text) > max_len:
+        text = text[:max_len] + '…'
+    return html.escape(text)
+
+
+def json_scalar(value: Any) -> str:
+    "Return the JSON notation of a scalar value."
+
+    if isinstance(value, str):
+        return '"{}"'.format(value.replace('\\', '\\\\').replace('"', '\\"'))
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+class JSONTreeModel(TreeModel):
+    """
+    A tree model for a parsed JSON document.
+
+    Object keys are listed in document order. Key lists and key positions
+    of objects are computed once per expanded object and cached.
+    """
+
+    def __init__(self, obj: Any) -> None:
+        "Create a model for some parsed JSON object."
+
+        self.obj = obj
+        self._keys = {}  # type: Dict[Path, List[str]]
+        self._positions = {}  # type: Dict[Path, Dict[str, int]]
+
+    def value(self, path: Path) -> Any:
+        "Return the value at some path, raise KeyError if missing."
+
+        return resolve_path(self.obj, path)
+
+    def keys(self, path: Path) -> List[str]:
+        "Return the keys of the object at some path."
+
+        keys = self._keys.get(path)
+        if keys is None:
+            keys = self._keys[path] = list(self.value(path))
+        return keys
+
+    def num_children(self, path: Path) -> int:
+        value = self.value(path)
+        return len(value) if isinstance(value, (dict, list)) else 0
+
+    def child_key(self, path: Path, index: int) -> Key:
+        value = self.value(path)
+        if isinstance(value, list):
+            return index
+        return self.keys(path)[index]
+
+    def child_index(self, path: Path, key: Key) -> int:
+        value = self.value(path)
+        if isinstance(value, list):
+            if not isinstance(key, int) or not 0 <= key < len(value):
+                raise KeyError(key)
+            return key
+        positions = self._positions.get(path)
+        if positions is None:
+            keys = self.keys(path)
+            positions = self._positions[path] = dict(zip(keys, range(len(keys))))
+        return positions[key]
+
+    def label(self, path: Path) -> str:
+        value = self.value(path)
+        if not path:
+            name = '$'
+        elif isinstance(path[-1], int):
+            name = '[{}]'.format(path[-1])
+        else:
+            name = html.escape(path[-1])
+        return '<b>{}</b>: {}'.format(name, summary(value))
+
+
+class XMLTreeModel(TreeModel):
+    """
+    A tree model for an XMLIndex.
+
+    Keys are element numbers, the root node is the root element. Child
+    lists and positions are computed once per expanded element and cached.
+    """
+
+    def __init__(self, index) -> None:
+        "Create a model for some XMLIndex."
+
+        self.index = index
+        self._children = {}  # type: Dict[int, List[int]]
+        self._positions = {}  # type: Dict[int, Dict[int, int]]
+
+    def element(self, path: Path) -> int:
+        "Return the number of the element at some path."
+
+        return path[-1] if path else 0
+
+    def children(self, path: Path) -> List[int]:
+        "Return the numbers of the child elements of the element at some path."
+
+        i = self.element(path)
+        children = self._children.get(i)
+        if children is None:
+            children = self._children[i] = self.index.children(i)
+        return children
+
+    def path(self, i: int) -> Path:
+        "Return the path of the element with some number."
+
+        return tuple(self.index.ancestors(i)[1:])
+
+    def num_children(self, path: Path) -> int:
+        return self.index.num_children[self.element(path)]
+
+    def child_key(self, path: Path, index: int) -> Key:
+        return self.children(path)[index]
+
+    def child_index(self, path: Path, key: Key) -> int:
+        i = self.element(path)
+        positions = self._positions.get(i)
+        if positions is None:
+            children = self.children(path)
+            positions = self._positions[i] = dict(zip(children, range(len(children))))
+        return positions[key]
+
+    def label(self, path: Path) -> str:
+        index = self.index
+        i = self.element(path)
+        tag = index.tags[i]
+        name = tag.rsplit('}', 1)[-1]
+        attribs = ''.join(' {}="{}"'.format(html.escape(k.rsplit('}', 1)[-1]), html.escape(v))
+                          for (k, v) in index.attribs[i].items())
+        label = '<b title="{}">{}</b>{}'.format(html.escape(tag), html.escape(name), attribs)
+        n, total = index.num_children[i], index.ends[i] - i
+        if n:
+            label += ' <i>{:,} child{}, {:,} element{}</i>'.format(
+                n, '' if n == 1 else 'ren', total, '' if total == 1 else 's')
+        if index.texts[i]:
+            label += ': ' + html.escape(index.texts[i])
+        return label
+
+
+class TreeNode(VBox):
+    """
+    A node of a LazyTree with a toggle button, a label and, once expanded,
+    one page of child nodes.
+    """
+
+    def __init__(self, tree: 'LazyTree', path: Path) -> None:
+        "Create a collapsed node, not building any child nodes yet."
+
+        super().__init__()
+        self.tree = tree
+        self.path = path
+        self.num_children = tree.model.num_children(path)
+        self.offset = 0
+        self.expanded = False
+        self.child_nodes = {}  # type: Dict[Key, TreeNode]
+
+        self.label_htm = HTML(tree.model.label(path))
+        if self.num_children:
+            self.toggle_btn = Button(description='+', tooltip=format_path(path),
+                                     layout=Layout(width='28px'))
+            self.toggle_btn.on_click(lambda btn: self.toggle())
+        else:
+            self.toggle_btn = HTML(layout=Layout(width='28px'))
+        self.header_hbx = HBox([self.toggle_btn, self.label_htm])
+        self.children_vbx = VBox(layout=Layout(margin='0 0 0 20px'))
+        self.pager_hbx = None  # type: Optional[HBox]
+        self.children = (self.header_hbx,)
+
+    def create_pager(self) -> HBox:
+        "Return controls to page through the children of this node."
+
+        prev_btn = Button(description='<', tooltip='Previous page',
+                          layout=Layout(width='36px'))
+        next_btn = Button(description='>', tooltip='Next page',
+                          layout=Layout(width='36px'))
+        prev_btn.on_click(lambda btn: self.show_page(self.offset - self.tree.page_size))
+        next_btn.on_click(lambda btn: self.show_page(self.offset + self.tree.page_size))
+        self.page_htm = HTML()
+        return HBox([prev_btn, next_btn, self.page_htm],
+                    layout=Layout(margin='0 0 0 20px'))
+
+    def show_page(self, offset: int) -> None:
+        """
+        Show the page of child nodes beginning at some child position.
+
+        Child nodes are built for the new page only, the ones of the
+        previous page are closed.
+        """
+        page_size = self.tree.page_size
+        offset = max(0, min(offset, self.num_children - 1))
+        offset -= offset % page_size
+        end = min(offset + page_size, self.num_children)
+        model = self.tree.model
+        keys = [model.child_key(self.path, i) for i in range(offset, end)]
+        nodes = {}  # type: Dict[Key, TreeNode]
+        for key in keys:
+            node = self.child_nodes.pop(key, None)
+            nodes[key] = node or TreeNode(self.tree, self.path + (key,))
+        for node in self.child_nodes.values():
+            node.close_all()
+        self.child_nodes = nodes
+        self.offset = offset
+        self.children_vbx.children = [nodes[key] for key in keys]
+        if self.pager_hbx is not None:
+            self.page_htm.value = 'Items {:,}&ndash;{:,} of {:,}'.format(
+                offset, end - 1, self.num_children)
+
+    def expand(self) -> None:
+        "Show the current page of children, building them if needed."
+
+        if self.expanded or not self.num_children:
+            return
+        if self.num_children > self.tree.page_size and self.pager_hbx is None:
+            self.pager_hbx = self.create_pager()
+        if not self.child_nodes:
+            self.show_page(self.offset)
+        self.expanded = True
+        self.toggle_btn.description = '-'
+        extra = (self.pager_hbx,) if self.pager_hbx is not None else ()
+        self.children = (self.header_hbx,) + extra + (self.children_vbx,)
+
+    def collapse(self) -> None:
+        "Hide all children, keeping those already built."
+
+        if not self.expanded:
+            return
+        self.expanded = False
+        self.toggle_btn.description = '+'
+        self.children = (self.header_hbx,)
+
+    def toggle(self) -> None:
+        "Expand this node if collapsed, collapse it otherwise."
+
+        self.collapse() if self.expanded else self.expand()
+
+    def child(self, key: Key) -> 'TreeNode':
+        "Return the child node with some key, showing the page containing it."
+
+        node = self.child_nodes.get(key)
+        if node is None:
+            index = self.tree.model.child_index(self.path, key)
+            self.show_page(index)
+            node = self.child_nodes[key]
+        return node
+
+    def iter_nodes(self):
+        "Iterate over this node and all child nodes built below it."
+
+        yield self
+        for node in self.child_nodes.values():
+            yield from node.iter_nodes()
+
+    def close_all(self) -> None:
+        "Close the widgets of this node and of all nodes built below it."
+
+        for node in self.child_nodes.values():
+            node.close_all()
+        for w in (self.toggle_btn, self.label_htm, self.header_hbx, self.children_vbx):
+            w.close()
+        if self.pager_hbx is not None:
+            for w in self.pager_hbx.children:
+                w.close()
+            self.pager_hbx.close()
+        self.close()
+
+
+class LazyTree(VBox):
+    """
+    A collapsible tree showing a TreeModel, building nodes on demand.
+
+    Expanded nodes show at most ``page_size`` children at a time with
+    controls to page through the rest. Nodes can be revealed by path,
+    expanding their ancestors and showing the right pages on the way.
+
+    Example:
+
+        tree = LazyTree(JSONTreeModel({'a': {'b': list(range(1000))}}))
+        tree.reveal(('a', 'b', 123))
+    """
+
+    def __init__(self, model: TreeModel, page_size: int = 100, **kwargs) -> None:
+        "Create a tree for some model with the root node expanded."
+
+        super().__init__(**kwargs)
+        self.model = model
+        self.page_size = page_size
+        self.selected = None  # type: Optional[TreeNode]
+        self.root = TreeNode(self, ())
+        self.root.expand()
+        self.children = (self.root,)
+
+    @property
+    def num_nodes(self) -> int:
+        "The number of nodes built so far."
+
+        return sum(1 for node in self.root.iter_nodes())
+
+    def node(self, path: Path) -> TreeNode:
+        """
+        Return the node with some path, building it if needed.
+
+        Raises KeyError if there is no such node.
+        """
+        node = self.root
+        for key in path:
+            node = node.child(key)
+        return node
+
+    def reveal(self, path: Path) -> TreeNode:
+        """
+        Expand all ancestors of a node, mark it as selected and return it.
+
+        Raises KeyError if there is no such node.
+        """
+        node = self.root
+        for key in path:
+            node.expand()
+            node = node.child(key)
+        if self.selected is not None:
+            self.selected.label_htm.value = self.model.label(self.selected.path)
+        label = self.model.label(node.path)
+        node.label_htm.value = f'<span style="background-color:#ffff99">{label}</span>'
+        self.selected = node
+        return node
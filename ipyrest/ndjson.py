@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Incremental parsing of newline-delimited JSON (NDJSON, JSON lines) bodies.
+
+Records are parsed as soon as their line is complete, so result streams
+can be observed while they arrive. Only a bounded number of the most
+recent records is kept, together with counts over all of them, so memory
+does not grow with the length of the stream.
+"""
+
+import html
+import json
+from collections import Counter, deque
+from typing import Deque, List, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas
+
+
+class RecordStream(object):
+    """
+    A parser for NDJSON records fed in chunks of any size.
+
+    The ``max_records`` most recent records are kept in ``recent``. All
+    records are counted in ``num_records``, lines that are no valid JSON in
+    ``num_errors``, the top-level keys of object records in ``key_counts``
+    and the JSON types of records in ``type_counts``. Only the ``max_keys``
+    most common keys are kept when more are seen, e.g. for records keyed
+    by ids, so counts of rare keys are approximate. Record separators of
+    JSON text sequences (RFC 7464) are ignored.
+
+    Example:
+
+        stream = RecordStream(max_records=100)
+        stream.feed(b'{"a": 1}\\n{"a"')
+        stream.feed(b': 2}\\n')
+        stream.close()
+    """
+
+    def __init__(self, max_records: int = 1000, max_keys: int = 1000) -> None:
+        "Create a parser keeping some number of recent records and keys."
+
+        self.max_records = max_records
+        self.max_keys = max_keys
+        self.recent = deque(maxlen=max_records)  # type: Deque[object]
+        self.num_records = 0
+        self.num_errors = 0
+        self.num_bytes = 0
+        self.key_counts = Counter()  # type: Counter
+        self.type_counts = Counter()  # type: Counter
+        self._pending = []  # type: List[bytes]
+
+    def feed(self, chunk: bytes) -> int:
+        "Parse all lines completed by a chunk and return the number of new records."
+
+        self.num_bytes += len(chunk)
+        end = chunk.rfind(b'\n')
+        if end < 0:
+            # no line ends here, avoid joining growing buffers
+            self._pending.append(chunk)
+            return 0
+        head = b''.join(self._pending + [chunk[:end]])
+        self._pending = [chunk[end + 1:]] if end + 1 < len(chunk) else []
+        num_records = self.num_records
+        for line in head.split(b'\n'):
+            self.add_line(line)
+        return self.num_records - num_records
+
+    def close(self) -> int:
+        "Parse a last line not ending with a newline and return the number of new records."
+
+        num_records = self.num_records
+        self.add_line(b''.join(self._pending))
+        self._pending = []
+        return self.num_records - num_records
+
+    def add_line(self, line: bytes) -> None:
+        "Parse one line and count its record, if not empty."
+
+        line = line.strip(b' \t\r\n\x1e')
+        if not line:
+            return
+        try:
+            record = json.loads(line)
+        except ValueError:
+            self.num_errors += 1
+            return
+        self.num_records += 1
+        self.recent.append(record)
+        self.type_counts[type(record).__name__] += 1
+        if isinstance(record, dict):
+            self.key_counts.update(record.keys())
+            if len(self.key_counts) > 2 * self.max_keys:
+                # drop the rarest keys, pruning only now and then
+                self.key_counts = Counter(dict(self.key_counts.most_common(self.max_keys)))
+
+    def summary(self, max_keys: int = 20) -> str:
+        "Return an HTML summary of the counts and the most common keys."
+
+        text = '<b>{:,} records</b>'.format(self.num_records)
+        if self.num_errors:
+            text += ', {:,} invalid lines'.format(self.num_errors)
+        if self.num_records > len(self.recent):
+            text += ', showing the last {:,}'.format(len(self.recent))
+        if self.key_counts:
+            keys = ', '.join('{} ({:,})'.format(html.escape(str(key)), count)
+                             for (key, count) in self.key_counts.most_common(max_keys))
+            text += '<br>Keys: ' + keys
+        return text
+
+    def frame(self) -> 'pandas.DataFrame':
+        "Return the recent records as a pandas DataFrame, objects flattened into columns."
+
+        import pandas as pd
+
+        records = list(self.recent)
+        if records and all(isinstance(r, dict) for r in records):
+            return pd.json_normalize(records)
+        return pd.DataFrame({'value': [json.dumps(r) for r in records]})
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""
+Widgets showing only a page of some large content, text or tables, at a time.
+
+The full content stays in the kernel, only the visible window is sent to
+the browser. This keeps kernel and front end responsive for responses of
+many megabytes.
+"""
+
+from typing import Any, Callable, List, Optional
+
+from ipywidgets import (HBox, VBox, Textarea, Button, BoundedIntText,
+                        HTML, Layout)
+
+
+class PagedText(VBox):
+    """
+    A Textarea showing a window of some long text with paging controls.
+
+    A page has at most ``page_lines`` lines and ``page_chars`` characters.
+    "Load more" appends the next page to the window, which never grows
+    beyond ``max_chars`` characters, dropping lines from its start instead.
+    The window can also jump to some line or character offset. Controls
+    are only shown if the text does not fit on one page.
+
+    Example:
+
+        pt = PagedText(50 * 'Some line.\\n', page_lines=10)
+        pt.load_more()
+        pt.jump_to_line(42)
+    """
+
+    def __init__(self,
+                 text: str = '',
+                 page_lines: int = 500,
+                 page_chars: int = 64 * 1024,
+                 max_chars: int = 1024 * 1024,
+                 **kwargs) -> None:
+        "Create a new widget for some text, showing its first page."
+
+        super().__init__(**kwargs)
+        self.page_lines = page_lines
+        self.page_chars = page_chars
+        self.max_chars = max(max_chars, page_chars)
+        self.start = self.end = 0
+        self._line_starts = None  # type: Optional[List[int]]
+
+        layout = Layout(width='100%', height='100%')
+        self.textarea = Textarea(layout=layout)
+        self.info_htm = HTML()
+        self.more_btn = Button(description='Load more', tooltip='Show next page')
+        self.line_txt = BoundedIntText(description='Line', min=1, max=1, value=1,
+                                       layout=Layout(width='180px'))
+        self.offset_txt = BoundedIntText(description='Offset', min=0, max=0, value=0,
+                                         layout=Layout(width='220px'))
+        self.line_btn = Button(description='Go', tooltip='Jump to line',
+                               layout=Layout(width='50px'))
+        self.offset_btn = Button(description='Go', tooltip='Jump to offset',
+                                 layout=Layout(width='50px'))
+        self.more_btn.on_click(lambda btn: self.load_more())
+        self.line_btn.on_click(lambda btn: self.jump_to_line(self.line_txt.value))
+        self.offset_btn.on_click(lambda btn: self.jump_to_offset(self.offset_txt.value))
+        self.controls_hbx = HBox([self.more_btn, self.line_txt, self.line_btn,
+                                  self.offset_txt, self.offset_btn, self.info_htm])
+        self.text = text
+
+    @property
+    def text(self) -> str:
+        "The full text, of which only a window is shown."
+
+        return self._text
+
+    @text.setter
+    def text(self, text: str) -> None:
+        self._text = text
+        self._line_starts = None
+        self.offset_txt.max = len(text)
+        self.show(0)
+        paged = self.end < len(text)
+        self.children = (self.textarea, self.controls_hbx) if paged else (self.textarea,)
+
+    @property
+    def value(self) -> str:
+        "The text in the visible window."
+
+        return self.textarea.value
+
+    @property
+    def line_starts(self) -> List[int]:
+        "Offsets of the beginning of all lines, computed on first use."
+
+        if self._line_starts is None:
+            starts = [0]
+            find = self._text.find
+            pos = find('\n')
+            while pos >= 0:
+                starts.append(pos + 1)
+                pos = find('\n', pos + 1)
+            self._line_starts = starts
+            self.line_txt.max = len(starts)
+        return self._line_starts
+
+    def page_end(self, start: int) -> int:
+        "Return the offset where a page beginning at some offset ends."
+
+        text = self._text
+        limit = min(len(text), start + self.page_chars)
+        pos = start
+        for i in range(self.page_lines):
+            pos = text.find('\n', pos, limit)
+            if pos < 0:
+                return limit
+            pos += 1
+        return pos
+
+    def show(self, start: int, end: Optional[int] = None) -> None:
+        "Show the text between two offsets, by default one page."
+
+        size = len(self._text)
+        start = max(0, min(start, size))
+        end = self.page_end(start) if end is None else min(end, size)
+        self.start, self.end = start, end
+        window = self._text[start:end]
+        self.textarea.value = window
+        self.textarea.rows = min(10, window.count('\n') + 1)
+        self.info_htm.value = 'Showing {:,}&ndash;{:,} of {:,} characters'.format(
+            start, end, size)
+
+    def load_more(self) -> None:
+        "Append the next page to the window."
+
+        if self.end >= len(self._text):
+            return
+        end = self.page_end(self.end)
+        start = self.start
+        if end - start > self.max_chars:
+            # drop lines from the start of the window, if it gets too big
+            start = end - self.max_chars
+            next_line = self._text.find('\n', start, end)
+            if next_line >= 0:
+                start = next_line + 1
+        self.show(start, end)
+
+    def jump_to_offset(self, offset: int) -> None:
+        """
+        Show the page beginning at the line containing some character offset.
+
+        For lines longer than a page the page begins at the offset itself.
+        """
+        lo = max(0, offset - self.page_chars)
+        pos = self._text.rfind('\n', lo, offset)
+        self.show(pos + 1 if pos >= 0 else 0 if lo == 0 else offset)
+
+    def jump_to_line(self, line: int) -> None:
+        "Show the page beginning at some line (counting from 1)."
+
+        starts = self.line_starts
+        line = max(1, min(line, len(starts)))
+        self.show(starts[line - 1])
+
+
+class PagedGrid(VBox):
+    """
+    An interactive grid showing one page of rows of some table at a time.
+
+    Rows are fetched with ``get_page(offset, count)`` returning a pandas
+    DataFrame, so the table itself may be kept in any compact form on the
+    kernel side. Only the current page is held by the grid widget and sent
+    to the browser. Controls are only shown if there is more than one page.
+
+    Example:
+
+        pg = PagedGrid(lambda offset, count: df.iloc[offset:offset + count], len(df))
+        pg.show_page(3)
+    """
+
+    def __init__(self,
+                 get_page: Callable[[int, int], Any],
+                 num_rows: int,
+                 page_size: int = 100,
+                 **kwargs) -> None:
+        "Create a new grid for some table, showing its first page."
+
+        from qgrid import QGridWidget
+
+        super().__init__(**kwargs)
+        self.get_page = get_page
+        self.num_rows = num_rows
+        self.page_size = page_size
+        self.num_pages = max(1, -(-num_rows // page_size))
+        self.page = 0
+
+        self.grid = QGridWidget(df=get_page(0, page_size))
+        self.info_htm = HTML()
+        self.prev_btn = Button(description='<', tooltip='Previous page',
+                               layout=Layout(width='40px'))
+        self.next_btn = Button(description='>', tooltip='Next page',
+                               layout=Layout(width='40px'))
+        self.page_txt = BoundedIntText(description='Page', min=1, max=self.num_pages,
+                                       value=1, layout=Layout(width='180px'))
+        self.page_btn = Button(description='Go', tooltip='Show page',
+                               layout=Layout(width='50px'))
+        self.prev_btn.on_click(lambda btn: self.show_page(self.page - 1))
+        self.next_btn.on_click(lambda btn: self.show_page(self.page + 1))
+        self.page_btn.on_click(lambda btn: self.show_page(self.page_txt.value - 1))
+        self.controls_hbx = HBox([self.prev_btn, self.next_btn, self.page_txt,
+                                  self.page_btn, self.info_htm])
+        self.update_info()
+        paged = self.num_pages > 1
+        self.children = (self.grid, self.controls_hbx) if paged else (self.grid,)
+
+    def update_info(self) -> None:
+        "Show which rows are shown."
+
+        start = self.page * self.page_size
+        end = min(start + self.page_size, self.num_rows)
+        self.info_htm.value = 'Rows {:,}&ndash;{:,} of {:,}'.format(start, end, self.num_rows)
+
+    def show_page(self, page: int) -> None:
+        "Show the page with some number, counting from 0."
+
+        page = max(0, min(page, self.num_pages - 1))
+        if page == self.page:
+            return
+        self.page = page
+        self.page_txt.value = page + 1
+        self.grid.df = self.get_page(page * self.page_size, self.page_size)
+        self.update_info()
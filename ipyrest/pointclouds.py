@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+
+"""
+Reading and down-sampling of large 3D point clouds for interactive display.
+
+Point clouds are read from text tables, parsed in parallel chunks, or
+from binary formats (raw float32 arrays, NPY and PLY files) mapped onto
+the body without copying it, selected by the content type.
+
+Point clouds of tens of millions of points cannot be sent to a browser.
+The functions here reduce them to a point budget, either by random
+sampling or on a voxel grid, keeping one point per occupied voxel so dense
+and sparse regions stay visible alike. All points returned are points of
+the original cloud.
+"""
+
+import io
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy
+
+
+# Reading point clouds
+
+def text_chunks(data: bytes, num_chunks: int) -> List[bytes]:
+    "Split some text into about num_chunks chunks at line boundaries."
+
+    size = max(1, len(data) // num_chunks)
+    starts = [0]
+    for i in range(1, num_chunks):
+        pos = data.find(b'\n', max(i * size, starts[-1]))
+        if pos < 0:
+            break
+        starts.append(pos + 1)
+    starts.append(len(data))
+    return [data[a:b] for (a, b) in zip(starts, starts[1:]) if b > a]
+
+
+def read_text_points(data: bytes,
+                     num_threads: Optional[int] = None,
+                     chunk_size: int = 4 * 1024 * 1024) -> 'numpy.ndarray':
+    """
+    Return the first three columns of a whitespace separated table as float32.
+
+    A first line not starting with a number is taken as header. Bodies
+    larger than ``chunk_size`` bytes are split into chunks at line
+    boundaries and parsed by pandas in a pool of threads, as its parser
+    releases the GIL.
+    """
+    import numpy as np
+    import pandas as pd
+
+    first_line = data[:data.find(b'\n') + 1 or len(data)]
+    if first_line.strip() and not re.match(rb'\s*[-+.\d]', first_line):
+        data = data[len(first_line):]
+
+    def parse(chunk: bytes) -> 'numpy.ndarray':
+        df = pd.read_csv(io.BytesIO(chunk), sep=r'\s+', header=None, dtype='float32')
+        if len(df.columns) < 3:
+            raise ValueError('Expected at least three columns')
+        return df.iloc[:, :3].to_numpy()
+
+    num_threads = num_threads or os.cpu_count() or 1
+    num_chunks = min(num_threads, max(1, len(data) // chunk_size))
+    if num_chunks == 1:
+        return parse(data) if data.strip() else np.empty((0, 3), dtype='float32')
+    with ThreadPoolExecutor(max_workers=num_threads) as executor:
+        parts = list(executor.map(parse, text_chunks(data, num_chunks)))
+    return np.concatenate(parts)
+
+
+def read_float32_points(data: bytes, columns: int = 3) -> 'numpy.ndarray':
+    """
+    Return points from raw little-endian float32 values, some columns per point.
+
+    The result is a view on the body, nothing is copied.
+    """
+    import numpy as np
+
+    if columns < 3 or len(data) % (4 * columns):
+        raise ValueError(f'Body is no array of {columns} float32 columns')
+    return np.frombuffer(data, dtype='<f4').reshape(-1, columns)[:, :3]
+
+
+def structured_xyz(arr: 'numpy.ndarray') -> 'numpy.ndarray':
+    "Return the x, y and z fields of a structured array as an (N, 3) array."
+
+    import numpy as np
+
+    names = arr.dtype.names or ()
+    if not {'x', 'y', 'z'} <= set(names):
+        raise ValueError('Expected x, y and z fields')
+    return np.column_stack([arr['x'], arr['y'], arr['z']])
+
+
+def read_npy_points(data: bytes) -> 'numpy.ndarray':
+    """
+    Return points from an NPY file with an (N, >=3) array or x, y, z fields.
+
+    Plain arrays are returned as a view on the body, nothing is copied.
+    """
+    import numpy as np
+    from numpy.lib import format as npy_format
+
+    f = io.BytesIO(data)
+    try:
+        version = npy_format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = npy_format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = npy_format.read_array_header_2_0(f)
+    except ValueError as exc:
+        raise ValueError(f'Body is no NPY file: {exc}')
+    if dtype.hasobject:
+        raise ValueError('NPY files with Python objects are not supported')
+    count = int(np.prod(shape))
+    arr = np.frombuffer(data, dtype=dtype, count=count, offset=f.tell())
+    arr = arr.reshape(shape, order='F' if fortran_order else 'C')
+    if dtype.names:
+        return structured_xyz(arr.reshape(-1))
+    if arr.ndim != 2 or arr.shape[1] < 3:
+        raise ValueError(f'Expected an array of shape (N, 3) or more columns, got {shape}')
+    return arr[:, :3]
+
+
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8',
+}
+
+
+def read_ply_points(data: bytes) -> 'numpy.ndarray':
+    """
+    Return the vertices of a PLY file, binary or ASCII, as an (N, 3) array.
+
+    The vertex element must come first and must not have list properties.
+    """
+    import numpy as np
+
+    end = data.find(b'end_header')
+    if not data.startswith(b'ply') or end < 0:
+        raise ValueError('Body is no PLY file')
+    offset = data.index(b'\n', end) + 1
+    fmt = None
+    elements = []  # type: List[Tuple[str, int, List[Tuple[str, str]]]]
+    for line in data[:end].decode('ascii', errors='replace').splitlines():
+        words = line.split()
+        if not words:
+            continue
+        if words[0] == 'format':
+            fmt = words[1]
+        elif words[0] == 'element':
+            elements.append((words[1], int(words[2]), []))
+        elif words[0] == 'property' and elements:
+            if words[1] == 'list':
+                raise ValueError('PLY list properties are not supported')
+            if words[1] not in PLY_TYPES:
+                raise ValueError(f'Unknown PLY type: {words[1]}')
+            elements[-1][2].append((words[2], words[1]))
+    if not elements or elements[0][0] != 'vertex':
+        raise ValueError('Expected vertex as first PLY element')
+    name, count, props = elements[0]
+    if fmt == 'ascii':
+        rows = data[offset:].decode('ascii').split('\n', count)[:count]
+        names = [n for (n, t) in props]
+        table = np.loadtxt(rows, dtype='f8', ndmin=2)
+        return table[:, [names.index(axis) for axis in 'xyz']]
+    byte_order = {'binary_little_endian': '<', 'binary_big_endian': '>'}.get(fmt)
+    if byte_order is None:
+        raise ValueError(f'Unknown PLY format: {fmt}')
+    dtype = np.dtype([(n, byte_order + PLY_TYPES[t]) for (n, t) in props])
+    vertices = np.frombuffer(data, dtype=dtype, count=count, offset=offset)
+    return structured_xyz(vertices)
+
+
+# readers by mimetype essence
+point_readers = {
+    'application/vnd.3d+txt': read_text_points,
+    'application/vnd.3d+float32': read_float32_points,
+    'application/vnd.3d+npy': read_npy_points,
+    'application/x-npy': read_npy_points,
+    'application/ply': read_ply_points,
+    'application/x-ply': read_ply_points,
+}  # type: Dict[str, Callable]
+
+
+def read_point_cloud(data: bytes, content_type: str) -> 'numpy.ndarray':
+    """
+    Return the points in some body as an (N, 3) array, read by content type.
+
+    For raw float32 bodies a ``columns`` parameter gives the number of
+    values per point, e.g. ``application/vnd.3d+float32; columns=4``.
+    Raises ValueError for unknown content types or invalid bodies.
+    """
+    essence, _, params = (content_type or '').partition(';')
+    reader = point_readers.get(essence.strip().lower())
+    if reader is None:
+        raise ValueError(f'No point reader for content type: {content_type}')
+    if reader is read_float32_points:
+        m = re.search(r'columns\s*=\s*(\d+)', params)
+        return read_float32_points(data, columns=int(m.group(1)) if m else 3)
+    return reader(data)
+
+
+# Down-sampling point clouds
+
+
+def random_sample(points: 'numpy.ndarray', n: int, seed: Optional[int] = 0) -> 'numpy.ndarray':
+    "Return the indices of n points chosen at random, in their original order."
+
+    import numpy as np
+
+    if n >= len(points):
+        return np.arange(len(points))
+    rng = np.random.default_rng(seed)
+    return np.sort(rng.choice(len(points), n, replace=False))
+
+
+def voxel_indices(points: 'numpy.ndarray', size: float) -> 'numpy.ndarray':
+    "Return the indices of the first point in every occupied voxel of some size."
+
+    import numpy as np
+
+    cells = np.floor((points[:, :3] - points[:, :3].min(axis=0)) / size).astype(np.int64)
+    # one key per cell, to avoid a slow unique over rows
+    dims = cells.max(axis=0) + 1
+    keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+    unique_keys, first = np.unique(keys, return_index=True)
+    return np.sort(first)
+
+
+def voxel_sample(points: 'numpy.ndarray',
+                 n: int,
+                 presample: int = 8,
+                 max_iterations: int = 12,
+                 seed: Optional[int] = 0) -> 'numpy.ndarray':
+    """
+    Return the indices of n points, one per occupied voxel of a grid.
+
+    The voxel size is searched for which between n and 1.25 * n voxels
+    are occupied, keeping n of them at random. To bound the time needed
+    for huge clouds the grid is fitted to a random sample of
+    ``presample * n`` points only. Fewer indices are returned only if
+    there are not enough distinct points. Points with NaN or infinite
+    values are never chosen, as they cannot be put into any voxel.
+    """
+    import numpy as np
+
+    finite = np.flatnonzero(np.isfinite(points).all(axis=1))
+    if len(finite) < len(points):
+        return finite[voxel_sample(points[finite], n, presample, max_iterations, seed)]
+    if n >= len(points):
+        return np.arange(len(points))
+    candidates = random_sample(points, presample * n, seed=seed)
+    pts = points[candidates]
+    extent = float((pts[:, :3].max(axis=0) - pts[:, :3].min(axis=0)).max())
+    if extent == 0:
+        return candidates[:n]
+    # start with a grid of about n cells, as if the points filled a cube
+    size = extent / max(1.0, n ** (1 / 3))
+    small, large = None, None  # type: Optional[float], Optional[float]
+    best = None
+    for i in range(max_iterations):
+        chosen = voxel_indices(pts, size)
+        if len(chosen) >= n:
+            small, best = size, chosen
+            if len(chosen) <= 1.25 * n:
+                break
+        else:
+            large = size
+        if small is not None and large is not None:
+            size = (small * large) ** 0.5
+        else:
+            size = size / 2 if large is not None else size * 2
+    if best is None:
+        best = chosen
+    if len(best) > n:
+        best = best[random_sample(best, n, seed=seed)]
+    return candidates[best]
+
+
+def downsample(points: 'numpy.ndarray',
+               n: int,
+               method: str = 'voxel',
+               seed: Optional[int] = 0) -> 'numpy.ndarray':
+    "Return at most n points, chosen with some method, 'voxel' or 'random'."
+
+    if n >= len(points):
+        return points
+    if method == 'voxel':
+        return points[voxel_sample(points, n, seed=seed)]
+    if method == 'random':
+        return points[random_sample(points, n, seed=seed)]
+    raise ValueError(f'Unknown down-sampling method: {method}')
+
+
+def level_sizes(num_points: int, budget: int, initial: int, factor: int = 4) -> List[int]:
+    """
+    Return the numbers of points shown in successive levels of detail.
+
+    Levels start with ``initial`` points and grow by some factor up to
+    the budget or the number of points available.
+    """
+    limit = min(num_points, budget)
+    sizes = []
+    size = min(initial, limit)
+    while size < limit:
+        sizes.append(size)
+        size *= factor
+    sizes.append(limit)
+    return sizes
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+
+"""
+Decoding of Protobuf response bodies, with or without a schema.
+
+Message types are registered per content type or URL pattern, either as
+generated message classes or by name together with a serialized
+``FileDescriptorSet`` (as written by ``protoc --descriptor_set_out``).
+Descriptor sets are loaded into one pool once and message classes built
+from them are cached, so nothing is imported or compiled per response.
+
+Bodies without a registered type are decoded from the wire format only,
+like ``protoc --decode_raw`` does, showing field numbers instead of names.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+
+# Schema-less decoding of the wire format
+
+WIRE_VARINT, WIRE_I64, WIRE_LEN, WIRE_I32 = 0, 1, 2, 5
+
+
+def read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    "Return a varint read from some position and the position after it."
+
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError('Truncated varint')
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+        if shift >= 70:
+            raise ValueError('Varint too long')
+
+
+def is_text(value: bytes) -> bool:
+    "Return if some bytes are printable UTF-8 text."
+
+    try:
+        text = value.decode('utf-8')
+    except UnicodeDecodeError:
+        return False
+    return all(c.isprintable() or c in '\t\n\r' for c in text)
+
+
+def decode_raw(data: bytes, max_depth: int = 16) -> List[Tuple[int, int, Any]]:
+    """
+    Return the fields of a message as (number, wire type, value) without schema.
+
+    Length-delimited values are kept as text if they are printable UTF-8,
+    decoded as nested messages if possible, and kept as bytes otherwise.
+    Raises ValueError for bodies that are no valid wire format.
+    """
+    fields = []  # type: List[Tuple[int, int, Any]]
+    value = None  # type: Any
+    pos = 0
+    while pos < len(data):
+        key, pos = read_varint(data, pos)
+        number, wire_type = key >> 3, key & 7
+        if number == 0:
+            raise ValueError('Invalid field number 0')
+        if wire_type == WIRE_VARINT:
+            value, pos = read_varint(data, pos)
+        elif wire_type in (WIRE_I64, WIRE_I32):
+            size = 8 if wire_type == WIRE_I64 else 4
+            if pos + size > len(data):
+                raise ValueError('Truncated fixed-size field')
+            value = int.from_bytes(data[pos:pos + size], 'little')
+            pos += size
+        elif wire_type == WIRE_LEN:
+            length, pos = read_varint(data, pos)
+            if pos + length > len(data):
+                raise ValueError('Truncated length-delimited field')
+            chunk = data[pos:pos + length]
+            pos += length
+            value = chunk
+            if is_text(chunk):
+                value = chunk.decode('utf-8')
+            elif max_depth > 0:
+                try:
+                    value = decode_raw(chunk, max_depth - 1)
+                except ValueError:
+                    pass
+        else:
+            raise ValueError(f'Unsupported wire type {wire_type}')
+        fields.append((number, wire_type, value))
+    return fields
+
+
+def quote_bytes(value: bytes) -> str:
+    "Return some bytes quoted like strings in the Protobuf text format."
+
+    return '"{}"'.format(''.join(
+        chr(b) if 32 <= b < 127 and b not in b'"\\' else '\\x{:02x}'.format(b)
+        for b in value))
+
+
+def format_raw(fields: List[Tuple[int, int, Any]], indent: int = 0) -> str:
+    "Return fields decoded without schema as text, like ``protoc --decode_raw``."
+
+    prefix = indent * '  '
+    lines = []
+    for (number, wire_type, value) in fields:
+        if isinstance(value, list):
+            lines.append(f'{prefix}{number} {{')
+            if value:
+                lines.append(format_raw(value, indent + 1))
+            lines.append(f'{prefix}}}')
+        elif isinstance(value, str):
+            lines.append(f'{prefix}{number}: {quote_bytes(value.encode("utf-8"))}')
+        elif isinstance(value, bytes):
+            lines.append(f'{prefix}{number}: {quote_bytes(value)}')
+        elif wire_type == WIRE_I64:
+            lines.append(f'{prefix}{number}: 0x{value:016x}')
+        elif wire_type == WIRE_I32:
+            lines.append(f'{prefix}{number}: 0x{value:08x}')
+        else:
+            lines.append(f'{prefix}{number}: {value}')
+    return '\n'.join(lines)
+
+
+# Registry of message types
+
+# content type parameters naming the message type of a body
+MESSAGE_TYPE_PAT = re.compile(r';\s*(?:proto|messagetype)\s*=\s*"?([\w.]+)"?', re.I)
+
+
+class ProtobufRegistry(object):
+    """
+    A registry of Protobuf message types by content type or URL pattern.
+
+    Message types are given as generated classes or by full name, with
+    their descriptors coming from descriptor sets added to the registry.
+    Patterns are regular expressions searched in the content type and the
+    URL of a response, later registrations take precedence. A ``proto``
+    or ``messageType`` parameter of the content type naming a known type
+    is used before any pattern.
+
+    Example:
+
+        protobuf_types.register(r'/people/', 'tutorial.Person', 'addressbook.desc')
+    """
+
+    def __init__(self) -> None:
+        "Create an empty registry, the descriptor pool is created when needed."
+
+        self.entries = []  # type: List[Tuple[Any, Union[type, str]]]
+        self.pool = None  # type: Any
+        self.files = set()  # type: Set[str]
+        self.classes = {}  # type: Dict[str, type]
+
+    def add_descriptor_set(self, descriptor_set: Union[bytes, str]) -> None:
+        """
+        Add the files of a serialized ``FileDescriptorSet``, or a path to one.
+
+        Files already added before are skipped.
+        """
+        from google.protobuf import descriptor_pb2, descriptor_pool
+
+        if isinstance(descriptor_set, str):
+            with open(descriptor_set, 'rb') as f:
+                descriptor_set = f.read()
+        fds = descriptor_pb2.FileDescriptorSet.FromString(descriptor_set)
+        if self.pool is None:
+            self.pool = descriptor_pool.DescriptorPool()
+        for file_proto in fds.file:
+            if file_proto.name not in self.files:
+                self.pool.Add(file_proto)
+                self.files.add(file_proto.name)
+
+    def register(self,
+                 pattern: str,
+                 message_type: Union[type, str],
+                 descriptor_set: Optional[Union[bytes, str]] = None) -> None:
+        "Register a message class or full message name for some pattern."
+
+        if descriptor_set is not None:
+            self.add_descriptor_set(descriptor_set)
+        self.entries.append((re.compile(pattern), message_type))
+
+    def message_class(self, message_type: Union[type, str]) -> type:
+        """
+        Return the class for a message type, building it once from the pool.
+
+        Raises KeyError for names not found in any added descriptor set.
+        """
+        if not isinstance(message_type, str):
+            return message_type
+        if message_type not in self.classes:
+            if self.pool is None:
+                raise KeyError(message_type)
+            from google.protobuf import message_factory
+
+            descriptor = self.pool.FindMessageTypeByName(message_type)
+            try:
+                message_class = message_factory.GetMessageClass(descriptor)
+            except AttributeError:  # protobuf < 3.20
+                factory = message_factory.MessageFactory(self.pool)
+                message_class = factory.GetPrototype(descriptor)
+            self.classes[message_type] = message_class
+        return self.classes[message_type]
+
+    def lookup(self, content_type: str, url: str = '') -> Optional[type]:
+        "Return the message class for a content type and URL or None."
+
+        m = MESSAGE_TYPE_PAT.search(content_type or '')
+        if m:
+            try:
+                return self.message_class(m.group(1))
+            except KeyError:
+                pass
+        for (pat, message_type) in reversed(self.entries):
+            if pat.search(content_type or '') or pat.search(url or ''):
+                return self.message_class(message_type)
+        return None
+
+
+# default registry used by ProtobufResponseView
+protobuf_types = ProtobufRegistry()
@@ -2,38 +2,125 @@
 
 """
 Default ResponseView classes for ipyrest.
+
+Views declare the mimetypes they can render up front, but import the
+libraries they need for rendering (e.g. ipyleaflet, ipyvolume, pandas)
+only when rendering, so importing ipyrest stays fast.
 """
 
 import re
 import io
+import html
 import json
+import time
+import threading
 from math import log, fabs
-from collections import OrderedDict
-from typing import Dict, Tuple, List, Union, Optional, Any, Callable
+from xml.etree.ElementTree import XMLPullParser, ParseError
+from typing import Dict, Tuple, List, Optional, Any, Callable, TYPE_CHECKING
 
-import geojson
 import requests
-import ipyvolume
-import ipyleaflet
-import pandas as pd
-from ipywidgets import (Widget, HBox, VBox, Text, Textarea,
-                        Button, Layout, Tab, Image, HTML)
-from qgrid import QGridWidget
+from ipywidgets import (Widget, HBox, VBox, Text, Textarea, Select,
+                        Button, Layout, Image, HTML)
+
+from .paging import PagedText, PagedGrid
+from .jsonpath import parse_path, format_path
+from .jsonindex import JSONIndex, preview
+from .ndjson import RecordStream
+from .events import EventLog
+from .xmlindex import XMLIndex, local_name
+from .lazytree import LazyTree, JSONTreeModel, XMLTreeModel
+from .simplify import simplify_geojson, tolerance_for_zoom
+from .tables import read_csv_frame, read_arrow_table, table_summary
+from .pointclouds import downsample, level_sizes, read_point_cloud
+from .protobufs import decode_raw, format_raw, protobuf_types
+
+if TYPE_CHECKING:
+    import numpy
+    import ipyleaflet
 
 
 # Bounding box functions related to GeoJSONResponseView
 
-def geojson_bbox(gj_object) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+def position_arrays(gj_object) -> List[Any]:
+    """
+    Return the sequences of positions inside a GeoJSON object.
+
+    Every Point and every LineString or ring of some geometry gives one
+    sequence. Features, FeatureCollections and GeometryCollections are
+    walked in one pass, nothing is converted or copied.
+    """
+    arrays = []
+    stack = [gj_object]
+    while stack:
+        obj = stack.pop()
+        if not isinstance(obj, dict):
+            continue
+        gtype = obj.get('type')
+        if gtype == 'FeatureCollection':
+            stack.extend(reversed(obj.get('features') or []))
+        elif gtype == 'Feature':
+            stack.append(obj.get('geometry'))
+        elif gtype == 'GeometryCollection':
+            stack.extend(reversed(obj.get('geometries') or []))
+        else:
+            coords = obj.get('coordinates')
+            if not coords:
+                continue
+            depth = {'Point': 0, 'MultiPoint': 1, 'LineString': 1,
+                     'MultiLineString': 2, 'Polygon': 2, 'MultiPolygon': 3}.get(gtype)
+            if depth == 0:
+                arrays.append([coords])
+            elif depth == 1:
+                arrays.append(coords)
+            elif depth == 2:
+                arrays.extend(coords)
+            elif depth == 3:
+                arrays.extend(ring for polygon in coords for ring in polygon)
+    return arrays
+
+
+def geojson_coords(gj_object) -> 'numpy.ndarray':
+    """
+    Return all (lon, lat) positions of a GeoJSON object as an (N, 2) array.
+
+    Altitudes are dropped.
+    """
+    import numpy as np
+
+    parts = []
+    for positions in position_arrays(gj_object):
+        if not positions:
+            continue
+        try:
+            arr = np.asarray(positions, dtype=float)[:, :2]
+        except ValueError:
+            # mixed 2D and 3D positions
+            arr = np.array([p[:2] for p in positions], dtype=float)
+        parts.append(arr)
+    if not parts:
+        return np.empty((0, 2))
+    return np.concatenate(parts)
+
+
+def coords_bbox(coords: 'numpy.ndarray') -> Optional[Tuple[Tuple[float, float], Tuple[float, float]]]:
+    """
+    Return bbox for an (N, 2) array of points as ((min_x, min_y), (max_x, max_y)).
+
+    None is returned if there are no points.
+    """
+    if not len(coords):
+        return None
+    mins, maxs = coords.min(axis=0), coords.max(axis=0)
+    return (float(mins[0]), float(mins[1])), (float(maxs[0]), float(maxs[1]))
+
+
+def geojson_bbox(gj_object) -> Optional[Tuple[Tuple[float, float], Tuple[float, float]]]:
     """
     Return bbox for a GeoJSON object as ((min_lon, min_lat), (max_lon, max_lat)).
+
+    None is returned if the object has no coordinates.
     """
-    gj = geojson.loads(json.dumps(gj_object))
-    coords = []
-    for feat in gj['features']:
-        coords += list(geojson.coords(feat))
-    coords = tuple(coords)
-    bbox = min(coords), max(coords)
-    return bbox
+    return coords_bbox(geojson_coords(gj_object))
 
 
 def bbox_center(p: Tuple[float, float],
@@ -67,48 +154,317 @@ def zoom_for_bbox(lon_min: float,
     return zoom_level
 
 
+# Functions related to GPXResponseView
+
+def gpx_points(data: bytes) -> Tuple[List['numpy.ndarray'], 'numpy.ndarray']:
+    """
+    Return (segments, waypoints) of a GPX document as arrays of (lon, lat).
+
+    Every track segment and every route gives one (N, 2) array. The body is
+    parsed incrementally, dropping elements once read. Raises ``ParseError``
+    for invalid XML.
+    """
+    import numpy as np
+
+    segments = []  # type: List[Any]
+    waypoints = []  # type: List[Tuple[float, float]]
+    current = []  # type: List[Tuple[float, float]]
+    parser = XMLPullParser(events=('end',))
+    view = memoryview(data)
+    for offset in range(0, len(data), 64 * 1024):
+        parser.feed(bytes(view[offset:offset + 64 * 1024]))
+        for event, elem in parser.read_events():
+            name = local_name(elem.tag)
+            if name in ('trkpt', 'rtept', 'wpt'):
+                point = float(elem.get('lon')), float(elem.get('lat'))
+                (waypoints if name == 'wpt' else current).append(point)
+                elem.clear()
+            elif name in ('trkseg', 'rte'):
+                segments.append(np.array(current, dtype=float).reshape(-1, 2))
+                current = []
+                elem.clear()
+    parser.close()
+    return segments, np.array(waypoints, dtype=float).reshape(-1, 2)
+
+
+def decimate(segments: List['numpy.ndarray'], max_points: int) -> List['numpy.ndarray']:
+    """
+    Return segments of points thinned out to about max_points points in total.
+
+    Every n-th point of each segment is kept, plus its last one.
+    """
+    import numpy as np
+
+    total = sum(len(seg) for seg in segments)
+    if total <= max_points:
+        return segments
+    step = -(-total // max_points)
+    result = []
+    for seg in segments:
+        thinned = seg[::step]
+        if len(seg) and (len(seg) - 1) % step:
+            thinned = np.concatenate([thinned, seg[-1:]])
+        result.append(thinned)
+    return result
+
+
+# Mimetype functions used to dispatch responses to views
+
+CONTENT_TYPE_PAT = re.compile(r'\s*([\w\-\.\+\*]+)/([\w\-\.\+\*]+)\s*(;.*)?', re.S)
+REGEX_META_CHARS = set('.^$*+?{}[]|()')
+CHARSET_PAT = re.compile(r';\s*charset\s*=\s*["\']?([\w\-\.:]+)', re.I)
+
+
+def parse_content_type(content_type: str) -> Tuple[str, str, Optional[str]]:
+    """
+    Return (maintype, subtype, params) for a Content-Type header value.
+
+    Types are lower-cased, unparsable values give ('application', 'octet-stream', None).
+    """
+    m = CONTENT_TYPE_PAT.match(content_type or '')
+    if not m:
+        return 'application', 'octet-stream', None
+    maintype, subtype, params = m.groups()
+    return maintype.lower(), subtype.lower(), params
+
+
+def literal_pattern(pat: str) -> Optional[str]:
+    """
+    Return the literal string matched by a regex pattern or None.
+
+    A trailing ``.*`` is ignored and escaped characters are unescaped, so
+    ``application/vnd\\.geo\\+json.*`` gives ``application/vnd.geo+json``.
+    None is returned for patterns using any other regex syntax.
+    """
+    if pat.endswith('.*'):
+        pat = pat[:-2]
+    chars = []
+    escaped = False
+    for c in pat:
+        if escaped:
+            if c.isalnum():
+                return None
+            chars.append(c)
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif c in REGEX_META_CHARS:
+            return None
+        else:
+            chars.append(c)
+    return None if escaped else ''.join(chars)
+
+
+# Decoded response content shared by all views rendering a response
+
+class ResponseContent(object):
+    """
+    The content of a response, decoded and parsed at most once.
+
+    Bytes, text, JSON and any other parsed form are computed lazily on
+    first access and memoized, so several views rendering the same
+    response share the work (and the memory) needed for it.
+    """
+
+    def __init__(self, resp: requests.models.Response) -> None:
+        "Create content for some response, nothing is decoded yet."
+
+        self.resp = resp
+        self.cache = {}  # type: Dict[str, Any]
+        # seconds spent parsing, nested parsing counted once
+        self.parse_time = 0.0
+        self.depth = 0
+
+    def parsed(self, key: str, parse: Callable[['ResponseContent'], Any]) -> Any:
+        "Return content parsed by some function, parsing only on first call for a key."
+
+        if key not in self.cache:
+            start = time.perf_counter()
+            self.depth += 1
+            try:
+                self.cache[key] = parse(self)
+            finally:
+                self.depth -= 1
+                if not self.depth:
+                    self.parse_time += time.perf_counter() - start
+        return self.cache[key]
+
+    @property
+    def bytes(self) -> bytes:
+        "The raw body."
+
+        return self.resp.content
+
+    @property
+    def encoding(self) -> str:
+        "The encoding of the body as given by the server or guessed."
+
+        return self.parsed('encoding', lambda c:
+                           c.resp.encoding or c.resp.apparent_encoding or 'utf-8')
+
+    @property
+    def text(self) -> str:
+        "The body decoded into text, replacing undecodable bytes."
+
+        def decode(c):
+            try:
+                return str(c.bytes, c.encoding, errors='replace')
+            except LookupError:
+                return str(c.bytes, 'utf-8', errors='replace')
+        return self.parsed('text', decode)
+
+    @property
+    def markup_text(self) -> str:
+        """
+        The body decoded as given by a charset parameter or as UTF-8.
+
+        Unlike ``text`` this never uses the ISO-8859-1 default requests
+        assumes for text types or guesses from the whole body, as both
+        are wrong for most HTML and SVG documents without a charset.
+        """
+        def decode(c):
+            m = CHARSET_PAT.search(c.resp.headers.get('Content-Type', ''))
+            try:
+                return str(c.bytes, m.group(1) if m else 'utf-8', errors='replace')
+            except LookupError:
+                return str(c.bytes, 'utf-8', errors='replace')
+        return self.parsed('markup_text', decode)
+
+    @property
+    def raw_text(self) -> str:
+        """
+        The body as text if it has a known encoding, its repr otherwise.
+
+        This is used to show bodies as they are, including binary ones.
+        """
+        def decode(c):
+            if c.resp.encoding:
+                try:
+                    return c.bytes.decode(c.resp.encoding)
+                except (UnicodeDecodeError, LookupError):
+                    pass
+            return str(c.bytes)
+        return self.parsed('raw_text', decode)
+
+    def json(self) -> Any:
+        "Return the body parsed as JSON."
+
+        def parse(c):
+            if c.resp.encoding is None:
+                # json detects UTF-8/16/32 itself
+                return json.loads(c.bytes)
+            return json.loads(c.text)
+        return self.parsed('json', parse)
+
+
 # All response views render a requests.Response object as an ipywidget.
 
 class ResponseView(object):
     """
     Abstract view baseclass for rendering a ``requests.Response`` object
     into an ipywidgets.Widget.
-    """
 
-    def __init__(self, owner=None) -> None:
-        "Create a new ResponseView. The owner is the API using it."
+    Subclasses define a ``name``, a list of regex ``mimetype_pats`` matched
+    against the mimetype essence (``type/subtype``) of a response and an
+    optional ``priority``. Views with higher priority come first.
+
+    Views should access the body via ``get_content`` which returns the
+    decoded content shared with all other views rendering the response.
 
+    Incremental views can also preview a body while it is downloaded:
+    ``begin`` returns a widget, ``feed`` takes every chunk as it arrives
+    and ``refresh`` updates the widget from time to time. ``render`` is
+    called on the same view object when the body is complete.
+    """
+    name = ''
+    mimetype_pats = []  # type: List[str]
+    priority = 0
+    incremental = False
+
+    def __init__(self, owner=None, content: Optional[ResponseContent] = None) -> None:
+        """
+        Create a new ResponseView. The owner is the API using it, content
+        the shared decoded content of the response to render, if known.
+        """
         self.owner = owner
+        self.content = content
         self.data = None
 
+    def get_content(self, resp: requests.models.Response) -> ResponseContent:
+        "Return the decoded content of a response."
+
+        if self.content is None or self.content.resp is not resp:
+            self.content = ResponseContent(resp)
+        return self.content
+
     def render(self, resp: requests.models.Response) -> Optional[Widget]:
         "Return some rendered 'view' of the response or None."
 
         return None
 
+    def begin(self, resp: requests.models.Response) -> Optional[Widget]:
+        "Return a widget previewing the body of a response while it is downloaded, or None."
+
+        return None
+
+    def feed(self, chunk: bytes) -> None:
+        "Take the next chunk of a body being downloaded."
+
+        pass
+
+    def refresh(self) -> None:
+        "Update the preview widget with the chunks fed so far."
+
+        pass
 
-class RawResponseView(object):
+
+class RawResponseView(ResponseView):
     """
-    A view that renders a raw response in an ipywidgets.Textarea.
+    A view that renders a raw response in a paged Textarea.
+
+    Only a page of at most ``page_lines`` lines and ``page_chars``
+    characters is sent to the browser at a time. While downloading, the
+    first page is previewed as soon as it arrives.
     """
     name = 'Raw'
     mimetype_pats = ['.*']
+    page_lines = 500
+    page_chars = 64 * 1024
+    incremental = True
 
     def render(self, resp: requests.models.Response) -> Optional[Widget]:
         "Return some rendered raw 'view' of the response or None."
 
-        obj = resp.content
-        self.data = obj
-        layout = Layout(width='100%', height='100%')
-        ta = Textarea(layout=layout)
-        try:
-            ta.value = str(resp.content.decode(resp.encoding)) \
-                if resp.encoding else str(resp.content)
-        except UnicodeDecodeError:
-            ta.value = str(resp.content)
-        num_lines = ta.value.count('\n')
-        ta.rows = min(10, num_lines + 1)
-        return ta
+        content = self.get_content(resp)
+        self.data = content.bytes
+        return PagedText(content.raw_text, page_lines=self.page_lines,
+                         page_chars=self.page_chars)
+
+    def begin(self, resp: requests.models.Response) -> PagedText:
+        "Return an empty PagedText to show the first page of the body in."
+
+        self.head = bytearray()
+        self.shown = 0
+        self.encoding = resp.encoding or 'utf-8'
+        self.paged = PagedText(page_lines=self.page_lines, page_chars=self.page_chars)
+        return self.paged
+
+    def feed(self, chunk: bytes) -> None:
+        "Keep the beginning of a chunk as long as the first page is not complete."
+
+        missing = self.page_chars - len(self.head)
+        if missing > 0:
+            self.head += chunk[:missing]
+
+    def refresh(self) -> None:
+        "Show the first page received so far."
+
+        if len(self.head) > self.shown:
+            self.shown = len(self.head)
+            try:
+                self.paged.text = self.head.decode(self.encoding, errors='replace')
+            except LookupError:
+                self.paged.text = self.head.decode('utf-8', errors='replace')
 
 
 class HTMLResponseView(ResponseView):
@@ -121,14 +477,8 @@ class HTMLResponseView(ResponseView):
     def render(self, resp: requests.models.Response) -> HTML:
         "Return HTML rendered using an HTML ipywidget, or None."
 
-        obj = resp.content
-        try:
-            self.data = obj.decode('utf-8')
-            h = HTML(self.data)
-        except:
-            self.data = obj
-            h = HTML(obj)
-        return h
+        self.data = self.get_content(resp).markup_text
+        return HTML(self.data)
 
 
 class SVGResponseView(ResponseView):
@@ -136,19 +486,13 @@ class SVGResponseView(ResponseView):
     A view that renders SVG somehow.
     """
     name = 'SVG'
-    mimetype_pats = ['image/svg\+xml.*']
+    mimetype_pats = [r'image/svg\+xml.*']
 
     def render(self, resp: requests.models.Response) -> HTML:
         "Return SVG soehow, or None."
 
-        obj = resp.content
-        try:
-            self.data = obj.decode('utf-8')
-            h = HTML(self.data)
-        except:
-            self.data = obj
-            h = HTML(obj)
-        return h
+        self.data = self.get_content(resp).markup_text
+        return HTML(self.data)
 
 
 class ImageResponseView(ResponseView):
@@ -161,10 +505,8 @@ class ImageResponseView(ResponseView):
     def render(self, resp: requests.models.Response) -> Image:
         "Return an ipywidget image with the data object rendered on it, or None."
 
-        obj = resp.content
-        ct = resp.headers['Content-Type']
-        maintype, subtype, params = re.match(
-            '(\w+)/([\.\+\w]+)(;.*)?', ct).groups()
+        obj = self.get_content(resp).bytes
+        maintype, subtype, params = parse_content_type(resp.headers.get('Content-Type'))
         img = Image(value=obj, format=subtype)
         self.data = img
         return img
@@ -172,61 +514,435 @@ class ImageResponseView(ResponseView):
 
 class JSONResponseView(ResponseView):
     """
-    A view that renders JSON in some semi-pretty form in an ipywidgets.Textarea.
+    A view that renders JSON in some semi-pretty form in a paged Textarea.
+
+    A search field above finds keys and values while typing, using a
+    JSONIndex built once per response on the first search. At most
+    ``max_results`` matches are listed with their paths. Besides
+    ``application/json`` all types with a ``+json`` structured syntax
+    suffix are rendered, but not JSON lines like ``application/jsonl``.
     """
     name = 'JSON'
-    mimetype_pats = ['application/json.*', 'application/vnd\..*\+json.*']
+    mimetype_pats = ['application/json$', r'application/.*\+json']
+    page_lines = 500
+    page_chars = 64 * 1024
+    max_results = 200
 
-    def render(self, resp: requests.models.Response) -> Textarea:
-        "Return a somewhat prettified JSON string."
+    def json_index(self, resp: requests.models.Response) -> JSONIndex:
+        "Return the search index for the JSON body of a response."
 
-        obj = resp.json()
+        return self.get_content(resp).parsed('json_index', lambda c: JSONIndex(c.json()))
+
+    def render(self, resp: requests.models.Response) -> VBox:
+        "Return a somewhat prettified JSON string with a search field."
+
+        obj = self.get_content(resp).json()
         self.data = obj
-        layout = Layout(width='100%', height='100%')
-        ta = Textarea(layout=layout)
         value = json.dumps(obj, indent=2)
-        ta.value = value
-        num_lines = value.count('\n')
-        ta.rows = min(10, num_lines + 1)
-        return ta
+        paged = PagedText(value, page_lines=self.page_lines, page_chars=self.page_chars)
+        search_txt = Text(description='Search', continuous_update=True,
+                          placeholder='words, 10..20, > 5 or $.items[*].name')
+        msg_htm = HTML()
+        results_sel = Select(rows=8, layout=Layout(width='100%', display='none'))
+
+        def search(change):
+            query = search_txt.value
+            msg_htm.value = ''
+            results_sel.layout.display = 'none'
+            if not query.strip():
+                return
+            index = self.json_index(resp)
+            try:
+                ids = index.find(query)
+            except ValueError:
+                msg_htm.value = 'Invalid query'
+                return
+            msg_htm.value = '{:,} match{}'.format(len(ids), '' if len(ids) == 1 else 'es')
+            results_sel.options = [
+                '{} = {}'.format(format_path(index.paths[i]), preview(index.value(i)))
+                for i in ids[:self.max_results]]
+            if ids:
+                results_sel.layout.display = None
+
+        search_txt.observe(search, names='value')
+        return VBox([HBox([search_txt, msg_htm]), results_sel, paged])
+
+
+class JSONTreeResponseView(ResponseView):
+    """
+    A view that renders JSON as a collapsible tree, building nodes on demand.
+
+    Expanded nodes show at most ``page_size`` children at a time. A path
+    like ``$.a.b[123]`` entered in the path field is revealed in the tree.
+    """
+    name = 'JSON-Tree'
+    mimetype_pats = JSONResponseView.mimetype_pats
+    priority = -1
+    page_size = 100
+
+    def render(self, resp: requests.models.Response) -> VBox:
+        "Return a lazy tree of the JSON object with a field to jump to paths."
+
+        obj = self.get_content(resp).json()
+        tree = LazyTree(JSONTreeModel(obj), page_size=self.page_size)
+        self.data = tree
+        path_txt = Text(placeholder='$.a.b[123]', description='Path')
+        go_btn = Button(description='Go', tooltip='Show path in tree',
+                        layout=Layout(width='50px'))
+        msg_htm = HTML()
+
+        def go(widget):
+            msg_htm.value = ''
+            try:
+                tree.reveal(parse_path(path_txt.value))
+            except (ValueError, KeyError):
+                msg_htm.value = 'No such path: {}'.format(html.escape(path_txt.value))
+
+        go_btn.on_click(go)
+        path_txt.on_submit(go)
+        return VBox([HBox([path_txt, go_btn, msg_htm]), tree])
+
+
+class NDJSONResponseView(ResponseView):
+    """
+    A view that renders newline-delimited JSON records in a paged grid.
+
+    Records are parsed incrementally, also while the body is downloaded,
+    see ``ndjson.RecordStream``. Only the ``max_records`` most recent
+    records are kept and shown, with counts over all records above them.
+    ``data`` is the RecordStream.
+    """
+    name = 'NDJSON'
+    mimetype_pats = [r'application/x\-ndjson.*',
+                     r'application/ndjson.*',
+                     r'application/jsonl.*',
+                     r'application/x\-jsonlines.*',
+                     r'application/json\-seq.*']
+    max_records = 1000
+    page_size = 100
+    chunk_size = 1024 * 1024
+    incremental = True
+    stream = None  # type: Optional[RecordStream]
+
+    def render(self, resp: requests.models.Response) -> Optional[VBox]:
+        "Return a summary and a grid of the recent records, or None if there are none."
+
+        stream = self.stream
+        if stream is None:
+            # parse in slices, never splitting the entire body at once
+            stream = RecordStream(self.max_records)
+            data = self.get_content(resp).bytes
+            for i in range(0, len(data), self.chunk_size):
+                stream.feed(data[i:i + self.chunk_size])
+        stream.close()
+        self.stream = stream
+        self.data = stream
+        if not stream.num_records:
+            return None
+        self.box = VBox()
+        self.shown = -1
+        self.refresh()
+        return self.box
+
+    def begin(self, resp: requests.models.Response) -> VBox:
+        "Return a box to show the records received so far in."
+
+        self.stream = RecordStream(self.max_records)
+        self.data = self.stream
+        self.box = VBox([HTML('Waiting for records...')])
+        self.shown = 0
+        return self.box
+
+    def feed(self, chunk: bytes) -> None:
+        "Parse the records completed by a chunk."
+
+        if self.stream is not None:
+            self.stream.feed(chunk)
+
+    def refresh(self) -> None:
+        "Show the summary and the recent records, if there are new ones."
+
+        stream = self.stream
+        if stream is None or stream.num_records == self.shown:
+            return
+        self.shown = stream.num_records
+        df = stream.frame()
+        grid = PagedGrid(lambda offset, count: df.iloc[offset:offset + count],
+                         len(df), page_size=self.page_size)
+        self.box.children = [HTML(stream.summary()), grid]
+
+
+class EventStreamResponseView(ResponseView):
+    """
+    A view that logs Server-Sent Events with their counts and rate.
+
+    Events are parsed while the stream arrives, see ``events.EventLog``.
+    Only the ``max_events`` most recent events are kept and the last
+    ``max_shown`` of them shown. If the owner has an ``event_log``, like an
+    Api in live mode, events are added to it, continuing over reconnects.
+    ``data`` is the EventLog.
+    """
+    name = 'Events'
+    mimetype_pats = [r'text/event\-stream.*']
+    max_events = 1000
+    max_shown = 100
+    incremental = True
+    log = None  # type: Optional[EventLog]
+
+    def render(self, resp: requests.models.Response) -> Optional[VBox]:
+        "Return a summary and a log of the most recent events, or None if there are none."
+
+        if self.log is None:
+            self.begin(resp, log=EventLog(self.max_events))
+            self.feed(self.get_content(resp).bytes)
+            # an incomplete last event is dispatched at the end of a stream
+            self.feed(b'\n\n')
+        self.data = self.log
+        if not self.log.num_events:
+            return None
+        self.refresh()
+        return self.box
+
+    def begin(self,
+              resp: requests.models.Response,
+              log: Optional[EventLog] = None) -> VBox:
+        "Return a box with a summary and a log to show events in while they arrive."
+
+        log = log or getattr(self.owner, 'event_log', None) or EventLog(self.max_events)
+        log.begin_stream()
+        self.log = log
+        self.data = log
+        self.shown = -1
+        self.summary_htm = HTML(log.summary())
+        self.log_ta = Textarea(layout=Layout(width='100%'), rows=15)
+        self.box = VBox([self.summary_htm, self.log_ta])
+        return self.box
+
+    def feed(self, chunk: bytes) -> None:
+        "Parse the events completed by a chunk."
+
+        if self.log is not None:
+            self.log.feed(chunk)
+
+    def refresh(self) -> None:
+        "Update the summary and, if there are new events, the log."
+
+        log = self.log
+        if log is None:
+            return
+        self.summary_htm.value = log.summary()
+        if log.num_events != self.shown:
+            self.shown = log.num_events
+            self.log_ta.value = log.text(self.max_shown)
+
+
+class XMLResponseView(ResponseView):
+    """
+    A view that renders XML as a collapsible tree with XPath-like search.
+
+    The body is parsed incrementally into a compact XMLIndex, keeping
+    at most ``max_nodes`` elements. Matches of a search are listed with
+    their paths, at most ``max_results`` of them, and revealed in the tree
+    when selected.
+    """
+    name = 'XML'
+    mimetype_pats = ['text/xml.*', 'application/xml.*', r'application/.*\+xml.*']
+    priority = -1
+    page_size = 100
+    max_nodes = 1000000
+    max_results = 200
+
+    def render(self, resp: requests.models.Response) -> Optional[VBox]:
+        "Return a lazy tree of the XML elements with a search field, or None."
+
+        index = self.get_content(resp).parsed(
+            'xml_index', lambda c: XMLIndex(c.bytes, max_nodes=self.max_nodes))
+        if not len(index):
+            return None
+        self.data = index
+        model = XMLTreeModel(index)
+        tree = LazyTree(model, page_size=self.page_size)
+        info = '{:,} elements'.format(len(index))
+        if index.truncated:
+            info += ', truncated'
+        if index.error:
+            info += ', error: {}'.format(html.escape(index.error))
+        info_htm = HTML(info)
+        search_txt = Text(description='XPath', placeholder='//entry/title or entry[@id]')
+        search_btn = Button(description='Find', layout=Layout(width='60px'))
+        msg_htm = HTML()
+        results_sel = Select(rows=8, layout=Layout(width='100%', display='none'))
+
+        def search(widget):
+            msg_htm.value = ''
+            results_sel.layout.display = 'none'
+            try:
+                ids = index.find(search_txt.value)
+            except ValueError:
+                msg_htm.value = 'Invalid query'
+                return
+            msg_htm.value = '{:,} match{}'.format(len(ids), '' if len(ids) == 1 else 'es')
+            results_sel.options = [(index.xpath(i), i) for i in ids[:self.max_results]]
+            results_sel.value = None
+            if ids:
+                results_sel.layout.display = None
+
+        def reveal(change):
+            if change['new'] is not None:
+                tree.reveal(model.path(change['new']))
+
+        search_btn.on_click(search)
+        search_txt.on_submit(search)
+        results_sel.observe(reveal, names='value')
+        return VBox([HBox([search_txt, search_btn, msg_htm]), results_sel, info_htm, tree])
 
 
 class CSVResponseView(ResponseView):
     """
     A view that renders CSV data as an interactive table
+
+    The body is read into a compact data frame in chunks, see
+    ``tables.read_csv_frame``. The grid shows ``page_size`` rows at a time.
+    While downloading, the first ``preview_rows`` rows are previewed.
     """
     name = 'CSV'
     mimetype_pats = ['text/csv.*']
+    page_size = 100
+    preview_rows = 1000
+    incremental = True
+
+    def begin(self, resp: requests.models.Response) -> VBox:
+        "Return a box to show a grid with the first rows received in."
 
-    def render(self, resp: requests.models.Response) -> QGridWidget:
+        self.head = bytearray()
+        self.num_lines = self.shown = 0
+        self.encoding = resp.encoding or 'utf-8'
+        self.preview_box = VBox([HTML('Waiting for rows...')])
+        return self.preview_box
+
+    def feed(self, chunk: bytes) -> None:
+        "Keep chunks as long as the preview rows are not complete."
+
+        if self.num_lines <= self.preview_rows:
+            self.head += chunk
+            self.num_lines += chunk.count(b'\n')
+
+    def refresh(self) -> None:
+        "Show the complete rows received so far, up to the preview size."
+
+        import pandas as pd
+
+        end = self.head.rfind(b'\n') + 1
+        if end <= self.shown:
+            return
+        try:
+            df = pd.read_csv(io.BytesIO(bytes(self.head[:end])), nrows=self.preview_rows,
+                             encoding=self.encoding)
+        except (ValueError, LookupError):
+            return
+        self.shown = end
+        grid = PagedGrid(lambda offset, count: df.iloc[offset:offset + count],
+                         len(df), page_size=self.page_size)
+        self.preview_box.children = [HTML(f'Preview of the first {len(df):,} rows'), grid]
+
+    def render(self, resp: requests.models.Response) -> PagedGrid:
         "Return an interactive grid with the CSV data"
 
-        csv = io.StringIO(resp.text)
-        df = pd.read_csv(csv)
+        df = self.get_content(resp).parsed(
+            'csv_frame', lambda c: read_csv_frame(c.bytes, encoding=c.encoding))
         self.data = df
-        grid = QGridWidget(df=df)
-        return grid
+        return PagedGrid(lambda offset, count: df.iloc[offset:offset + count],
+                         len(df), page_size=self.page_size)
+
+
+class ArrowResponseView(ResponseView):
+    """
+    A view that renders Apache Arrow IPC and Parquet tables in a paged grid.
+
+    Arrow data is read without copying the body, ``data`` is the resulting
+    ``pyarrow.Table``. A summary shows the row count and the schema, the
+    grid converts only the ``page_size`` rows shown into a data frame.
+    """
+    name = 'Arrow'
+    mimetype_pats = [r'application/vnd\.apache\.arrow\.stream.*',
+                     r'application/vnd\.apache\.arrow\.file.*',
+                     r'application/vnd\.apache\.parquet.*',
+                     r'application/x\-parquet.*']
+    page_size = 100
+
+    def render(self, resp: requests.models.Response) -> Optional[VBox]:
+        "Return a summary and a paged grid of the table, or None."
+
+        try:
+            table = self.get_content(resp).parsed(
+                'arrow_table', lambda c: read_arrow_table(c.bytes))
+        except ValueError:
+            return None
+        self.data = table
+        grid = PagedGrid(lambda offset, count: table.slice(offset, count).to_pandas(),
+                         table.num_rows, page_size=self.page_size)
+        return VBox([HTML(table_summary(table)), grid])
 
 
 class GeoJSONResponseView(ResponseView):
     """
     A view that renders GeoJSON on an ipyleaflet.Map.
+
+    If ``simplify`` is set, lines and polygons are simplified before being
+    sent to the map, dropping details smaller than ``simplify_pixels``
+    pixels at the initial zoom level. With ``resimplify_on_zoom`` they are
+    simplified again with a finer tolerance when zooming in further than
+    before. Simplified versions are cached per zoom level.
     """
     name = 'GeoJSON'
-    mimetype_pats = ['application/vnd\.geo\+json.*']
+    mimetype_pats = [r'application/vnd\.geo\+json.*']
+    simplify = True
+    simplify_pixels = 1.0
+    resimplify_on_zoom = True
+
+    def simplified(self, obj: Dict, zoom: int) -> Dict:
+        "Return the GeoJSON object of the rendered response simplified for some zoom level."
+
+        cache = self.content.cache.setdefault('geojson_lod', {})
+        if zoom not in cache:
+            tolerance = tolerance_for_zoom(zoom, self.simplify_pixels)
+            cache[zoom] = simplify_geojson(obj, tolerance)
+        return cache[zoom]
 
-    def render(self, resp: requests.models.Response) -> ipyleaflet.Map:
+    def render(self, resp: requests.models.Response) -> 'ipyleaflet.Map':
         "Return an ipyleaflet map with the GeoJSON object rendered on it, or None."
 
-        obj = resp.json()
+        import ipyleaflet
+
+        obj = self.get_content(resp).json()
         if obj.get('type', None) != 'FeatureCollection':
             return None
         bbox = geojson_bbox(obj)
-        mins, maxs = bbox
-        center = list(reversed(bbox_center(*bbox)))
-        z = zoom_for_bbox(*(mins + maxs))
-        m = ipyleaflet.Map(center=center, zoom=z + 1)
-        m.add_layer(layer=ipyleaflet.GeoJSON(data=obj))
+        if bbox is None:
+            m = ipyleaflet.Map()
+        else:
+            mins, maxs = bbox
+            center = list(reversed(bbox_center(*bbox)))
+            z = zoom_for_bbox(*(mins + maxs))
+            m = ipyleaflet.Map(center=center, zoom=z + 1)
+        if not self.simplify:
+            m.add_layer(layer=ipyleaflet.GeoJSON(data=obj))
+            self.data = m
+            return m
+
+        zoom = int(m.zoom)
+        layer = ipyleaflet.GeoJSON(data=self.simplified(obj, zoom))
+        layer_zoom = [zoom]
+
+        def zoomed(change):
+            zoom = int(change['new'])
+            if zoom > layer_zoom[0]:
+                layer.data = self.simplified(obj, zoom)
+                layer_zoom[0] = zoom
+
+        if self.resimplify_on_zoom:
+            m.observe(zoomed, names='zoom')
+        m.add_layer(layer=layer)
         self.data = m
         return m
 
@@ -235,37 +951,49 @@ class GPXResponseView(ResponseView):
     """
     A view that renders GPS traces in GPX format on an ipyleaflet.Map.
 
+    All points are rendered in one GeoJSON layer, as one MultiPoint and,
+    if ``show_segments`` is set, one LineString per track segment or route.
+    Above ``max_points`` points segments are decimated, keeping their end
+    points. Waypoints are always shown. Styles are taken from ``line_style``
+    and ``point_style``.
+
     See https://www.topografix.com/gpx.asp
     """
     name = 'GPX'
-    mimetype_pats = ['application/gpx\+xml.*']
+    mimetype_pats = [r'application/gpx\+xml.*']
+    max_points = 10000
+    show_segments = True
+    line_style = {'color': 'blue', 'weight': 3, 'opacity': 0.8}
+    point_style = {'radius': 4, 'color': 'blue', 'weight': 1, 'fillOpacity': 0.5}
 
-    def render(self, resp: requests.models.Response) -> ipyleaflet.Map:
+    def render(self, resp: requests.models.Response) -> 'ipyleaflet.Map':
         "Return an ipyleaflet map with the GPX object rendered on it, or None."
 
-        import gpxpy
-        from gpxpy.gpx import GPXXMLSyntaxException
+        import ipyleaflet
+        import numpy as np
 
-        obj = resp.content.decode('utf-8')
         try:
-            trace = gpxpy.parse(obj)
-        except GPXXMLSyntaxException:
+            segments, waypoints = gpx_points(self.get_content(resp).bytes)
+        except ParseError:
+            return None
+        bbox = coords_bbox(np.concatenate(segments + [waypoints]))
+        if bbox is None:
             return None
-        pts = [p.point for p in trace.get_points_data()]
-        bbox = trace.get_bounds()
-        mins = (bbox.min_latitude, bbox.min_longitude)
-        maxs = (bbox.max_latitude, bbox.max_longitude)
-        bbox = mins, maxs
-        center = list(bbox_center(*bbox))
+        mins, maxs = bbox
+        center = list(reversed(bbox_center(*bbox)))
         z = zoom_for_bbox(*(mins + maxs))
         m = ipyleaflet.Map(center=center, zoom=z + 1)
-        # FIXME: make path styling configurable
-        poly = ipyleaflet.Polyline(locations=[(p.latitude, p.longitude)
-            for p in pts], fill=False)
-        m.add_layer(layer=poly)
-        for p in pts:
-            cm = ipyleaflet.CircleMarker(location=(p.latitude, p.longitude), radius=5)
-            m.add_layer(layer=cm)
+        segments = decimate(segments, self.max_points)
+        points = np.concatenate(segments + [waypoints])
+        features = [dict(type='Feature', properties={},
+                         geometry=dict(type='MultiPoint', coordinates=points.tolist()))]
+        if self.show_segments:
+            features += [dict(type='Feature', properties={'segment': i},
+                              geometry=dict(type='LineString', coordinates=seg.tolist()))
+                         for (i, seg) in enumerate(segments) if len(seg) > 1]
+        layer = ipyleaflet.GeoJSON(data=dict(type='FeatureCollection', features=features),
+                                   style=self.line_style, point_style=self.point_style)
+        m.add_layer(layer=layer)
         self.data = m
         return m
 
@@ -275,48 +1003,217 @@ class Scatter3DResponseView(ResponseView):
     A view that renders 3D scatter plot data as dots in an ipyvolume widget.
 
     The data source is expected to be a table with three or more columns
-    of which the first three are taken to by x, y, and z.
+    of which the first three are taken to by x, y, and z, or a binary
+    point cloud: raw little-endian float32 values, an NPY or a PLY file.
+    See ``pointclouds.point_readers`` for the supported content types.
+
+    At most ``max_points`` points are shown, down-sampled with the
+    ``sampling`` method, 'voxel' or 'random'. If ``progressive`` is set,
+    ``initial_points`` points are shown at once and more are added in the
+    background, growing by a factor of four up to ``max_points``.
     """
     name = 'Scatter-3D'
-    mimetype_pats = ['application/vnd\.3d\+txt.*']
+    mimetype_pats = [r'application/vnd\.3d\+txt.*',
+                     r'application/vnd\.3d\+float32.*',
+                     r'application/vnd\.3d\+npy.*',
+                     r'application/x\-npy.*',
+                     r'application/ply.*',
+                     r'application/x\-ply.*']
+    max_points = 200000
+    sampling = 'voxel'
+    progressive = True
+    initial_points = 20000
 
-    def render(self, resp: requests.models.Response) -> Widget:
-        "Return an ipyvolume widget with the data object rendered on it."
+    def __init__(self, owner=None, content: Optional[ResponseContent] = None) -> None:
+        "Create a new view, see ResponseView."
 
-        f = io.BytesIO(resp.content)
-        points = pd.read_csv(f, delim_whitespace=True)
-        # points = points[:: 300] # FIXME: use down-sampling here
-        x = points.iloc[:, 0].values
-        y = points.iloc[:, 1].values
-        z = points.iloc[:, 2].values
-        res = ipyvolume.quickscatter(x, y, z, size=1, marker="sphere")
+        super().__init__(owner=owner, content=content)
+        self.refine_thread = None  # type: Optional[threading.Thread]
 
+    def read_points(self, resp: requests.models.Response) -> 'numpy.ndarray':
+        "Return the points of a response as an (N, 3) array, read by content type."
+
+        return read_point_cloud(self.get_content(resp).bytes, resp.headers.get('Content-Type'))
+
+    def render(self, resp: requests.models.Response) -> Optional[Widget]:
+        "Return an ipyvolume widget with the data object rendered on it, or None."
+
+        import ipyvolume
+
+        try:
+            points = self.read_points(resp)
+        except ValueError:
+            return None
+        self.data = points
+        budget = self.max_points
+        initial = self.initial_points if self.progressive else budget
+        sizes = level_sizes(len(points), budget, initial)
+        shown = downsample(points, sizes[0], method=self.sampling)
+
+        ipyvolume.figure()
+        scatter = ipyvolume.scatter(shown[:, 0], shown[:, 1], shown[:, 2],
+                                    size=1, marker="sphere")
+        if len(points):
+            # limits of all points, not only of the ones shown first
+            mins, maxs = points.min(axis=0), points.max(axis=0)
+            ipyvolume.xlim(mins[0], maxs[0])
+            ipyvolume.ylim(mins[1], maxs[1])
+            ipyvolume.zlim(mins[2], maxs[2])
+        res = ipyvolume.gcc()
+
+        def refine():
+            for size in sizes[1:]:
+                finer = downsample(points, size, method=self.sampling)
+                with scatter.hold_sync():
+                    scatter.x, scatter.y, scatter.z = finer[:, 0], finer[:, 1], finer[:, 2]
+
+        if len(sizes) > 1:
+            self.refine_thread = threading.Thread(target=refine, daemon=True)
+            self.refine_thread.start()
         return res
 
 
 class ProtobufResponseView(ResponseView):
     """
-    A view that renders Protobuf objects deserialized into text.
+    A view that renders Protobuf messages as text.
+
+    The message type is looked up in ``registry`` by content type and URL.
+    Bodies of unknown type are decoded without schema, showing field
+    numbers instead of names. ``data`` is the decoded message, or the list
+    of (number, wire type, value) fields without schema.
     """
     name = 'Protobuf'
-    mimetype_pats = ['application/x\-protobuf.*']
+    mimetype_pats = [r'application/x\-protobuf.*',
+                     r'application/protobuf.*',
+                     r'application/vnd\.google\.protobuf.*']
+    registry = protobuf_types
+    page_lines = 500
+
+    def render(self, resp: requests.models.Response) -> Optional[PagedText]:
+        "Return the decoded message as text in a PagedText or None."
 
-    def render(self, resp: requests.models.Response) -> Textarea:
-        "Return deserialized Protobuf objects as text inside a Textarea."
+        from google.protobuf.message import DecodeError
+
+        content = self.get_content(resp)
+        try:
+            message_class = self.registry.lookup(resp.headers.get('Content-Type', ''), resp.url)
+        except KeyError:
+            message_class = None
+        try:
+            if message_class is None:
+                fields = content.parsed('protobuf_raw', lambda c: decode_raw(c.bytes))
+                self.data, text = fields, format_raw(fields)
+            else:
+                key = 'protobuf:' + message_class.DESCRIPTOR.full_name
+                message = content.parsed(key, lambda c: message_class.FromString(c.bytes))
+                self.data, text = message, str(message)
+        except (ValueError, DecodeError):
+            return None
+        return PagedText(text, page_lines=self.page_lines)
+
+
+# Registry dispatching mimetypes to the views able to render them
+
+class ViewRegistry(object):
+    """
+    A registry of ResponseView classes indexed by the mimetypes they render.
+
+    Patterns are matched at the start of a mimetype essence like with
+    ``re.match``, so ``application/json.*`` also matches structured types
+    like ``application/json-patch+json``. Patterns standing for a literal
+    prefix (optionally followed by ``.*``) are indexed by that prefix and
+    found by looking up all prefixes of an essence. All other patterns are
+    precompiled and tried in turn. The resulting views per essence are
+    cached until the registry changes.
+    """
 
-        obj = resp.content
-        import addressbook_pb2
-        person = addressbook_pb2.Person()
-        person.ParseFromString(obj)
-        self.data = person
-        layout = Layout(width='100%', height='100%')
-        ta = Textarea(layout=layout)
-        ta.value = str(person)
-        return ta
+    def __init__(self, view_classes: List[type] = []) -> None:
+        "Create a new registry with some view classes."
+
+        self.view_classes = []  # type: List[type]
+        self.priorities = {}  # type: Dict[type, Tuple[int, int]]
+        self.prefixes = {}  # type: Dict[str, List[type]]
+        self.patterns = []  # type: List[Tuple[Any, type]]
+        self.cache = {}  # type: Dict[str, List[type]]
+        for view_class in view_classes:
+            self.register(view_class)
+
+    def register(self, view_class: type, priority: Optional[int] = None) -> None:
+        """
+        Register a view class, with its own priority unless one is given.
+
+        A view class registered before is replaced.
+        """
+        if view_class in self.priorities:
+            self.unregister(view_class)
+        if priority is None:
+            priority = getattr(view_class, 'priority', 0)
+        self.view_classes.append(view_class)
+        self.priorities[view_class] = (-priority, len(self.view_classes))
+        for pat in view_class.mimetype_pats:
+            literal = literal_pattern(pat)
+            if literal is not None:
+                self.prefixes.setdefault(literal.lower(), []).append(view_class)
+            else:
+                self.patterns.append((re.compile(pat), view_class))
+        self.cache.clear()
+
+    def unregister(self, view_class: type) -> None:
+        "Remove a view class from the registry."
+
+        if view_class not in self.priorities:
+            return
+        del self.priorities[view_class]
+        self.view_classes.remove(view_class)
+        for key in list(self.prefixes):
+            self.prefixes[key] = [v for v in self.prefixes[key] if v is not view_class]
+            if not self.prefixes[key]:
+                del self.prefixes[key]
+        self.patterns = [(p, v) for (p, v) in self.patterns if v is not view_class]
+        self.cache.clear()
+
+    def views_for(self, essence: str) -> List[type]:
+        "Return view classes able to render a mimetype essence, by priority."
+
+        essence = essence.lower()
+        views = self.cache.get(essence)
+        if views is None:
+            found = set(v for end in range(len(essence) + 1)
+                        for v in self.prefixes.get(essence[:end], []))
+            found.update(v for (p, v) in self.patterns
+                         if v not in found and p.match(essence))
+            views = sorted(found, key=self.priorities.__getitem__)
+            self.cache[essence] = views
+        return views
+
+    def __contains__(self, view_class: type) -> bool:
+        return view_class in self.priorities
+
+    def __iter__(self):
+        return iter(list(self.view_classes))
+
+    def __len__(self) -> int:
+        return len(self.view_classes)
 
 
 # A list of all built-in ResponseView subclasses in this module:
 
 builtin_view_classes = [
-    n for (k, n) in globals().items()
-    if type(n) is type and issubclass(n, ResponseView) and n != ResponseView]
+    HTMLResponseView,
+    SVGResponseView,
+    ImageResponseView,
+    JSONResponseView,
+    JSONTreeResponseView,
+    NDJSONResponseView,
+    EventStreamResponseView,
+    XMLResponseView,
+    CSVResponseView,
+    ArrowResponseView,
+    GeoJSONResponseView,
+    GPXResponseView,
+    Scatter3DResponseView,
+    ProtobufResponseView,
+]
+
+# default registry with all built-in views
+builtin_views = ViewRegistry(builtin_view_classes)
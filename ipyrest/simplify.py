@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Simplification of GeoJSON geometries for showing them on maps.
+
+Lines and polygon rings are simplified with the Douglas-Peucker algorithm
+using a tolerance derived from the map zoom level, so that no detail
+smaller than about a pixel is sent to the front end.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+
+def tolerance_for_zoom(zoom: float, pixels: float = 1.0) -> float:
+    "Return the size in degrees of some pixels at a zoom level of a web map."
+
+    return pixels * 360.0 / (256 * 2 ** zoom)
+
+
+def simplify_positions(positions: Sequence[Sequence[float]],
+                       tolerance: float,
+                       min_size: int = 2) -> List[Any]:
+    """
+    Return the positions of a line kept by the Douglas-Peucker algorithm.
+
+    Distances are computed on the first two coordinates only, kept
+    positions are returned unchanged, including altitudes. At least
+    ``min_size`` positions are kept, adding evenly spaced ones if needed.
+    """
+    import numpy as np
+
+    n = len(positions)
+    if n <= min_size or tolerance <= 0:
+        return list(positions)
+    try:
+        points = np.asarray(positions, dtype=float)[:, :2]
+    except ValueError:
+        points = np.array([p[:2] for p in positions], dtype=float)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        inner = points[start + 1:end] - a
+        dx, dy = b - a
+        norm = np.hypot(dx, dy)
+        if norm == 0:
+            dist = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            dist = np.abs(dx * inner[:, 1] - dy * inner[:, 0]) / norm
+        i = int(dist.argmax())
+        if dist[i] > tolerance:
+            split = start + 1 + i
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    if keep.sum() < min_size:
+        keep[np.linspace(0, n - 1, min_size).astype(int)] = True
+    return [positions[i] for i in np.flatnonzero(keep)]
+
+
+def simplify_geometry(geometry: Dict, tolerance: float) -> Dict:
+    """
+    Return a copy of a GeoJSON geometry with simplified lines and rings.
+
+    Rings keep at least four positions, points are never removed.
+    """
+    if not isinstance(geometry, dict):
+        return geometry
+    gtype = geometry.get('type')
+    coords = geometry.get('coordinates')
+    if gtype == 'GeometryCollection':
+        geometries = [simplify_geometry(g, tolerance)
+                      for g in geometry.get('geometries') or []]
+        return dict(geometry, geometries=geometries)
+    if not coords:
+        return geometry
+    if gtype == 'LineString':
+        coords = simplify_positions(coords, tolerance)
+    elif gtype == 'MultiLineString':
+        coords = [simplify_positions(line, tolerance) for line in coords]
+    elif gtype == 'Polygon':
+        coords = [simplify_positions(ring, tolerance, 4) for ring in coords]
+    elif gtype == 'MultiPolygon':
+        coords = [[simplify_positions(ring, tolerance, 4) for ring in polygon]
+                  for polygon in coords]
+    else:
+        return geometry
+    return dict(geometry, coordinates=coords)
+
+
+def simplify_geojson(gj_object: Dict, tolerance: float) -> Dict:
+    """
+    Return a copy of a GeoJSON object with all geometries simplified.
+
+    Properties are shared with the original object, not copied.
+    """
+    gtype = gj_object.get('type')
+    if gtype == 'FeatureCollection':
+        features = [simplify_geojson(f, tolerance) for f in gj_object.get('features') or []]
+        return dict(gj_object, features=features)
+    if gtype == 'Feature':
+        return dict(gj_object, geometry=simplify_geometry(gj_object.get('geometry'), tolerance))
+    return simplify_geometry(gj_object, tolerance)
+
+
+def count_positions(gj_object: Any) -> int:
+    "Return the number of positions inside some GeoJSON object or coordinates."
+
+    if isinstance(gj_object, dict):
+        return sum(count_positions(v) for (k, v) in gj_object.items()
+                   if k in ('features', 'geometry', 'geometries', 'coordinates'))
+    if isinstance(gj_object, list):
+        if gj_object and isinstance(gj_object[0], (int, float)):
+            return 1
+        return sum(count_positions(v) for v in gj_object)
+    return 0
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+"""
+Loading of tabular response bodies into compact tables.
+
+CSV bodies are parsed straight from their bytes, in chunks, with column
+types inferred once from a sample of rows so all chunks agree on them.
+Every chunk is made compact before the next one is read: integers are
+downcast and repetitive text columns become categoricals. The faster,
+multi-threaded pyarrow engine of pandas is used if pyarrow is installed.
+
+Arrow IPC and Parquet bodies are read with pyarrow, Arrow ones without
+copying: the columns of the resulting table point into the body.
+"""
+
+import io
+import html
+from typing import Any, Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas
+    import pyarrow
+
+
+def default_csv_engine() -> str:
+    "Return the fastest CSV engine of pandas available, 'pyarrow' or 'c'."
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return 'c'
+    return 'pyarrow'
+
+
+def is_text_dtype(dtype: Any) -> bool:
+    "Return if some dtype is used for text columns."
+
+    from pandas.api.types import is_object_dtype, is_string_dtype
+
+    return is_object_dtype(dtype) or is_string_dtype(dtype)
+
+
+def csv_dtypes(data: bytes,
+               encoding: str = 'utf-8',
+               sample_rows: int = 1000,
+               max_category_ratio: float = 0.5) -> Dict[str, Any]:
+    """
+    Return column types for a CSV body inferred from its first rows.
+
+    Text columns with at most ``max_category_ratio`` distinct values per
+    row are typed as categories. Columns without a clear type are left out.
+    """
+    import pandas as pd
+    from pandas.api.types import is_bool_dtype, is_float_dtype, is_integer_dtype
+
+    sample = pd.read_csv(io.BytesIO(data), nrows=sample_rows, encoding=encoding)
+    dtypes = {}  # type: Dict[str, Any]
+    for name in sample.columns:
+        column = sample[name]
+        if is_bool_dtype(column.dtype):
+            continue
+        if is_integer_dtype(column.dtype):
+            dtypes[name] = 'int64'
+        elif is_float_dtype(column.dtype):
+            dtypes[name] = 'float64'
+        elif is_text_dtype(column.dtype) and len(column):
+            if column.nunique() <= max_category_ratio * len(column):
+                dtypes[name] = 'category'
+    return dtypes
+
+
+def compact_frame(df: 'pandas.DataFrame',
+                  categorize: bool = True,
+                  max_category_ratio: float = 0.5) -> 'pandas.DataFrame':
+    """
+    Return a data frame using less memory: integers are downcast and, if
+    ``categorize`` is set, repetitive text columns are made categorical.
+    """
+    import pandas as pd
+    from pandas.api.types import is_integer_dtype
+
+    for name in df.columns:
+        column = df[name]
+        if is_integer_dtype(column.dtype):
+            df[name] = pd.to_numeric(column, downcast='integer')
+        elif categorize and is_text_dtype(column.dtype) and len(column):
+            if column.nunique() <= max_category_ratio * len(column):
+                df[name] = column.astype('category')
+    return df
+
+
+def concat_frames(frames: List['pandas.DataFrame']) -> 'pandas.DataFrame':
+    "Concatenate data frames, merging the categories of categorical columns."
+
+    import pandas as pd
+    from pandas.api.types import union_categoricals
+
+    if len(frames) == 1:
+        return frames[0]
+    columns = frames[0].columns
+    categorical = [name for name in columns
+                   if isinstance(frames[0][name].dtype, pd.CategoricalDtype)]
+    unions = {name: union_categoricals([f[name] for f in frames]) for name in categorical}
+    df = pd.concat([f.drop(columns=categorical) for f in frames], ignore_index=True)
+    for name in categorical:
+        df[name] = unions[name]
+    return df[columns]
+
+
+def read_csv_frame(data: bytes,
+                   encoding: str = 'utf-8',
+                   sample_rows: int = 1000,
+                   chunk_rows: int = 100000,
+                   engine: Optional[str] = None) -> 'pandas.DataFrame':
+    """
+    Return a compact data frame for a CSV body.
+
+    Column types are inferred from the first ``sample_rows`` rows. With
+    the 'c' engine the body is read in chunks of ``chunk_rows`` rows, each
+    made compact before reading the next, with 'pyarrow' all at once.
+    If later rows do not fit the inferred types the body is read again,
+    letting pandas infer types from all rows.
+    """
+    import pandas as pd
+
+    if not data.strip():
+        return pd.DataFrame()
+    dtypes = csv_dtypes(data, encoding=encoding, sample_rows=sample_rows)
+    engine = engine or default_csv_engine()
+    try:
+        if engine == 'pyarrow':
+            df = pd.read_csv(io.BytesIO(data), encoding=encoding, dtype=dtypes, engine='pyarrow')
+            return compact_frame(df, categorize=False)
+        reader = pd.read_csv(io.BytesIO(data), encoding=encoding, dtype=dtypes,
+                             chunksize=chunk_rows)
+        with reader:
+            frames = [compact_frame(chunk, categorize=False) for chunk in reader]
+        return concat_frames(frames)
+    except (ValueError, TypeError):
+        # a column does not fit the type inferred from the sample
+        df = pd.read_csv(io.BytesIO(data), encoding=encoding)
+        return compact_frame(df)
+
+
+# Arrow and Parquet
+
+def read_arrow_table(data: bytes) -> 'pyarrow.Table':
+    """
+    Return the table in an Arrow IPC stream, an Arrow IPC file or a Parquet body.
+
+    The format is detected by the magic bytes at the start of the body.
+    Raises ``pyarrow.ArrowInvalid``, a ValueError, for invalid bodies.
+    """
+    import pyarrow as pa
+
+    buf = pa.py_buffer(data)
+    if data[:4] == b'PAR1':
+        import pyarrow.parquet as pq
+        return pq.read_table(pa.BufferReader(buf))
+    if data[:6] == b'ARROW1':
+        return pa.ipc.open_file(buf).read_all()
+    return pa.ipc.open_stream(buf).read_all()
+
+
+def table_summary(table: 'pyarrow.Table') -> str:
+    "Return an HTML summary of an Arrow table with its size and schema."
+
+    rows = ''.join('<tr><td>{}</td><td>{}</td></tr>'.format(
+        html.escape(field.name), html.escape(str(field.type))) for field in table.schema)
+    return ('<b>{:,} rows, {:,} columns, {:,} bytes</b>'
+            '<table><tr><th>Column</th><th>Type</th></tr>{}</table>').format(
+        table.num_rows, table.num_columns, table.nbytes, rows)
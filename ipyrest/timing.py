@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timing of the phases of sending a request and showing its response.
+
+Connections created by the pools of a ``TimedHTTPAdapter`` record how long
+they spend resolving host names, connecting, doing TLS handshakes and
+waiting for response headers in the ``Timings`` collected by the current
+thread, if any. Connection methods are wrapped per connection object
+rather than by subclassing, so recording cassettes with vcr still works.
+Connections are made by urllib3 as usual, the time spent resolving host
+names is told apart from connecting by the audit events of the socket
+module (Python 3.8+, before that it is included in the connect time).
+"""
+
+import sys
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+
+class Timings(object):
+    """
+    Durations in seconds of the phases of a request and of showing its response.
+
+    ``dns``, ``connect`` and ``tls`` are zero for requests reusing an open
+    connection. ``send`` is the rest of the time until the request was
+    sent, ``ttfb`` the time then waiting for the response headers and
+    ``download`` the time reading the body, including decompression.
+    ``decode`` is the time spent decoding and parsing the body as shared by
+    all views, ``render`` the time every view needed to render, including
+    any parsing it triggered. ``total`` spans everything.
+    """
+    phases = ['dns', 'connect', 'tls', 'send', 'ttfb', 'download', 'decode']
+
+    def __init__(self) -> None:
+        "Create timings for a request starting now."
+
+        self.dns = self.connect = self.tls = self.send = self.ttfb = 0.0
+        self.download = self.decode = self.total = 0.0
+        self.render = OrderedDict()  # type: Dict[str, float]
+        self.started = time.perf_counter()
+        self.headers_at = None  # type: Optional[float]
+        self.finished = None  # type: Optional[float]
+        self.resp = None  # type: Optional[requests.models.Response]
+
+    def finish_request(self,
+                       resp: requests.models.Response,
+                       end: Optional[float] = None) -> None:
+        """
+        Complete the request phases when the body of some response was read.
+
+        Without response headers recorded by a timed connection, e.g. for
+        other transports, their arrival is taken from ``resp.elapsed``.
+        """
+        end = time.perf_counter() if end is None else end
+        self.resp = resp
+        self.finished = end
+        network = self.dns + self.connect + self.tls
+        if self.headers_at is None:
+            self.headers_at = self.started + resp.elapsed.total_seconds()
+            self.ttfb = max(0.0, self.headers_at - self.started - network)
+        self.send = max(0.0, self.headers_at - self.started - network - self.ttfb)
+        self.download = max(0.0, end - self.headers_at)
+
+    def as_dict(self) -> Dict[str, Any]:
+        "Return the durations of all phases and views as a dict."
+
+        result = OrderedDict((phase, getattr(self, phase)) for phase in self.phases)
+        result['render'] = OrderedDict(self.render)
+        result['total'] = self.total
+        return result
+
+    def summary(self) -> str:
+        "Return the durations of all phases in milliseconds as text."
+
+        def ms(secs: float) -> str:
+            return '{:.0f} ms'.format(secs * 1000)
+
+        names = {'dns': 'DNS', 'tls': 'TLS', 'ttfb': 'TTFB'}
+        parts = ['{} {}'.format(names.get(phase, phase.capitalize()), ms(getattr(self, phase)))
+                 for phase in self.phases]
+        views = ', '.join(f'{name} {ms(secs)}' for (name, secs) in self.render.items())
+        parts.append('Render {}{}'.format(ms(sum(self.render.values())),
+                                          f' ({views})' if views else ''))
+        return 'Timing: {}, Total {}'.format(', '.join(parts), ms(self.total))
+
+
+# timings collected by the current thread
+_current = threading.local()
+
+
+def current_timings() -> Optional[Timings]:
+    "Return the timings collected by the current thread or None."
+
+    return getattr(_current, 'timings', None)
+
+
+@contextmanager
+def collect(timings: Timings) -> Iterator[Timings]:
+    "Collect phases of requests sent by the current thread in some timings."
+
+    previous = current_timings()
+    _current.timings = timings
+    try:
+        yield timings
+    finally:
+        _current.timings = previous
+
+
+# audit events marking the start of resolving a host name and of connecting
+SOCKET_EVENTS = frozenset(['socket.getaddrinfo', 'socket.connect'])
+
+
+def audit(event: str, args: Any) -> None:
+    "Record when socket events happen first while the current thread makes a connection."
+
+    if event in SOCKET_EVENTS:
+        marks = getattr(_current, 'marks', None)
+        if marks is not None and event not in marks:
+            marks[event] = time.perf_counter()
+
+
+if hasattr(sys, 'addaudithook'):
+    sys.addaudithook(audit)
+
+
+def instrument_connection(conn: Any) -> None:
+    """
+    Wrap the methods of a connection to record its phases in the current timings.
+
+    For connection stubs of vcr the real connection is wrapped, if any, as
+    the stubs pass attributes set on them on to it.
+    """
+    conn = getattr(conn, 'real_connection', conn)
+    new_conn = getattr(conn, '_new_conn', None)  # type: Any
+    connect = conn.connect
+    getresponse = conn.getresponse
+
+    def timed_new_conn() -> Any:
+        timings = current_timings()
+        if timings is None:
+            return new_conn()
+        marks = {}  # type: Dict[str, float]
+        _current.marks = marks
+        start = time.perf_counter()
+        try:
+            return new_conn()
+        finally:
+            end = time.perf_counter()
+            del _current.marks
+            # without a connect event resolving failed, or there are no audit hooks
+            resolved = marks.get('socket.connect', end if marks else start)
+            timings.dns += resolved - start
+            timings.connect += end - resolved
+
+    def timed_connect() -> Any:
+        timings = current_timings()
+        if timings is None:
+            return connect()
+        before = timings.dns + timings.connect
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            if isinstance(conn, HTTPSConnection):
+                elapsed = time.perf_counter() - start
+                timings.tls += max(0.0, elapsed - (timings.dns + timings.connect - before))
+
+    def timed_getresponse(*args, **kwargs) -> Any:
+        timings = current_timings()
+        start = time.perf_counter()
+        resp = getresponse(*args, **kwargs)
+        if timings is not None:
+            timings.headers_at = time.perf_counter()
+            timings.ttfb += timings.headers_at - start
+        return resp
+
+    if new_conn is not None:
+        conn._new_conn = timed_new_conn
+    conn.connect = timed_connect
+    conn.getresponse = timed_getresponse
+
+
+class TimedPoolMixin(object):
+    "A mixin for connection pools creating timed connections."
+
+    def _new_conn(self) -> Any:
+        conn = super()._new_conn()  # type: ignore
+        instrument_connection(conn)
+        return conn
+
+
+class TimedHTTPConnectionPool(TimedPoolMixin, HTTPConnectionPool):
+    "A pool of timed HTTP connections."
+
+
+class TimedHTTPSConnectionPool(TimedPoolMixin, HTTPSConnectionPool):
+    "A pool of timed HTTPS connections."
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    "An HTTP adapter using pools of timed connections."
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': TimedHTTPConnectionPool,
+            'https': TimedHTTPSConnectionPool,
+        }
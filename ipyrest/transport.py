@@ -0,0 +1,589 @@
+# -*- coding: utf-8 -*-
+
+"""
+Transports used by ipyrest to send HTTP requests.
+
+A transport owns whatever state is needed to talk to servers, e.g. a
+``requests.Session`` with a pool of kept-alive connections. One default
+transport is shared by all ``Api`` instances in a kernel, so repeatedly
+sending requests to the same hosts reuses already open TCP/TLS connections
+instead of doing a new handshake on every click.
+
+Transports also negotiate compressed transfers with the content codings
+urllib3 can decode here, which it does while reading the body in chunks,
+and account for the bytes received on the wire and after decoding.
+
+Bodies of streamed responses can be read as a ``Download``, in chunks
+passed on while they arrive, with progress information and a way to
+abort from another thread.
+"""
+
+import time
+import tempfile
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from collections import OrderedDict
+from typing import (Dict, Optional, Any, NamedTuple, Tuple, Union, List, Sequence,
+                    Callable)
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.util.request import ACCEPT_ENCODING
+from urllib3.exceptions import ReadTimeoutError
+
+from .timing import TimedHTTPAdapter
+
+
+# Timeouts
+
+class Timeouts(NamedTuple):
+    """
+    Timeouts in seconds for the phases of a request.
+
+    ``connect`` limits establishing a connection, ``read`` limits waiting
+    for any data from the server and ``total`` is a deadline for the entire
+    request including reading the body. ``None`` means no limit.
+    """
+    connect: Optional[float] = None
+    read: Optional[float] = None
+    total: Optional[float] = None
+
+
+TimeoutSpec = Union[None, float, Tuple[float, float], Timeouts]
+
+
+def as_timeouts(timeout: TimeoutSpec) -> Timeouts:
+    """
+    Return a Timeouts object for some timeout specification.
+
+    A single number is used for all phases, a pair is taken as connect and
+    read timeouts like in ``requests``.
+    """
+    if timeout is None:
+        return Timeouts()
+    if isinstance(timeout, Timeouts):
+        return timeout
+    if isinstance(timeout, tuple):
+        connect, read = timeout
+        return Timeouts(connect=connect, read=read)
+    return Timeouts(connect=timeout, read=timeout, total=timeout)
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    "The total deadline of a request has passed."
+
+
+def timeout_phase(exc: requests.exceptions.Timeout) -> str:
+    "Return the name of the phase that timed out for some timeout exception."
+
+    if isinstance(exc, DeadlineExceeded):
+        return 'total'
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return 'connect'
+    return 'read'
+
+
+# Compression
+
+# content codings by preference, better compression first
+ENCODING_PREFERENCE = ['zstd', 'br', 'gzip', 'deflate']
+
+
+def supported_encodings() -> List[str]:
+    """
+    Return the content codings urllib3 can decode, best first.
+
+    These are gzip and deflate, plus br if brotli is installed and zstd
+    if zstandard is installed.
+    """
+    encodings = [e.strip() for e in ACCEPT_ENCODING.split(',') if e.strip()]
+    return sorted(encodings, key=lambda e: (ENCODING_PREFERENCE + [e]).index(e))
+
+
+def accept_encoding(encodings: Optional[Sequence[str]] = None) -> str:
+    """
+    Return an Accept-Encoding header value for some content codings.
+
+    None stands for all supported codings, an empty sequence for no
+    compression. Raises ValueError for codings that cannot be decoded.
+    """
+    if encodings is None:
+        encodings = supported_encodings()
+    unknown = [e for e in encodings if e not in supported_encodings() + ['identity']]
+    if unknown:
+        raise ValueError('Cannot decode content codings: {}'.format(', '.join(unknown)))
+    return ', '.join(encodings) or 'identity'
+
+
+class TransferSizes(NamedTuple):
+    """
+    Sizes in bytes of a response body as received on the wire and decoded.
+
+    ``wire`` is None if unknown, ``encoding`` is the content coding used.
+    """
+    wire: Optional[int]
+    decoded: int
+    encoding: str = 'identity'
+
+    @property
+    def ratio(self) -> Optional[float]:
+        "The compression ratio, decoded size per wire size, or None."
+
+        return self.decoded / self.wire if self.wire else None
+
+
+def transfer_sizes(resp: requests.models.Response) -> TransferSizes:
+    """
+    Return the sizes of a response body read already, on the wire and decoded.
+
+    The wire size is what urllib3 read from the connection (or a recorded
+    cassette). Only if that is not available, e.g. for responses built by
+    hand, it is taken from Content-Length, but never for responses without
+    a body like those to HEAD requests, where it is the size of a GET.
+    """
+    decoded = len(resp.content or b'')
+    encoding = resp.headers.get('Content-Encoding', '').strip().lower() or 'identity'
+    wire = None  # type: Optional[int]
+    method = getattr(resp.request, 'method', None) or ''
+    if method.upper() == 'HEAD' or resp.status_code in (204, 304):
+        wire = 0
+    else:
+        try:
+            wire = resp.raw.tell()
+        except (AttributeError, OSError, ValueError):
+            pass
+    if wire is None:
+        length = resp.headers.get('Content-Length', '')
+        if length.isdigit():
+            wire = int(length)
+        elif encoding == 'identity':
+            wire = decoded
+    return TransferSizes(wire=wire, decoded=decoded, encoding=encoding)
+
+
+# Downloads
+
+class DownloadAborted(requests.exceptions.RequestException):
+    "A download was aborted before the body was read completely."
+
+
+class Download(object):
+    """
+    The body of a streamed response, read in chunks with progress information.
+
+    ``total`` is the number of bytes expected on the wire, if known from
+    Content-Length. Chunks are collected in memory, or with a given
+    ``spool_size`` in a temporary file rolling over to disk when getting
+    larger than that, so they are never held twice while downloading.
+    Spooling does not limit the memory needed for the response content,
+    which is read back from the file afterwards, but at most
+    ``max_content`` bytes of it are, if given. The complete body stays
+    available in ``file`` until the download is closed.
+    ``abort`` may be called from any thread. With a ``deadline`` (a value
+    of ``time.monotonic()``) reading raises DeadlineExceeded when it has
+    passed, also if the server stalls or trickles data.
+
+    Example:
+
+        resp = default_transport.request('get', url, stream=True)
+        Download(resp, spool_size=10 ** 8).read(lambda chunk: print(len(chunk)))
+    """
+
+    def __init__(self,
+                 resp: requests.models.Response,
+                 chunk_size: int = 64 * 1024,
+                 spool_size: Optional[int] = None,
+                 deadline: Optional[float] = None,
+                 max_content: Optional[int] = None) -> None:
+        "Create a download for the body of some streamed response, nothing is read yet."
+
+        self.resp = resp
+        self.chunk_size = chunk_size
+        self.spool_size = spool_size
+        self.deadline = deadline
+        self.max_content = max_content
+        self.file = None  # type: Any
+        length = resp.headers.get('Content-Length', '')
+        self.total = int(length) if length.isdigit() else None  # type: Optional[int]
+        self.received = 0
+        self.started = None  # type: Optional[float]
+        self.finished = None  # type: Optional[float]
+        self._abort = threading.Event()
+        self._expired = threading.Event()
+
+    @property
+    def wire_bytes(self) -> int:
+        "The number of bytes read from the wire so far."
+
+        try:
+            return self.resp.raw.tell()
+        except (AttributeError, OSError, ValueError):
+            return self.received
+
+    @property
+    def elapsed(self) -> float:
+        "The seconds spent reading the body so far."
+
+        if self.started is None:
+            return 0.0
+        end = time.monotonic() if self.finished is None else self.finished
+        return end - self.started
+
+    @property
+    def rate(self) -> float:
+        "The bytes read from the wire per second so far."
+
+        elapsed = self.elapsed
+        return self.wire_bytes / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def fraction(self) -> Optional[float]:
+        "The fraction of the body read so far, if its length is known."
+
+        return min(1.0, self.wire_bytes / self.total) if self.total else None
+
+    @property
+    def aborted(self) -> bool:
+        "If the download was aborted."
+
+        return self._abort.is_set()
+
+    @property
+    def expired(self) -> bool:
+        "If the deadline passed while reading."
+
+        return self._expired.is_set()
+
+    @property
+    def truncated(self) -> bool:
+        "If the response content is only the beginning of the body spooled."
+
+        return self.finished is not None and len(self.resp.content) < self.received
+
+    def abort(self) -> None:
+        """
+        Stop reading, making ``read`` raise DownloadAborted.
+
+        A read blocked waiting for data, e.g. on an idle event stream, is
+        interrupted by shutting the connection down, if urllib3 supports it.
+        """
+        self._abort.set()
+        self.shutdown()
+
+    def expire(self) -> None:
+        "Stop reading because the deadline passed, making ``read`` raise DeadlineExceeded."
+
+        self._expired.set()
+        self.shutdown()
+
+    def shutdown(self) -> None:
+        "Shut the connection down if the body is being read."
+
+        shutdown = getattr(self.resp.raw, 'shutdown', None)
+        if shutdown is not None and self.started is not None and self.finished is None:
+            try:
+                shutdown()
+            except (OSError, ValueError):
+                pass
+
+    def close(self) -> None:
+        "Close the spooled file of the body, if any."
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def read(self, on_chunk: Optional[Callable[[bytes], None]] = None) -> bytes:
+        """
+        Read the body, passing every chunk to some callback, and return it.
+
+        Afterwards the response content is set as if it had not been
+        streamed, when spooling to at most ``max_content`` bytes read back
+        from the spooled file. On abort or when the deadline passed the
+        response is closed. The deadline is watched by a timer shutting the connection
+        down, as socket timeouts restart with every byte received.
+        """
+        self.started = time.monotonic()
+        chunks = []  # type: List[bytes]
+        spool = None  # type: Any
+        if self.spool_size is not None:
+            spool = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        watchdog = None  # type: Optional[threading.Timer]
+        if self.deadline is not None:
+            watchdog = threading.Timer(max(0.0, self.deadline - self.started), self.expire)
+            watchdog.daemon = True
+            watchdog.start()
+        try:
+            try:
+                for chunk in self.resp.iter_content(self.chunk_size):
+                    if self.aborted or self.expired:
+                        break
+                    if spool is None:
+                        chunks.append(chunk)
+                    else:
+                        spool.write(chunk)
+                    self.received += len(chunk)
+                    if on_chunk is not None:
+                        on_chunk(chunk)
+            except requests.exceptions.RequestException:
+                # the connection was shut down by abort or expire
+                if not (self.aborted or self.expired):
+                    raise
+            if watchdog is not None:
+                watchdog.cancel()
+            if self.expired or (self.deadline is not None and time.monotonic() > self.deadline):
+                self._expired.set()
+                self.resp.close()
+                raise DeadlineExceeded('Total deadline exceeded after {} bytes'.format(
+                    self.received))
+            if self.aborted:
+                self.resp.close()
+                raise DownloadAborted(
+                    'Download aborted after {} bytes'.format(self.received))
+            if spool is None:
+                content = b''.join(chunks)
+            else:
+                spool.seek(0)
+                content = spool.read(self.max_content if self.max_content is not None else -1)
+                spool.seek(0)
+                self.file, spool = spool, None
+        finally:
+            if watchdog is not None:
+                watchdog.cancel()
+            if spool is not None:
+                spool.close()
+        self.finished = time.monotonic()
+        self.resp._content = content
+        return content
+
+
+# Transports
+
+class Transport(object):
+    """
+    Abstract transport baseclass sending a request and returning a
+    ``requests.Response`` object.
+    """
+
+    def request(self, method: str, url: str, **kwargs) -> requests.models.Response:
+        "Send a request and return its response."
+
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        "Return usage statistics per host, if available."
+
+        return {}
+
+    def close(self) -> None:
+        "Release all resources held by this transport."
+
+        pass
+
+
+class SessionTransport(Transport):
+    """
+    A transport based on a ``requests.Session`` with a configurable pool
+    of kept-alive connections.
+
+    ``pool_connections`` is the number of hosts for which connection pools
+    are cached, ``pool_maxsize`` the number of connections kept per host,
+    ``retries`` the number of retries on connection errors (with some
+    exponential ``backoff_factor``) and ``keep_alive`` defines if connections
+    are kept open after a response was read. ``encodings`` are the content
+    codings accepted for compressed transfers, all supported ones if None,
+    none if empty. Request headers can still override Accept-Encoding.
+    Like with ``requests.get`` cookies set by servers are not kept, so
+    ``Api`` instances sharing a transport never send each other's cookies.
+    """
+
+    def __init__(self,
+                 pool_connections: int = 10,
+                 pool_maxsize: int = 10,
+                 retries: int = 0,
+                 backoff_factor: float = 0,
+                 keep_alive: bool = True,
+                 encodings: Optional[Sequence[str]] = None) -> None:
+        "Create a new transport with its own session and connection pools."
+
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.keep_alive = keep_alive
+        self.accept_encoding = accept_encoding(encodings)
+        self.chunk_size = 64 * 1024
+        self.num_requests = OrderedDict()  # type: Dict[str, int]
+        self.num_bytes = {}  # type: Dict[str, List[int]]
+        self._lock = threading.Lock()
+        self.session = self.create_session()
+
+    def create_adapter(self) -> HTTPAdapter:
+        """
+        Return a new HTTP adapter configured with this transport's settings.
+
+        Its connections record the phases of requests, see ``timing.collect``.
+        """
+
+        # like requests' default do not retry reads, so timeouts stay ReadTimeouts
+        max_retries = Retry(total=self.retries,
+                            read=False,
+                            backoff_factor=self.backoff_factor,
+                            raise_on_status=False)
+        return TimedHTTPAdapter(pool_connections=self.pool_connections,
+                                pool_maxsize=self.pool_maxsize,
+                                max_retries=max_retries)
+
+    def create_session(self) -> requests.Session:
+        "Return a new session using pooled adapters for HTTP and HTTPS, keeping no cookies."
+
+        session = requests.Session()
+        # reject all cookies set by responses, cookies passed per request still work
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = self.create_adapter()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        if not self.keep_alive:
+            session.headers['Connection'] = 'close'
+        session.headers['Accept-Encoding'] = self.accept_encoding
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.models.Response:
+        """
+        Send a request using the pooled session and return its response.
+
+        The ``timeout`` keyword argument accepts anything ``as_timeouts``
+        does. If there is a total deadline the body is read in chunks and
+        ``DeadlineExceeded`` is raised as soon as the deadline has passed.
+        Bytes received are accounted per host unless streaming.
+        """
+        timeouts = as_timeouts(kwargs.pop('timeout', None))
+        if timeouts.total is None:
+            kwargs['timeout'] = (timeouts.connect, timeouts.read)
+            resp = self.session.request(method.upper(), url, **kwargs)
+        else:
+            resp = self.request_with_deadline(method, url, timeouts, **kwargs)
+        host = requests.utils.urlparse(resp.url or url).netloc
+        sizes = None if kwargs.get('stream') else transfer_sizes(resp)
+        with self._lock:
+            self.num_requests[host] = self.num_requests.get(host, 0) + 1
+            if sizes is not None:
+                num_bytes = self.num_bytes.setdefault(host, [0, 0])
+                num_bytes[0] += sizes.decoded if sizes.wire is None else sizes.wire
+                num_bytes[1] += sizes.decoded
+        return resp
+
+    def request_with_deadline(self,
+                              method: str,
+                              url: str,
+                              timeouts: Timeouts,
+                              **kwargs) -> requests.models.Response:
+        """
+        Send a request and read its body, giving up when the total deadline passes.
+
+        The timeouts for connecting and waiting for the response headers are
+        cut down to the time left. The body is read by a ``Download`` shutting
+        the connection down when the deadline passes, also while the server
+        stalls or trickles data.
+
+        With ``stream=True`` the deadline limits only the time until the
+        response headers arrive, pass it on to a ``Download`` of the body.
+        """
+        deadline = time.monotonic() + timeouts.total
+
+        def remaining(limit: Optional[float]) -> float:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                raise DeadlineExceeded(
+                    'Total deadline of {} secs exceeded'.format(timeouts.total))
+            return left if limit is None else min(limit, left)
+
+        connect, read = remaining(timeouts.connect), remaining(timeouts.read)
+        kwargs['timeout'] = (connect, read)
+        stream = kwargs.pop('stream', False)
+        resp = None
+        try:
+            resp = self.session.request(method.upper(), url, stream=True, **kwargs)
+            if stream:
+                return resp
+            # socket timeouts restart with every byte, a download watches the deadline
+            Download(resp, self.chunk_size, deadline=deadline).read()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+            if resp is not None:
+                resp.close()
+            if isinstance(exc, DeadlineExceeded):
+                raise
+            # requests reports read timeouts while streaming as connection errors
+            if exc.args and isinstance(exc.args[0], ReadTimeoutError):
+                exc = requests.exceptions.ReadTimeout(exc, request=exc.request)
+            if not isinstance(exc, requests.exceptions.Timeout):
+                raise
+            # timeouts cut down to the time left mean the deadline has passed
+            if isinstance(exc, requests.exceptions.ConnectTimeout):
+                clipped = timeouts.connect is None or connect < timeouts.connect
+            else:
+                clipped = timeouts.read is None or read < timeouts.read
+            if clipped:
+                raise DeadlineExceeded(
+                    'Total deadline of {} secs exceeded'.format(timeouts.total)) from exc
+            raise exc
+        return resp
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Return statistics about requests sent and connections opened per host.
+
+        For every host (``host[:port]``) a dict is returned with the number
+        of ``requests`` sent, the number of ``connections`` opened, how many
+        requests ``reused`` an open connection and the ``reuse_rate``.
+        Connection counts are only known for hosts still held in the pool.
+        ``wire_bytes`` and ``decoded_bytes`` are the sizes of all bodies read
+        and ``compression_ratio`` is the ratio of both.
+        """
+        connections = {}  # type: Dict[str, int]
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host
+                if pool.port and pool.port != {'http': 80, 'https': 443}.get(pool.scheme):
+                    host = f'{host}:{pool.port}'
+                connections[host] = connections.get(host, 0) + pool.num_connections
+
+        result = OrderedDict()  # type: Dict[str, Dict[str, Any]]
+        with self._lock:
+            items = list(self.num_requests.items())
+            num_bytes = {host: tuple(sizes) for (host, sizes) in self.num_bytes.items()}
+        for host, num_requests in items:
+            num_connections = connections.get(host)
+            if num_connections is None:
+                reused, rate = None, None
+            else:
+                reused = max(0, num_requests - num_connections)
+                rate = reused / num_requests if num_requests else 0.0
+            wire, decoded = num_bytes.get(host, (0, 0))
+            result[host] = dict(
+                requests=num_requests,
+                connections=num_connections,
+                reused=reused,
+                reuse_rate=rate,
+                wire_bytes=wire,
+                decoded_bytes=decoded,
+                compression_ratio=decoded / wire if wire else None)
+        return result
+
+    def close(self) -> None:
+        "Close all pooled connections and start with a fresh session."
+
+        self.session.close()
+        self.session = self.create_session()
+        with self._lock:
+            self.num_requests.clear()
+            self.num_bytes.clear()
+
+
+# default transport shared by all Api instances
+default_transport = SessionTransport()
@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+
+"""
+An index over an XML document, built by incremental parsing.
+
+The body is fed to an ``XMLPullParser`` in chunks and every element is
+dropped from the parsed tree as soon as it is complete. Only a compact
+table of elements is kept, with tags, shortened attribute values and text,
+so memory stays bounded even for huge feeds. A tag index answers XPath-like
+queries without parsing the document again.
+"""
+
+import re
+import sys
+from bisect import bisect_right
+from xml.etree.ElementTree import XMLPullParser, ParseError
+from typing import Dict, List, Optional, Tuple
+
+XPATH_STEP_PAT = re.compile(r"""
+    (?P<axis>//|/)?
+    (?P<name>\*|[\w\-.:]+)
+    (?:\[\s*(?:
+        (?P<position>\d+)
+      | @(?P<attr>[\w\-.:]+)(?:\s*=\s*(?P<value>"[^"]*"|'[^']*'))?
+    )\s*\])?
+""", re.X)
+
+# a step is (axis, name, position, attribute, value)
+XPathStep = Tuple[str, str, Optional[int], Optional[str], Optional[str]]
+
+
+def local_name(tag: str) -> str:
+    "Return a tag without its namespace, e.g. ``entry`` for ``{http://...}entry``."
+
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_xpath(text: str) -> List[XPathStep]:
+    """
+    Return the steps of an XPath-like query like ``/feed/entry[2]/title``.
+
+    Supported are child (``/``) and descendant (``//``) steps, names with an
+    optional prefix (ignored) or ``*``, and one predicate per step, either a
+    position ``[n]`` among siblings with the same tag, an attribute test
+    ``[@id]`` or an attribute value test ``[@id="x"]``. Relative queries
+    like ``entry`` are searched everywhere. Raises ValueError if invalid.
+    """
+    text = text.strip()
+    if not text.startswith('/'):
+        text = '//' + text
+    steps = []
+    pos = 0
+    while pos < len(text):
+        m = XPATH_STEP_PAT.match(text, pos)
+        if not m or not m.group('axis'):
+            raise ValueError(f'Invalid query at position {pos}: {text}')
+        axis = 'descendant' if m.group('axis') == '//' else 'child'
+        name = local_name(m.group('name')).rsplit(':', 1)[-1]
+        position = int(m.group('position')) if m.group('position') else None
+        value = m.group('value')[1:-1] if m.group('value') else None
+        steps.append((axis, name, position, m.group('attr'), value))
+        pos = m.end()
+    return steps
+
+
+class XMLIndex(object):
+    """
+    A compact table of all elements of an XML document, numbered in
+    document order, with an index of element numbers by local tag name.
+
+    Attribute values and texts are cut to ``max_text`` characters. After
+    ``max_nodes`` elements parsing stops and ``truncated`` is set. Parse
+    errors are kept in ``error``, elements parsed so far stay available.
+
+    Example:
+
+        index = XMLIndex(b'<feed><entry><title>A</title></entry></feed>')
+        index.find('//entry/title')    # [2]
+        index.xpath(2)                 # '/feed/entry[1]/title[1]'
+    """
+
+    def __init__(self,
+                 data: bytes,
+                 chunk_size: int = 64 * 1024,
+                 max_nodes: int = 1000000,
+                 max_text: int = 200) -> None:
+        "Create an index for an XML document, parsing it incrementally."
+
+        self.chunk_size = chunk_size
+        self.max_nodes = max_nodes
+        self.max_text = max_text
+        self.tags = []  # type: List[str]
+        self.parents = []  # type: List[int]
+        self.ends = []  # type: List[int]
+        self.positions = []  # type: List[int]
+        self.num_children = []  # type: List[int]
+        self.attribs = []  # type: List[Dict[str, str]]
+        self.texts = []  # type: List[str]
+        self.tag_index = {}  # type: Dict[str, List[int]]
+        self.truncated = False
+        self.error = None  # type: Optional[str]
+        self.parse(data)
+
+    def shorten(self, text: Optional[str]) -> str:
+        "Return some text stripped and cut to at most max_text characters."
+
+        text = (text or '').strip()
+        return text if len(text) <= self.max_text else text[:self.max_text] + '…'
+
+    def parse(self, data: bytes) -> None:
+        "Feed a document to a pull parser in chunks, indexing and dropping elements."
+
+        parser = XMLPullParser(events=('start', 'end'))
+        elems = []  # type: list
+        ids = []  # type: List[int]
+        counters = [{}]  # type: List[Dict[str, int]]
+        view = memoryview(data)
+        try:
+            for offset in range(0, len(data), self.chunk_size):
+                parser.feed(bytes(view[offset:offset + self.chunk_size]))
+                for event, elem in parser.read_events():
+                    if event == 'start':
+                        if len(self.tags) >= self.max_nodes:
+                            self.truncated = True
+                            break
+                        tag = sys.intern(elem.tag)
+                        name = local_name(tag)
+                        i = len(self.tags)
+                        self.tags.append(tag)
+                        self.parents.append(ids[-1] if ids else -1)
+                        self.ends.append(i)
+                        self.num_children.append(0)
+                        if ids:
+                            self.num_children[ids[-1]] += 1
+                        counter = counters[-1]
+                        counter[name] = counter.get(name, 0) + 1
+                        self.positions.append(counter[name])
+                        self.attribs.append({k: self.shorten(v) for (k, v) in elem.attrib.items()})
+                        self.texts.append('')
+                        self.tag_index.setdefault(name, []).append(i)
+                        elems.append(elem)
+                        ids.append(i)
+                        counters.append({})
+                    else:
+                        i = ids.pop()
+                        counters.pop()
+                        elems.pop()
+                        self.ends[i] = len(self.tags) - 1
+                        self.texts[i] = self.shorten(elem.text)
+                        # drop the finished element, it is the last child of its parent
+                        elem.clear()
+                        if elems:
+                            del elems[-1][-1]
+                if self.truncated:
+                    break
+            if not self.truncated:
+                parser.close()
+        except ParseError as exc:
+            self.error = str(exc)
+        for i in ids:
+            self.ends[i] = len(self.tags) - 1
+
+    def __len__(self) -> int:
+        return len(self.tags)
+
+    def children(self, i: int) -> List[int]:
+        "Return the numbers of the child elements of an element, -1 being the document."
+
+        if i < 0:
+            return [0] if self.tags else []
+        result = []
+        child, end = i + 1, self.ends[i]
+        while child <= end:
+            result.append(child)
+            child = self.ends[child] + 1
+        return result
+
+    def ancestors(self, i: int) -> List[int]:
+        "Return the numbers of the elements from the root down to an element."
+
+        result = []
+        while i >= 0:
+            result.append(i)
+            i = self.parents[i]
+        return result[::-1]
+
+    def xpath(self, i: int) -> str:
+        "Return an XPath locating an element, like ``/feed/entry[3]/title[1]``."
+
+        steps = []
+        for j in self.ancestors(i):
+            name = local_name(self.tags[j])
+            steps.append(name if j == 0 else '{}[{}]'.format(name, self.positions[j]))
+        return '/' + '/'.join(steps)
+
+    def matches(self, i: int, step: XPathStep) -> bool:
+        "Return if an element matches the name and predicate of a query step."
+
+        axis, name, position, attr, value = step
+        if name != '*' and local_name(self.tags[i]) != name:
+            return False
+        if position is not None and self.positions[i] != position:
+            return False
+        if attr is not None:
+            attribs = {local_name(k): v for (k, v) in self.attribs[i].items()}
+            if attr not in attribs or (value is not None and attribs[attr] != value):
+                return False
+        return True
+
+    def find(self, query: str) -> List[int]:
+        """
+        Return the elements matching an XPath-like query, in document order.
+
+        See ``parse_xpath`` for the supported syntax.
+        """
+        current = [-1]
+        for step in parse_xpath(query):
+            axis, name = step[:2]
+            found = set()
+            for i in current:
+                if axis == 'child':
+                    candidates = self.children(i)
+                else:
+                    lo, end = i + 1, (self.ends[i] if i >= 0 else len(self.tags) - 1)
+                    if name == '*':
+                        candidates = range(lo, end + 1)
+                    else:
+                        ids = self.tag_index.get(name, [])
+                        candidates = ids[bisect_right(ids, lo - 1):bisect_right(ids, end)]
+                found.update(j for j in candidates if self.matches(j, step))
+            current = sorted(found)
+        return current
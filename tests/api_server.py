@@ -98,6 +98,77 @@ def get_slow(period: float) -> str:
     return f'Sorry for being {period} seconds late!'
 
 
+@app.route('/set_cookie')
+def set_cookie() -> Response:
+    "Set a session cookie."
+    resp = jsonify(ok=True)
+    resp.set_cookie('session', 'secret')
+    return resp
+
+
+@app.route('/get_cookies')
+def get_cookies() -> Response:
+    "Return the cookies sent with the request."
+    return jsonify(request.cookies)
+
+
+@app.route('/get_drip/<int:num>/<float:period>')
+def get_drip(num: int, period: float) -> Response:
+    "Return num bytes, one every period seconds after the headers sent after some delay."
+    time.sleep(float(request.args.get('delay', 0)))
+
+    def generate():
+        for i in range(num):
+            time.sleep(period)
+            yield 'x'
+    # a known length avoids chunked encoding, so reads wait for many bytes
+    return Response(generate(), mimetype='text/plain', headers={'Content-Length': str(num)})
+
+
+@app.route('/get_compressible/<int:num>')
+def get_compressible(num: int) -> str:
+    "Return a repetitive JSON list, compressed as accepted by the client."
+    import gzip
+    import zlib
+
+    body = json.dumps([{'id': i, 'name': 'item'} for i in range(num)]).encode('utf-8')
+    accepted = request.headers.get('Accept-Encoding', '')
+    encoding = None
+    if 'gzip' in accepted:
+        body, encoding = gzip.compress(body), 'gzip'
+    elif 'deflate' in accepted:
+        body, encoding = zlib.compress(body), 'deflate'
+    resp = app.make_response(body)
+    resp.mimetype = 'application/json'
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    return resp
+
+
+@app.route('/get_stream/<int:num>/<float:period>')
+def get_stream(num: int, period: float) -> Response:
+    "Return num CSV lines, one chunk every period seconds."
+    def generate():
+        yield 'id,name\n'
+        for i in range(num):
+            time.sleep(period)
+            yield f'{i},item {i}\n'
+    return Response(generate(), mimetype='text/csv')
+
+
+@app.route('/get_events/<int:num>/<float:period>')
+def get_events(num: int, period: float) -> Response:
+    "Return num Server-Sent Events, one every period seconds, continuing after Last-Event-ID."
+    start = int(request.headers.get('Last-Event-ID', '0')) + 1
+
+    def generate():
+        yield 'retry: 100\n: keep-alive\n\n'
+        for i in range(start, start + num):
+            time.sleep(period)
+            yield f'id: {i}\nevent: tick\ndata: {{"count": {i}}}\n\n'
+    return Response(generate(), mimetype='text/event-stream')
+
+
 @app.route('/get_protobuf')
 def get_protobuf() -> str:
     person_ser = b'\n\x08John Doe\x10\xd2\t\x1a\x10jdoe@example.com"\x0c\n\x08555-4321\x10\x01'
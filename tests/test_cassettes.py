@@ -0,0 +1,86 @@
+"""
+Ipyrest tests for the cassette cache and the compact cassette format.
+
+To be executed with pytest:
+
+    pytest -s -v test_cassettes.py
+"""
+
+from vcr.request import Request
+from vcr.serializers import yamlserializer
+
+from ipyrest.cassettes import (CassetteCache, convert_cassette, read_cassette,
+                               write_cassette, jsonl_serializer)
+
+
+def make_interactions():
+    "Return requests and responses with a text and a binary body."
+
+    requests = [
+        Request('GET', 'http://example.com/text', None, {}),
+        Request('POST', 'http://example.com/binary', b'\x00\x01', {}),
+    ]
+    responses = [
+        {'status': {'code': 200, 'message': 'OK'},
+         'headers': {'Content-Type': ['text/plain']},
+         'body': {'string': b'Hello'}},
+        {'status': {'code': 200, 'message': 'OK'},
+         'headers': {'Content-Type': ['application/octet-stream']},
+         'body': {'string': bytes(range(256)) * 8}},
+    ]
+    return requests, responses
+
+
+def test_convert_yaml_to_jsonl(tmp_path):
+    "Convert a YAML cassette into JSON lines with blobs and read it back."
+
+    requests, responses = make_interactions()
+    src, dst = tmp_path / 'c.yaml', tmp_path / 'c.jsonl'
+    write_cassette(src, dict(requests=requests, responses=responses), yamlserializer)
+
+    assert convert_cassette(src, dst) == 2
+    lines = dst.read_text().splitlines()
+    assert len(lines) == 3
+    assert len(list((tmp_path / 'c.jsonl.blobs').iterdir())) == 1
+
+    requests2, responses2 = read_cassette(dst, jsonl_serializer)
+    assert [r.uri for r in requests2] == [r.uri for r in requests]
+    assert requests2[1].body == b'\x00\x01'
+    _, expected = make_interactions()
+    assert [r['body']['string'] for r in responses2] == \
+        [r['body']['string'] for r in expected]
+
+
+def test_cache_invalidation(tmp_path):
+    "Load a cassette once and again only after it has changed."
+
+    requests, responses = make_interactions()
+    path = tmp_path / 'c.jsonl'
+    write_cassette(path, dict(requests=requests[:1], responses=responses[:1]),
+                   jsonl_serializer)
+
+    cache = CassetteCache()
+    assert cache.contains(path, 'get', 'http://example.com/text', jsonl_serializer)
+    assert not cache.contains(path, 'POST', 'http://example.com/binary', jsonl_serializer)
+    assert cache.num_loads == 1
+
+    write_cassette(path, dict(requests=requests, responses=responses),
+                   jsonl_serializer)
+    assert cache.contains(path, 'POST', 'http://example.com/binary', jsonl_serializer)
+    assert cache.num_loads == 2
+    assert not cache.contains(tmp_path / 'missing.jsonl', 'GET', 'http://x', jsonl_serializer)
+
+
+def test_cache_contains_without_copies(tmp_path, monkeypatch):
+    "Check if a request is cached without copying the recorded interactions."
+
+    requests, responses = make_interactions()
+    path = tmp_path / 'c.jsonl'
+    write_cassette(path, dict(requests=requests, responses=responses), jsonl_serializer)
+
+    cache = CassetteCache()
+    loaded, _ = cache.load(path, jsonl_serializer)
+    assert loaded is not cache.entries[str(path)].requests
+    monkeypatch.setattr(cache, 'load', None)
+    assert cache.contains(path, 'GET', 'http://example.com/text', jsonl_serializer)
+    assert cache.num_loads == 1
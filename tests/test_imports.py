@@ -0,0 +1,38 @@
+"""
+Ipyrest tests keeping the time needed to import ipyrest from regressing.
+
+To be executed with pytest:
+
+    pytest -s -v test_imports.py
+"""
+
+import sys
+import json
+import subprocess
+
+
+# modules needed only for rendering or recording, not to be imported early
+HEAVY_MODULES = ['vcr', 'yaml', 'ipyleaflet', 'ipyvolume', 'pandas', 'numpy',
+                 'qgrid', 'geojson', 'gpxpy', 'pyarrow',
+                 'google.protobuf']
+
+IMPORT_SCRIPT = f"""
+import sys, json, time
+import requests, ipywidgets
+start = time.perf_counter()
+import ipyrest
+elapsed = time.perf_counter() - start
+heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]
+print(json.dumps(dict(elapsed=elapsed, heavy=heavy)))
+"""
+
+
+def test_import_time():
+    "Import ipyrest in a fresh interpreter, without heavy view dependencies."
+
+    out = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT])
+    result = json.loads(out.decode('utf-8').strip().split('\n')[-1])
+    print('import ipyrest: {:.3f} secs'.format(result['elapsed']))
+    assert result['heavy'] == []
+    # requests and ipywidgets are already imported, the rest is ipyrest's own
+    assert result['elapsed'] < 0.5
@@ -6,13 +6,16 @@ To be executed with pytest:
     pytest -s -v test_local.py
 """
 
+import os
+import time
 from os.path import exists, join
 
 import pytest
-import timeout_decorator
+import requests
 
 from api_server import app, find_free_port, run_flask_app
 from ipyrest import Api, recorder
+from ipyrest.transport import DeadlineExceeded, Timeouts
 
 
 port = find_free_port()
@@ -44,6 +47,25 @@ def test_vcr():
     assert exists(join(recorder.cassette_library_dir, cassette_path))
 
 
+def test_vcr_cache():
+    "Replay a recorded request, loading the cassette file only once."
+
+    from ipyrest.cassettes import cassette_cache
+
+    cassette_path = 'cassette_cache.yaml'
+    path = join(recorder.cassette_library_dir, cassette_path)
+    if exists(path):
+        os.remove(path)
+    api = Api(f'{server}/get_json', cassette_path=cassette_path, click_send=True)
+    assert 'Cached: False' in api.resp_htm.children[1].value
+    num_loads = cassette_cache.num_loads
+    for i in range(3):
+        api.click_send()
+        assert 'Cached: True' in api.resp_htm.children[1].value
+        assert api.resp.json()['foo'] == 23
+    assert cassette_cache.num_loads == num_loads
+
+
 def test_api_local():
     "Create empty box, do nothing else."
 
@@ -61,11 +83,262 @@ def test_timeout():
 def test_do_timeout():
     "Do timeout."
 
-    # Tried with pytest.raises(Exception), but no luck:
-    # https://stackoverflow.com/questions/23337471/how-to-properly-assert-that-an-exception-gets-raised-in-pytest#29855337
-
+    # click handlers swallow exceptions, so call the handler directly
     api = Api(f'{server}/get_slow/sleep/2.0', timeout=1)
-    try:
-        api.click_send()
-    except timeout_decorator.TimeoutError:
-        assert True
+    with pytest.raises(requests.exceptions.Timeout):
+        api.send_clicked(api.send_btn)
+    assert 'Timed out (total)' in api.resp_htm.children[1].value
+
+
+def test_read_timeout():
+    "Do timeout while waiting for the server, before the total deadline."
+
+    api = Api(f'{server}/get_slow/sleep/2.0', timeout=Timeouts(read=0.5, total=5))
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        api.send_clicked(api.send_btn)
+    assert 'Timed out (read) after 0.500 secs' in api.resp_htm.children[1].value
+
+
+def test_deadline_while_reading():
+    "Stop reading a body trickling in or stalling when the total deadline passes."
+
+    from ipyrest import SessionTransport
+
+    transport = SessionTransport()
+    for url in [f'{server}/get_drip/30/0.1', f'{server}/get_drip/1/3.0?delay=0.8']:
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            transport.request('get', url, timeout=Timeouts(read=5, total=1))
+        assert time.monotonic() - start < 1.5
+
+
+def test_async_timeout():
+    "Do timeout in a background worker, where SIGALRM cannot be used."
+
+    api = Api(f'{server}/get_slow/sleep/2.0', timeout=1, asynchronous=True,
+              click_send=True)
+    assert api.wait(5)
+    assert 'Timed out (total)' in api.resp_htm.children[1].value
+    assert not api.send_btn.disabled
+
+
+def test_transport_reuse():
+    "Send several requests through one transport, reusing one connection."
+
+    from ipyrest import SessionTransport
+
+    transport = SessionTransport(pool_maxsize=2)
+    for i in range(3):
+        Api(f'{server}/get_json', transport=transport, click_send=True)
+    stats = transport.stats()[f'localhost:{port}']
+    assert stats['requests'] == 3
+    assert stats['connections'] == 1
+    assert stats['reused'] == 2
+
+
+def test_no_shared_cookies():
+    "Do not send cookies set for one request with the next one on a shared transport."
+
+    from ipyrest import SessionTransport
+
+    transport = SessionTransport()
+    api = Api(f'{server}/set_cookie', transport=transport, click_send=True)
+    assert api.resp.cookies['session'] == 'secret'
+    api = Api(f'{server}/get_cookies', transport=transport, click_send=True)
+    assert api.resp.json() == {}
+    resp = transport.request('get', f'{server}/get_cookies', cookies={'a': 'b'})
+    assert resp.json() == {'a': 'b'}
+
+
+def test_compression():
+    "Negotiate compressed transfers and account for bytes on the wire and decoded."
+
+    from ipyrest import SessionTransport
+
+    transport = SessionTransport()
+    api = Api(f'{server}/get_compressible/1000', transport=transport, click_send=True)
+    assert len(api.resp.json()) == 1000
+    assert api.sizes.encoding == 'gzip'
+    assert api.sizes.decoded == len(api.resp.content)
+    assert api.sizes.ratio > 10
+    assert 'decoded, gzip' in api.resp_htm.children[1].value
+    stats = transport.stats()[f'localhost:{port}']
+    assert stats['decoded_bytes'] == api.sizes.decoded
+    assert stats['compression_ratio'] == api.sizes.ratio
+
+    transport = SessionTransport(encodings=[])
+    api = Api(f'{server}/get_compressible/1000', transport=transport, click_send=True)
+    assert api.sizes.encoding == 'identity'
+    assert api.sizes.wire == api.sizes.decoded
+    with pytest.raises(ValueError):
+        SessionTransport(encodings=['lzma'])
+
+
+def test_head_sizes():
+    "Count no bytes on the wire for a HEAD response, whatever its Content-Length."
+
+    from ipyrest import SessionTransport
+
+    transport = SessionTransport()
+    api = Api(f'{server}/get_compressible/1000', method='HEAD', transport=transport,
+              click_send=True)
+    assert int(api.resp.headers['Content-Length']) > 0
+    assert api.sizes.wire == 0 and api.sizes.decoded == 0
+    assert 'Size: 0 Bytes' in api.resp_htm.children[1].value
+    assert transport.stats()[f'localhost:{port}']['wire_bytes'] == 0
+
+
+def test_timings():
+    "Show the time spent in each phase of a request in the status line."
+
+    from ipyrest import SessionTransport
+
+    transport = SessionTransport()
+    api = Api(f'{server}/get_json', transport=transport, click_send=True)
+    assert api.timings.resp is api.resp
+    assert api.timings.dns > 0 and api.timings.connect > 0
+    assert api.timings.tls == 0
+    assert api.timings.ttfb > 0
+    assert {'Raw', 'JSON'} <= set(api.timings.render)
+    assert api.timings.total >= api.timings.ttfb + sum(api.timings.render.values())
+    assert 'TTFB' in api.resp_htm.children[2].value
+
+    # every request gets its own timings
+    timings = api.timings
+    api.click_send()
+    assert api.timings is not timings and api.timings.ttfb > 0
+    assert api.timings.as_dict()['render'].keys() == timings.render.keys()
+
+
+def test_streaming():
+    "Download a body in chunks, spooling it, and render it when complete."
+
+    api = Api(f'{server}/get_compressible/20000', streaming=True, spool_size=1000,
+              click_send=True)
+    assert len(api.resp.json()) == 20000
+    assert api.download.received == len(api.resp.content)
+    assert api.download.wire_bytes == api.sizes.wire
+    assert 'Status: 200' in api.resp_htm.children[1].value
+    assert not api.partial_viewers
+
+
+def test_streaming_max_content():
+    "Read back only the beginning of a large spooled body, keeping all of it in the file."
+
+    api = Api(f'{server}/get_stream/1000/0.0', streaming=True, spool_size=1000)
+    api.max_content = 5000
+    api.click_send()
+    assert len(api.resp.content) == 5000
+    assert api.download.truncated
+    assert len(api.download.file.read()) == api.download.received > 5000
+    assert api.sizes.decoded == api.download.received
+    assert 'showing the first 5,000 Bytes' in api.resp_htm.children[1].value
+    download = api.download
+    api.click_send()
+    assert download.file is None
+
+
+def test_streaming_deadline():
+    "Stop a streamed download when the total deadline passes."
+
+    # click handlers swallow exceptions, so call the handler directly
+    api = Api(f'{server}/get_stream/100/0.05', streaming=True, timeout=1)
+    start = time.monotonic()
+    with pytest.raises(DeadlineExceeded):
+        api.send_clicked(api.send_btn)
+    assert time.monotonic() - start < 2
+    assert api.download.expired and 0 < api.download.received
+    assert 'Timed out (total)' in api.resp_htm.children[1].value
+
+
+def test_streaming_abort():
+    "Preview a body while it arrives and abort the download."
+
+    api = Api(f'{server}/get_stream/100/0.05', asynchronous=True, streaming=True)
+    api.progress_interval = 0
+    api.click_send()
+    for i in range(100):
+        time.sleep(0.05)
+        download = api.download
+        if download is not None and download.received > 100:
+            break
+    assert 'Downloading' in api.resp_htm.children[1].value
+    assert 'CSV' in api.partial_viewers
+    assert api.abort_download()
+    assert api.wait(5)
+    assert 'aborted' in api.resp_htm.children[1].value
+    assert not hasattr(api, 'resp')
+    csv = api.resp_pane.get_child_named('Content').get_child_named('CSV')
+    assert 'Preview' in csv.children[0].value
+
+
+def test_live_events():
+    "Show Server-Sent Events live, reconnecting after streams end, until stopped."
+
+    api = Api(f'{server}/get_events/3/0.02', live=True)
+    api.progress_interval = 0
+    api.click_send()
+    for i in range(100):
+        time.sleep(0.05)
+        if api.event_log.num_events >= 6:
+            break
+    assert api.event_log.num_events >= 6
+    assert api.event_log.last_id == str(api.event_log.num_events)
+    assert api.event_log.type_counts['tick'] == api.event_log.num_events
+    assert api.stop_live()
+    assert api.wait(5)
+    assert 'Stopped' in api.resp_htm.children[1].value
+    assert not api.send_btn.disabled
+    events = api.resp_pane.get_child_named('Content').get_child_named('Events')
+    assert 'events/s' in events.children[0].value
+
+
+def test_live_stop_idle():
+    "Stop live mode while waiting for the next event of an idle stream."
+
+    api = Api(f'{server}/get_events/2/5.0', live=True, click_send=True)
+    for i in range(100):
+        time.sleep(0.05)
+        if api.download is not None and api.download.received:
+            break
+    start = time.monotonic()
+    assert api.stop_live()
+    assert api.wait(5)
+    assert time.monotonic() - start < 2
+    assert 'Stopped' in api.resp_htm.children[1].value
+
+
+def test_live_does_not_block_async():
+    "Send asynchronously while more live sessions run than there are workers."
+
+    from ipyrest.ipyrest import executor
+
+    lives = [Api(f'{server}/get_events/2/5.0', live=True, click_send=True)
+             for i in range(executor._max_workers)]
+    api = Api(f'{server}/get_json', asynchronous=True, click_send=True)
+    assert api.wait(5)
+    assert api.resp.status_code == 200
+    for live in lives:
+        live.stop_live()
+    assert all(live.wait(5) for live in lives)
+
+
+def test_async():
+    "Send request in background, returning before the response arrives."
+
+    api = Api(f'{server}/get_slow/sleep/0.5', asynchronous=True, click_send=True)
+    assert api.future is not None
+    assert 'In flight' in api.resp_htm.children[1].value
+    assert api.wait(5)
+    assert api.resp.status_code == 200
+    assert 'Status: 200' in api.resp_htm.children[1].value
+
+
+def test_async_cancel():
+    "Cancel a request in flight, dropping its response."
+
+    api = Api(f'{server}/get_slow/sleep/0.5', asynchronous=True, click_send=True)
+    assert api.cancel_request()
+    assert api.wait(0)
+    assert 'Cancelled' in api.resp_htm.children[1].value
+    assert not hasattr(api, 'resp')
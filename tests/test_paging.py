@@ -0,0 +1,85 @@
+"""
+Ipyrest tests for widgets showing large content page by page.
+
+To be executed with pytest:
+
+    pytest -s -v test_paging.py
+"""
+
+import pandas as pd
+
+from ipyrest.paging import PagedText, PagedGrid
+
+
+def test_paged_text_small():
+    "Show small text completely, without paging controls."
+
+    pt = PagedText('foo\nbar')
+    assert pt.value == 'foo\nbar'
+    assert len(pt.children) == 1
+
+
+def test_paged_text_pages():
+    "Show large text page by page, loading more and jumping around."
+
+    text = ''.join(f'line {i}\n' for i in range(1, 10001))
+    pt = PagedText(text, page_lines=100, page_chars=1500, max_chars=3000)
+    assert len(pt.children) == 2
+    assert pt.value.count('\n') == 100
+    assert pt.value.startswith('line 1\n')
+
+    pt.load_more()
+    assert pt.value.count('\n') == 200
+    assert len(pt.value) <= 3000
+
+    for i in range(10):
+        pt.load_more()
+    assert len(pt.value) <= 3000
+    assert pt.value.endswith('line 1200\n')
+
+    pt.jump_to_line(5000)
+    assert pt.value.startswith('line 5000\n')
+
+    pt.jump_to_offset(text.index('line 7000') + 3)
+    assert pt.value.startswith('line 7000\n')
+
+    pt.text = ''
+    assert pt.value == ''
+    assert len(pt.children) == 1
+
+
+def test_paged_text_long_line():
+    "Show long lines in pieces of limited size."
+
+    text = 'x' * 100000
+    pt = PagedText(text, page_chars=1000)
+    assert len(pt.value) == 1000
+    pt.jump_to_offset(50000)
+    assert (pt.start, pt.end) == (50000, 51000)
+
+
+def test_paged_grid():
+    "Show a table page by page, fetching only the rows shown."
+
+    df = pd.DataFrame({'a': range(1050)})
+    fetched = []
+
+    def get_page(offset, count):
+        fetched.append((offset, count))
+        return df.iloc[offset:offset + count]
+
+    pg = PagedGrid(get_page, len(df), page_size=100)
+    assert pg.num_pages == 11
+    assert len(pg.children) == 2
+    assert len(pg.grid.df) == 100
+    pg.show_page(10)
+    assert pg.grid.df['a'].tolist() == list(range(1000, 1050))
+    assert pg.page_txt.value == 11
+    assert 'Rows 1,000&ndash;1,050 of 1,050' in pg.info_htm.value
+    pg.next_btn.click()
+    pg.page_txt.value = 2
+    pg.page_btn.click()
+    assert pg.grid.df['a'].iloc[0] == 100
+    assert fetched == [(0, 100), (1000, 100), (100, 100)]
+
+    assert len(PagedGrid(get_page, 10).children) == 1
@@ -0,0 +1,148 @@
+"""
+Ipyrest tests for down-sampling point clouds and the Scatter-3D view.
+
+To be executed with pytest:
+
+    pytest -s -v test_pointclouds.py
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+from ipyrest.pointclouds import (random_sample, voxel_sample, downsample,
+                                 level_sizes, read_point_cloud, read_text_points,
+                                 text_chunks)
+from ipyrest.responseviews import Scatter3DResponseView
+from test_responseviews import make_response
+
+
+def make_cloud(n: int) -> np.ndarray:
+    "Return a cloud of n points, a dense cluster and a sparse plane."
+
+    rng = np.random.default_rng(42)
+    dense = rng.normal(0, 0.01, (n - n // 10, 3))
+    sparse = np.column_stack([rng.uniform(-1, 1, (n // 10, 2)), np.zeros(n // 10)])
+    return np.concatenate([dense, sparse]).astype('float32')
+
+
+def test_read_text_points():
+    "Read whitespace separated tables, with or without header, in chunks."
+
+    points = make_cloud(1000)
+    body = '\n'.join('  {}\t{} {} 1'.format(*p) for p in points).encode('ascii')
+    assert len(text_chunks(body, 7)) == 7
+    assert b''.join(text_chunks(body, 7)) == body
+    for data in (body, b'x y z w\n' + body):
+        for chunk_size in (1000, 10 ** 7):
+            result = read_text_points(data, num_threads=4, chunk_size=chunk_size)
+            assert result.dtype == np.float32
+            assert np.allclose(result, points)
+    with pytest.raises(ValueError):
+        read_text_points(b'1 2\n3 4\n')
+
+
+def test_read_binary_points():
+    "Read raw float32, NPY and PLY point clouds without parsing text."
+
+    points = make_cloud(1000)
+    body = points.astype('<f4').tobytes()
+    result = read_point_cloud(body, 'application/vnd.3d+float32')
+    assert np.array_equal(result, points)
+    assert np.shares_memory(result, np.frombuffer(body, dtype='u1'))
+    with4 = np.column_stack([points, np.ones(1000, dtype='float32')])
+    result = read_point_cloud(with4.tobytes(), 'application/vnd.3d+float32; columns=4')
+    assert np.array_equal(result, points)
+    with pytest.raises(ValueError):
+        read_point_cloud(body[:-4], 'application/vnd.3d+float32')
+
+    f = io.BytesIO()
+    np.save(f, points.astype('float64'))
+    result = read_point_cloud(f.getvalue(), 'application/x-npy')
+    assert result.dtype == np.float64 and np.array_equal(result, points)
+    f = io.BytesIO()
+    np.save(f, np.rec.fromarrays(points.T, names='x,y,z'))
+    assert np.array_equal(read_point_cloud(f.getvalue(), 'application/vnd.3d+npy'), points)
+
+    vertices = np.zeros(1000, dtype=[('x', '>f4'), ('y', '>f4'), ('z', '>f4'), ('red', 'u1')])
+    vertices['x'], vertices['y'], vertices['z'] = points.T
+    header = ('ply\nformat binary_big_endian 1.0\ncomment test\nelement vertex 1000\n'
+              'property float x\nproperty float y\nproperty float z\n'
+              'property uchar red\nelement face 0\n'
+              'property list uchar int vertex_indices\nend_header\n')
+    body = header.encode('ascii') + vertices.tobytes()
+    with pytest.raises(ValueError):
+        read_point_cloud(body, 'application/ply')
+    header = header.replace('element face 0\nproperty list uchar int vertex_indices\n', '')
+    body = header.encode('ascii') + vertices.tobytes()
+    assert np.array_equal(read_point_cloud(body, 'application/ply'), points)
+    ascii_body = header.replace('binary_big_endian', 'ascii') + '\n'.join(
+        '{} {} {} 255'.format(*p) for p in points.tolist())
+    assert np.allclose(read_point_cloud(ascii_body.encode('ascii'), 'application/ply'), points)
+
+    with pytest.raises(ValueError):
+        read_point_cloud(body, 'application/octet-stream')
+
+
+def test_random_sample():
+    "Sample distinct points, keeping their order."
+
+    points = make_cloud(1000)
+    indices = random_sample(points, 100)
+    assert len(set(indices)) == 100
+    assert (np.diff(indices) > 0).all()
+    assert len(random_sample(points, 2000)) == 1000
+
+
+def test_voxel_sample():
+    "Sample n points, covering sparse regions better than random sampling."
+
+    points = make_cloud(100000)
+    indices = voxel_sample(points, 1000)
+    assert len(indices) == 1000
+    assert len(set(indices)) == len(indices)
+    # the sparse plane holds 10% of all points, but more voxels
+    in_plane = (points[indices, 2] == 0).mean()
+    assert in_plane > 0.3
+    assert (points[random_sample(points, 1000), 2] == 0).mean() < 0.2
+
+    # rows with NaN or inf values are dropped before binning
+    points[::10] = np.nan
+    points[1, 0] = np.inf
+    indices = voxel_sample(points, 1000)
+    assert len(indices) == 1000
+    assert np.isfinite(points[indices]).all()
+    assert len(voxel_sample(points[:20], 1000)) == 17
+
+    assert downsample(points, 1000, method='random').shape == (1000, 3)
+    assert downsample(points[:10], 1000) is not None
+    with pytest.raises(ValueError):
+        downsample(points, 10, method='magic')
+
+
+def test_level_sizes():
+    "Grow levels of detail by a factor up to the budget."
+
+    assert level_sizes(10 ** 7, 200000, 20000) == [20000, 80000, 200000]
+    assert level_sizes(50000, 200000, 20000) == [20000, 50000]
+    assert level_sizes(1000, 200000, 20000) == [1000]
+
+
+def test_scatter3d_view():
+    "Show few points at once and more in the background."
+
+    points = make_cloud(50000)
+    body = 'x y z\n' + '\n'.join('{} {} {}'.format(*p) for p in points)
+    resp = make_response(body.encode('ascii'), 'application/vnd.3d+txt')
+
+    view = Scatter3DResponseView()
+    view.max_points, view.initial_points = 10000, 1000
+    view.render(resp)
+    assert view.data.shape == (50000, 3)
+    view.refine_thread.join(10)
+    assert not view.refine_thread.is_alive()
+    import ipyvolume
+    scatter = ipyvolume.gcf().scatters[0]
+    assert len(scatter.x) == 10000
+    assert view.render(make_response(b'oops', 'application/x-npy')) is None
@@ -0,0 +1,668 @@
+"""
+Ipyrest tests for response views and their helpers, no server needed.
+
+To be executed with pytest:
+
+    pytest -s -v test_responseviews.py
+"""
+
+import json
+
+import pytest
+import requests
+
+from ipyrest.jsonpath import parse_path, parse_query, format_path, resolve_path
+from ipyrest.jsonindex import JSONIndex
+from ipyrest.ndjson import RecordStream
+from ipyrest.events import Event, EventParser, EventLog
+from ipyrest.simplify import (simplify_positions, simplify_geojson,
+                              tolerance_for_zoom, count_positions)
+from ipyrest.xmlindex import XMLIndex, parse_xpath
+from ipyrest.lazytree import LazyTree, JSONTreeModel, XMLTreeModel
+from ipyrest.paging import PagedGrid
+from ipyrest.protobufs import ProtobufRegistry, decode_raw, format_raw
+from ipyrest.timing import Timings, collect, current_timings
+from ipyrest.responseviews import (CSVResponseView, geojson_bbox, geojson_coords, gpx_points, decimate,
+                                   ResponseContent, ResponseView, ViewRegistry,
+                                   builtin_views, literal_pattern, parse_content_type,
+                                   GeoJSONResponseView, ImageResponseView,
+                                   GPXResponseView, JSONResponseView, JSONTreeResponseView,
+                                   NDJSONResponseView, EventStreamResponseView,
+                                   HTMLResponseView, ProtobufResponseView, RawResponseView,
+                                   SVGResponseView, XMLResponseView)
+
+
+def make_response(body: bytes, content_type: str) -> requests.models.Response:
+    "Return a response with given body and Content-Type, as if received."
+
+    resp = requests.models.Response()
+    resp._content = body
+    resp.status_code = 200
+    resp.headers['Content-Type'] = content_type
+    resp.encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    return resp
+
+
+def test_parse_content_type():
+    "Parse Content-Type header values."
+
+    assert parse_content_type('application/JSON; charset=utf-8') == \
+        ('application', 'json', '; charset=utf-8')
+    assert parse_content_type('image/svg+xml') == ('image', 'svg+xml', None)
+    assert parse_content_type(None) == ('application', 'octet-stream', None)
+
+
+def test_literal_pattern():
+    "Find literal mimetypes in regex patterns."
+
+    assert literal_pattern('text/csv.*') == 'text/csv'
+    assert literal_pattern(r'application/vnd\.geo\+json.*') == 'application/vnd.geo+json'
+    assert literal_pattern('image/.*') == 'image/'
+    assert literal_pattern(r'application/vnd\..*\+json.*') is None
+
+
+def test_builtin_dispatch():
+    "Dispatch mimetypes to built-in views."
+
+    assert builtin_views.views_for('application/json') == \
+        [JSONResponseView, JSONTreeResponseView]
+    assert builtin_views.views_for('application/vnd.geo+json') == \
+        [JSONResponseView, GeoJSONResponseView, JSONTreeResponseView]
+    assert builtin_views.views_for('image/svg+xml') == \
+        [SVGResponseView, ImageResponseView]
+    assert builtin_views.views_for('text/plain') == []
+    # patterns match at the start of essences, like re.match
+    assert builtin_views.views_for('application/json-patch+json') == \
+        [JSONResponseView, JSONTreeResponseView]
+    assert builtin_views.views_for('text/html-sandboxed') == [HTMLResponseView]
+
+
+def test_registry_priority():
+    "Order views by priority, register and unregister them."
+
+    class A(ResponseView):
+        name = 'A'
+        mimetype_pats = ['text/x-a.*']
+
+    class B(ResponseView):
+        name = 'B'
+        mimetype_pats = ['text/.*']
+        priority = 10
+
+    registry = ViewRegistry([A, B])
+    assert registry.views_for('text/x-a') == [B, A]
+    registry.register(A, priority=20)
+    assert registry.views_for('text/x-a') == [A, B]
+    registry.unregister(B)
+    assert registry.views_for('text/x-a') == [A]
+    assert registry.views_for('text/plain') == []
+
+
+def test_registry_many_views():
+    "Dispatch among many custom views."
+
+    view_classes = [
+        type(f'View{i}', (ResponseView,),
+             dict(name=f'V{i}', mimetype_pats=[f'application/x-v{i}.*']))
+        for i in range(500)]
+    registry = ViewRegistry(view_classes)
+    assert registry.views_for('application/x-v123') == \
+        [view_classes[1], view_classes[12], view_classes[123]]
+    assert registry.views_for('application/x-v500') == [view_classes[5], view_classes[50]]
+    assert len(registry.patterns) == 0
+
+
+def test_response_content():
+    "Decode and parse a response body only once for all views."
+
+    obj = {'type': 'FeatureCollection', 'features': []}
+    resp = make_response(json.dumps(obj).encode('utf-8'), 'application/vnd.geo+json')
+    content = ResponseContent(resp)
+    assert content.json() == obj
+    assert content.json() is content.json()
+
+    views = [V(content=content) for V in (RawResponseView, JSONResponseView)]
+    for view in views:
+        view.render(resp)
+    assert views[1].data is content.json()
+    assert set(content.cache) >= {'raw_text', 'json'}
+
+
+def test_raw_text():
+    "Show binary bodies as they are."
+
+    resp = make_response(b'\x89PNG', 'image/png')
+    assert ResponseContent(resp).raw_text == "b'\\x89PNG'"
+
+
+def test_markup_text():
+    "Decode HTML and SVG as UTF-8 unless a charset is given."
+
+    body = '<p>Grüße €</p>'
+    resp = make_response(body.encode('utf-8'), 'text/html')
+    assert resp.encoding == 'ISO-8859-1'
+    assert HTMLResponseView().render(resp).value == body
+    resp = make_response(body.encode('utf-8'), 'image/svg+xml')
+    assert SVGResponseView().render(resp).value == body
+    resp = make_response(body.encode('cp1252'), 'text/html; charset="windows-1252"')
+    assert ResponseContent(resp).markup_text == body
+
+
+def test_json_paths():
+    "Parse, format and resolve paths into JSON documents."
+
+    assert parse_path('$.a.b[123]') == ('a', 'b', 123)
+    assert parse_path('$["a b"][\'c\'][0]') == ('a b', 'c', 0)
+    assert parse_path('$') == ()
+    assert format_path(('a', 'b c', 1)) == '$.a["b c"][1]'
+    assert parse_path(format_path(('a', 'b c', 1))) == ('a', 'b c', 1)
+    assert resolve_path({'a': [{'b': 42}]}, parse_path('$.a[0].b')) == 42
+    with pytest.raises(ValueError):
+        parse_path('$.a[b')
+    with pytest.raises(KeyError):
+        resolve_path({'a': []}, ('a', 0))
+
+
+def test_json_tree():
+    "Build tree nodes only when expanded and only one page of children at a time."
+
+    obj = {'a': {'b': [{'c': i} for i in range(10000)]}, 'd': 'x'}
+    tree = LazyTree(JSONTreeModel(obj), page_size=100)
+    assert tree.num_nodes == 3
+    assert '2 keys' in tree.root.label_htm.value
+    assert '1 key' in tree.root.child_nodes['a'].label_htm.value
+
+    node = tree.reveal(parse_path('$.a.b[1234]'))
+    assert node.path == ('a', 'b', 1234)
+    assert '1 key' in node.label_htm.value
+    b = tree.node(('a', 'b'))
+    assert b.offset == 1200
+    assert '10,000 items' in b.label_htm.value
+    assert tree.num_nodes == 3 + 1 + 100
+    assert node.num_children == 1 and node.child_nodes == {}
+
+    node.expand()
+    assert tree.num_nodes == 3 + 1 + 100 + 1
+    b.show_page(0)
+    assert tree.num_nodes == 3 + 1 + 100
+    with pytest.raises(KeyError):
+        tree.reveal(('a', 'b', 10000))
+
+
+def test_json_tree_view():
+    "Render JSON as a lazy tree beside the JSON text."
+
+    resp = make_response(b'{"a": [1, 2, 3]}', 'application/json')
+    view = JSONTreeResponseView()
+    widget = view.render(resp)
+    assert isinstance(view.data, LazyTree)
+    assert widget.children[1] is view.data
+
+
+def test_json_index():
+    "Search keys, words, numbers and JSONPath-like queries in an index."
+
+    obj = {'users': [{'name': 'Ann Smith', 'age': 42, 'tags': ['admin']},
+                     {'name': 'Bob', 'age': 17, 'address': {'name': 'Home'}}],
+           'count': 2}
+    index = JSONIndex(obj)
+    assert len(index) == 13
+    assert index.search('ann') == [('users', 0, 'name')]
+    assert index.search('SMI ann') == [('users', 0, 'name')]
+    assert index.search('adm') == [('users', 0, 'tags', 0)]
+    assert index.search('name') == [('users', 0, 'name'), ('users', 1, 'name'),
+                                    ('users', 1, 'address', 'name')]
+    assert index.search('name', limit=1) == [('users', 0, 'name')]
+    assert index.search('10..20') == [('users', 1, 'age')]
+    assert index.search('> 2') == [('users', 0, 'age'), ('users', 1, 'age')]
+    assert index.search('>= 2') == [('users', 0, 'age'), ('users', 1, 'age'), ('count',)]
+    assert index.search('nothing') == []
+
+    assert parse_query('$.a[*]..b') == (('child', 'a'), ('children', None),
+                                        ('descendant', 'b'))
+    assert index.search('$.users[*].name') == [('users', 0, 'name'), ('users', 1, 'name')]
+    assert index.search('$..name') == [('users', 0, 'name'), ('users', 1, 'name'),
+                                       ('users', 1, 'address', 'name')]
+    assert index.search('$.users[-1].address.*') == [('users', 1, 'address', 'name')]
+    assert index.search('$.users[1]..*') == [
+        ('users', 1, k) for k in ('name', 'age', 'address')] + [
+        ('users', 1, 'address', 'name')]
+    with pytest.raises(ValueError):
+        index.search('$.users[')
+
+
+def test_json_search_view():
+    "Search the JSON view, building the index once per response."
+
+    resp = make_response(b'{"a": [{"b": "foo bar"}, {"b": "baz"}]}', 'application/json')
+    view = JSONResponseView()
+    widget = view.render(resp)
+    search_txt, msg_htm = widget.children[0].children
+    results_sel = widget.children[1]
+    search_txt.value = 'ba'
+    assert msg_htm.value == '2 matches'
+    assert results_sel.options == ('$.a[0].b = "foo bar"', '$.a[1].b = "baz"')
+    index = view.content.cache['json_index']
+    search_txt.value = '$.a[1]'
+    assert results_sel.options == ('$.a[1] = {…} 1 key',)
+    assert view.content.cache['json_index'] is index
+
+
+ATOM = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Feed</title>
+  <entry id="e1"><title>First</title><link href="a"/></entry>
+  <entry id="e2"><title>Second</title></entry>
+  <entry><title>Third</title><author><name>Ann</name></author></entry>
+</feed>
+"""
+
+
+def test_xml_index():
+    "Parse XML incrementally into an index and query it by XPath-like paths."
+
+    index = XMLIndex(ATOM, chunk_size=16)
+    assert index.error is None and not index.truncated
+    assert len(index) == 11
+    assert index.num_children[0] == 4
+    assert index.children(0) == [1, 2, 5, 7]
+    assert index.texts[3] == 'First'
+    assert index.attribs[2] == {'id': 'e1'}
+
+    assert parse_xpath('entry[2]') == [('descendant', 'entry', 2, None, None)]
+    assert index.find('//entry') == [2, 5, 7]
+    assert index.find('/feed/entry/title') == [3, 6, 8]
+    assert index.find('/feed/title') == [1]
+    assert index.find('//title') == [1, 3, 6, 8]
+    assert index.find('entry[2]/title') == [6]
+    assert index.find('//entry[@id]') == [2, 5]
+    assert index.find('//entry[@id="e2"]/*') == [6]
+    assert index.find('//atom:name') == [10]
+    assert index.find('/entry') == []
+    assert index.xpath(10) == '/feed/entry[3]/author[1]/name[1]'
+    with pytest.raises(ValueError):
+        index.find('//entry[')
+
+
+def test_xml_index_limits():
+    "Keep partial results for broken or too large documents."
+
+    index = XMLIndex(b'<a><b>1</b><b>2</b><c>', chunk_size=4)
+    assert index.error is not None
+    assert index.find('//b') == [1, 2]
+    assert index.ends[0] == 3
+
+    index = XMLIndex(b'<a>' + 1000 * b'<b/>' + b'</a>', max_nodes=10)
+    assert index.truncated and len(index) == 10
+    assert index.num_children[0] == 9
+
+
+def test_xml_view():
+    "Render XML as a lazy tree, revealing selected search results."
+
+    resp = make_response(ATOM, 'application/atom+xml')
+    assert XMLResponseView in builtin_views.views_for('application/atom+xml')
+    view = XMLResponseView()
+    widget = view.render(resp)
+    search_txt, search_btn, msg_htm = widget.children[0].children
+    results_sel, info_htm, tree = widget.children[1:]
+    assert info_htm.value == '11 elements'
+    assert tree.num_nodes == 5
+    search_txt.value = '//name'
+    search_btn.click()
+    assert msg_htm.value == '1 match'
+    results_sel.value = 10
+    assert tree.selected.path == (7, 9, 10)
+    assert 'Ann' in tree.selected.label_htm.value
+    assert XMLResponseView().render(make_response(b'oops', 'text/xml')) is None
+
+
+def test_geojson_bbox():
+    "Compute per-axis bounds of all positions in GeoJSON objects."
+
+    fc = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [10, 50]}},
+        {'type': 'Feature', 'geometry': {'type': 'LineString',
+                                         'coordinates': [[5, 55, 100], [20, 45, 200]]}},
+        {'type': 'Feature', 'geometry': {'type': 'MultiPolygon', 'coordinates': [
+            [[[0, 48], [1, 48], [1, 49], [0, 48]]],
+            [[[2, 40], [3, 40, 7], [2, 41], [2, 40]], [[2.2, 40.2], [2.5, 40.5], [2.2, 40.2]]]]}},
+        {'type': 'Feature', 'geometry': {'type': 'GeometryCollection', 'geometries': [
+            {'type': 'Point', 'coordinates': [-1, 44]}]}},
+        {'type': 'Feature', 'geometry': None},
+    ]}
+    assert geojson_coords(fc).shape == (1 + 2 + 4 + 4 + 3 + 1, 2)
+    # the old implementation compared tuples, giving (-1, 44) and (20, 45) here
+    assert geojson_bbox(fc) == ((-1, 40), (20, 55))
+    assert geojson_bbox({'type': 'FeatureCollection', 'features': []}) is None
+
+
+def test_simplify():
+    "Simplify lines and rings, keeping details larger than the tolerance."
+
+    import numpy as np
+
+    assert tolerance_for_zoom(0) == 360 / 256
+    assert tolerance_for_zoom(1, pixels=2) == 360 / 256
+    line = [[0, 0, 10], [1, 0.01, 11], [2, -0.01, 12], [3, 0, 13], [4, 2, 14], [5, 0, 15]]
+    assert simplify_positions(line, 0.1) == [line[0], line[3], line[4], line[5]]
+    assert simplify_positions(line, 10) == [line[0], line[5]]
+    assert simplify_positions(line, 0) == line
+
+    angles = np.linspace(0, 2 * np.pi, 10001)
+    ring = np.column_stack([np.cos(angles), np.sin(angles)]).tolist()
+    ring[-1] = ring[0]
+    polygon = {'type': 'Polygon', 'coordinates': [ring]}
+    fc = {'type': 'FeatureCollection', 'features': [
+        {'type': 'Feature', 'properties': {'name': 'circle'}, 'geometry': polygon}]}
+    coarse = simplify_geojson(fc, tolerance_for_zoom(2))
+    fine = simplify_geojson(fc, tolerance_for_zoom(12))
+    assert count_positions(fc) == 10001
+    assert 4 <= count_positions(coarse) < count_positions(fine) < 1000
+    ring = coarse['features'][0]['geometry']['coordinates'][0]
+    assert ring[0] == ring[-1]
+    assert coarse['features'][0]['properties'] is fc['features'][0]['properties']
+    assert len(simplify_geojson(fc, 100)['features'][0]['geometry']['coordinates'][0]) == 4
+
+
+def make_gpx(num_points: int, num_segments: int = 1) -> bytes:
+    "Return a GPX document with a track of some segments and one waypoint."
+
+    segments = []
+    for j in range(num_segments):
+        pts = ''.join('<trkpt lat="{}" lon="{}"><ele>1</ele></trkpt>'.format(
+            50 + j + i * 1e-5, 8 + i * 1e-5) for i in range(num_points))
+        segments.append('<trkseg>{}</trkseg>'.format(pts))
+    return ('<?xml version="1.0"?><gpx version="1.1" creator="test" '
+            'xmlns="http://www.topografix.com/GPX/1/1"><wpt lat="49" lon="7"/>'
+            '<trk>{}</trk></gpx>'.format(''.join(segments))).encode('utf-8')
+
+
+def test_gpx_points():
+    "Read GPX segments and waypoints and decimate them."
+
+    segments, waypoints = gpx_points(make_gpx(5, 2))
+    assert [seg.shape for seg in segments] == [(5, 2), (5, 2)]
+    assert segments[1][0].tolist() == [8, 51]
+    assert waypoints.tolist() == [[7, 49]]
+    thinned = decimate(segments, 4)
+    assert [seg.tolist() for seg in thinned] == [
+        [[8, 50], [8 + 3e-5, 50 + 3e-5], [8 + 4e-5, 50 + 4e-5]],
+        [[8, 51], [8 + 3e-5, 51 + 3e-5], [8 + 4e-5, 51 + 4e-5]]]
+    assert decimate(segments, 10) is segments
+
+
+def test_gpx_view():
+    "Render a large GPX trace as one layer with decimated points."
+
+    view = GPXResponseView()
+    m = view.render(make_response(make_gpx(100000), 'application/gpx+xml'))
+    layers = [layer for layer in m.layers if layer.__class__.__name__ == 'GeoJSON']
+    assert len(layers) == 1
+    multipoint, line = layers[0].data['features']
+    # every 10th point, the last one and the waypoint
+    assert len(multipoint['geometry']['coordinates']) == 10000 + 1 + 1
+    assert line['geometry']['coordinates'][-1] == [8 + 99999e-5, 50 + 99999e-5]
+    assert view.render(make_response(b'<gpx', 'application/gpx+xml')) is None
+
+
+def test_csv_view():
+    "Render CSV as a paged grid of a compact data frame."
+
+    body = b'a,b\n' + b''.join(b'%d,x\n' % i for i in range(250))
+    view = CSVResponseView()
+    grid = view.render(make_response(body, 'text/csv; charset=utf-8'))
+    assert isinstance(grid, PagedGrid)
+    assert len(view.data) == 250 and grid.num_pages == 3
+    assert len(grid.grid.df) == 100
+
+
+def test_csv_preview():
+    "Preview the complete rows of a CSV body while it arrives."
+
+    body = b'a,b\n' + b''.join(b'%d,x\n' % i for i in range(2000))
+    resp = make_response(b'', 'text/csv; charset=utf-8')
+    view = CSVResponseView()
+    view.preview_rows = 500
+    box = view.begin(resp)
+    view.feed(body[:100])
+    view.refresh()
+    num_rows = body[:100].count(b'\n') - 1
+    assert box.children[1].num_rows == num_rows
+    for i in range(100, len(body), 100):
+        view.feed(body[i:i + 100])
+    view.refresh()
+    assert box.children[1].num_rows == 500
+    assert len(view.head) < len(body)
+
+    resp._content = body
+    grid = view.render(resp)
+    assert len(view.data) == 2000 and grid.num_pages == 20
+
+
+def test_raw_preview():
+    "Preview the first page of a body while it arrives."
+
+    view = RawResponseView()
+    view.page_chars = 1000
+    paged = view.begin(make_response(b'', 'text/plain; charset=utf-8'))
+    for i in range(10):
+        view.feed(300 * b'x')
+        view.refresh()
+    assert paged.text == 1000 * 'x'
+
+
+def test_record_stream():
+    "Parse records split across chunks, keeping only the most recent ones."
+
+    body = b''.join(b'{"id": %d, "tag": {"name": "t%d"}}\n' % (i, i % 3) for i in range(100))
+    body += b'oops\n\n[1, 2]\n"last"'
+    stream = RecordStream(max_records=10)
+    for i in range(0, len(body), 7):
+        stream.feed(body[i:i + 7])
+    assert stream.num_records == 101
+    assert stream.close() == 1
+    assert stream.num_records == 102 and stream.num_errors == 1
+    assert len(stream.recent) == 10 and stream.recent[-1] == 'last'
+    assert stream.key_counts['id'] == 100
+    assert stream.type_counts == {'dict': 100, 'list': 1, 'str': 1}
+    assert stream.num_bytes == len(body)
+    assert '102 records</b>, 1 invalid lines, showing the last 10' in stream.summary()
+
+    stream = RecordStream()
+    stream.feed(b'\x1e{"a": 1}\n\x1e{"a": 2, "b": {"c": 3}}\n')
+    assert list(stream.frame().columns) == ['a', 'b.c']
+
+    # records keyed by ids do not grow the key counts without bounds
+    stream = RecordStream(max_keys=10)
+    stream.feed(b''.join(b'{"common": 1, "id%d": 2}\n' % i for i in range(1000)))
+    assert len(stream.key_counts) <= 20
+    assert stream.key_counts['common'] == 1000
+
+
+def test_ndjson_view():
+    "Render NDJSON records, also previewed while they arrive."
+
+    assert NDJSONResponseView in builtin_views.views_for('application/x-ndjson')
+    assert JSONResponseView not in builtin_views.views_for('application/jsonl')
+    body = b''.join(b'{"id": %d}\n' % i for i in range(5000))
+    view = NDJSONResponseView()
+    view.chunk_size = 1000
+    box = view.render(make_response(body, 'application/x-ndjson'))
+    assert view.data.num_records == 5000
+    assert box.children[1].num_rows == 1000
+    assert box.children[1].grid.df['id'].iloc[0] == 4000
+
+    resp = make_response(b'', 'application/x-ndjson')
+    view = NDJSONResponseView()
+    preview = view.begin(resp)
+    view.feed(body[:5000])
+    view.refresh()
+    num_records = body[:5000].count(b'\n')
+    assert view.data.num_records == num_records
+    assert preview.children[1].num_rows == num_records
+    view.feed(body[5000:])
+    resp._content = body
+    view.render(resp)
+    assert view.data.num_records == 5000
+    assert NDJSONResponseView().render(make_response(b'oops', 'application/x-ndjson')) is None
+
+
+def test_event_parser():
+    "Parse Server-Sent Events as in the HTML standard, from chunks of any size."
+
+    body = (b': comment\r\nretry: 2500\n\ndata: first\n\nevent: add\ndata: a\ndata:b\n'
+            b'id: 7\n\ndata: no id change\n\nid\ndata: \xc3\xa4\n\ndata: incomplete')
+    for size in (1, 5, len(body)):
+        parser = EventParser()
+        events = []
+        for i in range(0, len(body), size):
+            events += parser.feed(body[i:i + size])
+        assert events == [Event('message', 'first'), Event('add', 'a\nb', '7'),
+                          Event('message', 'no id change', '7'), Event('message', '\xe4')]
+        assert parser.retry == 2500 and parser.num_comments == 1
+        assert parser.last_id == ''
+    parser.reset()
+    assert parser.feed(b'\n') == []
+
+    # lines may end with CRLF, CR or LF, split between chunks or not
+    body = b'event: e\ndata: 1\ndata: 2\n\ndata: 3\n\n'
+    for eol in (b'\r\n', b'\r', b'\n'):
+        for size in (1, 2, 5):
+            parser = EventParser()
+            events = []
+            text = body.replace(b'\n', eol)
+            for i in range(0, len(text), size):
+                events += parser.feed(text[i:i + size])
+            assert events == [Event('e', '1\n2'), Event('message', '3')]
+
+
+def test_event_log():
+    "Keep the most recent events and their rate over a window."
+
+    log = EventLog(max_events=5, window=10)
+    log.started = 1000.0
+    for i in range(50):
+        log.add(Event('tick' if i % 2 else 'tock', str(i)), now=1000.0 + i / 10)
+    assert log.num_events == 50 and len(log.events) == 5
+    assert log.type_counts == {'tick': 25, 'tock': 25}
+    assert log.rate(now=1005.0) == 10.0
+    assert log.rate(now=1020.0) == 0.0
+    assert len(log.counts) <= 11
+    assert log.text(2).count('[tick]') == 1
+    assert '50 events</b>, ' in log.summary()
+
+    # types sent by the server do not grow the counts without bounds
+    log = EventLog(max_types=5)
+    for i in range(100):
+        log.add(Event('common', ''))
+        log.add(Event(f'type{i}', ''))
+    assert len(log.type_counts) <= 10 and log.type_counts['common'] == 100
+
+
+def test_event_stream_view():
+    "Render the events of a complete stream."
+
+    body = b''.join(b'event: e%d\ndata: %d\n\n' % (i % 2, i) for i in range(300)) + b'data: last'
+    view = EventStreamResponseView()
+    box = view.render(make_response(body, 'text/event-stream'))
+    assert view.data.num_events == 301
+    assert box.children[1].value.endswith('last')
+    assert box.children[1].value.count('\n\n') == view.max_shown - 1
+    assert EventStreamResponseView().render(make_response(b': ping\n\n', 'text/event-stream')) is None
+
+
+PERSON_PB = b'\n\x08John Doe\x10\xd2\t\x1a\x10jdoe@example.com"\x0c\n\x08555-4321\x10\x01'
+
+
+def person_descriptor_set() -> bytes:
+    "Return a serialized FileDescriptorSet for the tutorial.Person message."
+
+    from google.protobuf import descriptor_pb2
+
+    FDP = descriptor_pb2.FieldDescriptorProto
+    fds = descriptor_pb2.FileDescriptorSet()
+    f = fds.file.add(name='person.proto', package='tutorial', syntax='proto2')
+    phone = f.message_type.add(name='PhoneNumber')
+    phone.field.add(name='number', number=1, type=FDP.TYPE_STRING, label=FDP.LABEL_OPTIONAL)
+    phone.field.add(name='type', number=2, type=FDP.TYPE_INT32, label=FDP.LABEL_OPTIONAL)
+    person = f.message_type.add(name='Person')
+    person.field.add(name='name', number=1, type=FDP.TYPE_STRING, label=FDP.LABEL_OPTIONAL)
+    person.field.add(name='id', number=2, type=FDP.TYPE_INT32, label=FDP.LABEL_OPTIONAL)
+    person.field.add(name='email', number=3, type=FDP.TYPE_STRING, label=FDP.LABEL_OPTIONAL)
+    person.field.add(name='phones', number=4, type=FDP.TYPE_MESSAGE, label=FDP.LABEL_REPEATED,
+                     type_name='.tutorial.PhoneNumber')
+    return fds.SerializeToString()
+
+
+def test_decode_raw():
+    "Decode the wire format without schema, nesting messages."
+
+    fields = decode_raw(PERSON_PB)
+    assert fields == [(1, 2, 'John Doe'), (2, 0, 1234), (3, 2, 'jdoe@example.com'),
+                      (4, 2, [(1, 2, '555-4321'), (2, 0, 1)])]
+    assert format_raw(fields).splitlines()[3:] == ['4 {', '  1: "555-4321"', '  2: 1', '}']
+    assert decode_raw(b'\x0d\x01\x00\x00\x00\x12\x02\xff\xfe') == [(1, 5, 1), (2, 2, b'\xff\xfe')]
+    with pytest.raises(ValueError):
+        decode_raw(PERSON_PB[:-3])
+
+
+def test_protobuf_registry():
+    "Look up message types by content type parameter and pattern, building classes once."
+
+    pytest.importorskip('google.protobuf')
+    registry = ProtobufRegistry()
+    assert registry.lookup('application/x-protobuf') is None
+    registry.register(r'/people/', 'tutorial.Person', person_descriptor_set())
+    registry.add_descriptor_set(person_descriptor_set())
+    person_class = registry.lookup('application/x-protobuf', 'http://localhost/people/1')
+    assert person_class.DESCRIPTOR.full_name == 'tutorial.Person'
+    assert registry.lookup('application/x-protobuf; proto=tutorial.Person') is person_class
+    phone_class = registry.lookup('application/x-protobuf; messageType="tutorial.PhoneNumber"')
+    assert phone_class.DESCRIPTOR.full_name == 'tutorial.PhoneNumber'
+    assert registry.lookup('application/x-protobuf', 'http://localhost/other') is None
+
+
+def test_protobuf_view():
+    "Decode registered message types with their schema, others without."
+
+    pytest.importorskip('google.protobuf')
+    resp = make_response(PERSON_PB, 'application/x-protobuf')
+    view = ProtobufResponseView()
+    view.registry = ProtobufRegistry()
+    widget = view.render(resp)
+    assert view.data[0] == (1, 2, 'John Doe')
+    assert '1: "John Doe"' in widget.textarea.value
+
+    view = ProtobufResponseView()
+    view.registry = ProtobufRegistry()
+    view.registry.register(r'x-protobuf', 'tutorial.Person', person_descriptor_set())
+    widget = view.render(resp)
+    assert view.data.name == 'John Doe' and view.data.phones[0].number == '555-4321'
+    assert 'name: "John Doe"' in widget.textarea.value
+    assert view.render(make_response(b'\xff', 'application/x-protobuf')) is None
+
+
+def test_timings():
+    "Complete request phases from resp.elapsed and summarize them."
+
+    import datetime
+
+    resp = make_response(b'{}', 'application/json')
+    resp.elapsed = datetime.timedelta(seconds=0.2)
+    timings = Timings()
+    timings.connect = 0.05
+    with collect(timings):
+        assert current_timings() is timings
+    assert current_timings() is None
+    timings.finish_request(resp, end=timings.started + 0.5)
+    assert timings.resp is resp
+    assert round(timings.ttfb, 6) == 0.15
+    assert round(timings.download, 6) == 0.3
+    timings.render['JSON'] = 0.012
+    timings.total = 0.6
+    assert list(timings.as_dict()) == Timings.phases + ['render', 'total']
+    summary = timings.summary()
+    assert summary.startswith('Timing: DNS 0 ms, Connect 50 ms, TLS 0 ms')
+    assert 'TTFB 150 ms' in summary
+    assert summary.endswith('Render 12 ms (JSON 12 ms), Total 600 ms')
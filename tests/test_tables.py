@@ -0,0 +1,117 @@
+"""
+Ipyrest tests for loading tabular response bodies.
+
+To be executed with pytest:
+
+    pytest -s -v test_tables.py
+"""
+
+import io
+
+import pandas as pd
+import pytest
+import requests
+
+from ipyrest.responseviews import ArrowResponseView
+from ipyrest.tables import csv_dtypes, read_csv_frame, read_arrow_table, table_summary
+
+
+def make_csv(num_rows: int) -> bytes:
+    "Return a CSV body with integer, float and repetitive text columns."
+
+    lines = ['id,value,color,name']
+    for i in range(num_rows):
+        lines.append('{},{},{},name {}'.format(
+            i, i / 10, ('red', 'green', 'blue')[i % 3], i))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def test_csv_dtypes():
+    "Infer column types from a sample of rows."
+
+    dtypes = csv_dtypes(make_csv(1000), sample_rows=100)
+    assert dtypes == {'id': 'int64', 'value': 'float64', 'color': 'category'}
+
+
+@pytest.mark.parametrize('engine', ['c', None])
+def test_read_csv_frame(engine):
+    "Read CSV in chunks into a compact frame, equal to reading it at once."
+
+    data = make_csv(10000)
+    df = read_csv_frame(data, sample_rows=100, chunk_rows=1000, engine=engine)
+    expected = pd.read_csv(pd.io.common.BytesIO(data))
+    assert len(df) == 10000
+    assert df['id'].dtype == 'int16'
+    assert isinstance(df['color'].dtype, pd.CategoricalDtype)
+    assert set(df['color'].cat.categories) == {'red', 'green', 'blue'}
+    assert df['id'].tolist() == expected['id'].tolist()
+    assert df['color'].astype(str).tolist() == expected['color'].tolist()
+    assert df['name'].tolist() == expected['name'].tolist()
+    assert df.memory_usage(deep=True).sum() < expected.memory_usage(deep=True).sum()
+
+
+@pytest.mark.parametrize('engine', ['c', 'pyarrow'])
+def test_read_csv_frame_fallback(engine):
+    "Read again if later rows do not fit the types of the sample."
+
+    if engine == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    data = b'a,b\n' + b''.join(b'%d,x\n' % i for i in range(100)) + b',y\n2.5,z\n'
+    df = read_csv_frame(data, sample_rows=10, chunk_rows=20, engine=engine)
+    assert len(df) == 102
+    assert df['a'].isna().sum() == 1
+    assert df['a'].iloc[-1] == 2.5
+    assert read_csv_frame(b'').empty
+
+
+def arrow_bodies():
+    "Return a table and its serializations as Arrow stream, Arrow file and Parquet."
+
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet as pq
+
+    table = pa.table({'id': list(range(1000)), 'name': ['n%d' % i for i in range(1000)]})
+    stream, file_, parquet = pa.BufferOutputStream(), pa.BufferOutputStream(), io.BytesIO()
+    with pa.ipc.new_stream(stream, table.schema) as writer:
+        writer.write_table(table)
+    with pa.ipc.new_file(file_, table.schema) as writer:
+        writer.write_table(table)
+    pq.write_table(table, parquet)
+    return table, [stream.getvalue().to_pybytes(), file_.getvalue().to_pybytes(),
+                   parquet.getvalue()]
+
+
+def test_read_arrow_table():
+    "Read Arrow IPC streams and files without copying, and Parquet."
+
+    import pyarrow as pa
+
+    table, bodies = arrow_bodies()
+    for body in bodies:
+        assert read_arrow_table(body).equals(table)
+    # columns of Arrow IPC tables point into the body
+    stream = bodies[0]
+    column = read_arrow_table(stream).column('id').chunk(0)
+    address = column.buffers()[1].address
+    body_address = pa.py_buffer(stream).address
+    assert body_address <= address < body_address + len(stream)
+    with pytest.raises(ValueError):
+        read_arrow_table(b'no arrow')
+    assert '1,000 rows, 2 columns' in table_summary(table)
+
+
+def test_arrow_view():
+    "Render an Arrow table with its summary in a paged grid."
+
+    table, bodies = arrow_bodies()
+    resp = requests.models.Response()
+    resp._content = bodies[0]
+    resp.headers['Content-Type'] = 'application/vnd.apache.arrow.stream'
+    view = ArrowResponseView()
+    widget = view.render(resp)
+    assert view.data.equals(table)
+    summary, grid = widget.children
+    assert 'int64' in summary.value
+    assert grid.num_pages == 10
+    grid.show_page(9)
+    assert grid.grid.df['id'].tolist() == list(range(900, 1000))